@@ -11,7 +11,7 @@ from django.core.validators import ValidationError
 import mock
 from nose.tools import assert_raises, eq_, raises
 
-from amo.utils import (cache_ns_key, escape_all, LocalFileStorage,
+from amo.utils import (cache_lock, cache_ns_key, escape_all, LocalFileStorage,
                        resize_image, rm_local_tmp_dir, slugify, slug_validator)
 
 
@@ -174,6 +174,41 @@ class TestCacheNamespaces(unittest.TestCase):
         eq_(cache_ns_key(self.namespace), expected)
 
 
+class TestCacheLock(unittest.TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_acquire(self):
+        with cache_lock('foo') as locked:
+            assert locked
+        with cache_lock('foo') as locked:
+            assert locked
+
+    def test_held(self):
+        with cache_lock('foo') as locked:
+            assert locked
+            with cache_lock('foo') as other:
+                assert not other
+            with cache_lock('bar') as other:
+                assert other
+
+    def test_not_released_by_other(self):
+        with cache_lock('foo'):
+            with cache_lock('foo'):
+                pass
+            with cache_lock('foo') as other:
+                assert not other
+
+    @mock.patch('amo.utils.time.sleep')
+    def test_wait(self, sleep):
+        with cache_lock('foo'):
+            sleep.side_effect = lambda s: cache.delete('lock:foo')
+            with cache_lock('foo', wait=10) as other:
+                assert other
+        eq_(sleep.call_count, 1)
+
+
 class TestEscapeAll(unittest.TestCase):
 
     def test_basics(self):
@@ -1,4 +1,5 @@
 import codecs
+import contextlib
 import datetime
 import errno
 import functools
@@ -27,7 +28,7 @@ from django.forms.fields import Field
 from django.http import HttpRequest
 from django.utils.encoding import smart_str, smart_unicode
 from django.utils.functional import Promise
-from django.utils.http import urlquote
+from django.utils.http import parse_etags, quote_etag, urlquote
 
 import chardet
 import jinja2
@@ -392,6 +393,19 @@ class HttpResponseSendFile(http.HttpResponse):
             return wrapper()
 
 
+def not_modified(request, etag):
+    """
+    Returns a 304 response if the request's If-None-Match matches `etag`,
+    otherwise None.
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not etag or not header or etag not in parse_etags(header):
+        return None
+    response = http.HttpResponseNotModified()
+    response['ETag'] = quote_etag(etag)
+    return response
+
+
 def redirect_for_login(request):
     # We can't use urlparams here, because it escapes slashes,
     # which a large number of tests don't expect
@@ -426,6 +440,31 @@ def cache_ns_key(namespace, increment=False):
     return '%s:%s' % (ns_val, ns_key)
 
 
+@contextlib.contextmanager
+def cache_lock(name, timeout=60, wait=0, poll=0.1):
+    """
+    A lock shared between processes, held in the cache under `name`.
+
+    Yields True if the lock was acquired and False otherwise. When `wait` is
+    set, it will keep trying for up to that many seconds before giving up.
+    The lock expires after `timeout` seconds in case the holder dies.
+
+        with cache_lock('sign:%s' % key, wait=30) as locked:
+            ...
+    """
+    key = 'lock:%s' % name
+    give_up = time.time() + wait
+    locked = cache.add(key, 1, timeout)
+    while not locked and time.time() < give_up:
+        time.sleep(poll)
+        locked = cache.add(key, 1, timeout)
+    try:
+        yield locked
+    finally:
+        if locked:
+            cache.delete(key)
+
+
 def smart_path(string):
     """Returns a string you can pass to path.path safely."""
     if os.path.supports_unicode_filenames:
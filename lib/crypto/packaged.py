@@ -1,3 +1,4 @@
+import hashlib
 import json
 import os
 import shutil
@@ -13,84 +14,218 @@ from celeryutils import task
 from django_statsd.clients import statsd
 from signing_clients.apps import JarExtractor
 
+from amo.utils import cache_lock
+from lib.crypto.signing import get_client
+from mkt.site.storage_utils import copy_stored_file, DEFAULT_CHUNK_SIZE
 from mkt.versions.models import Version
 
 
 log = commonware.log.getLogger('z.crypto')
 
+# How long to wait for, and hold, the lock on a package being signed.
+SIGN_LOCK_TIMEOUT = 60
+
 
 class SigningError(Exception):
     pass
 
 
-def sign_app(src, dest, ids, reviewer=False):
-    tempname = tempfile.mktemp()
-    try:
-        return _sign_app(src, dest, ids, reviewer, tempname)
-    finally:
+def sign_app(src, dest, ids, reviewer=False, use_cache=True,
+             src_hash=None):
+    """
+    Sign the package at `src` and write the signed package to `dest`.
+
+    Signed packages are kept in a cache keyed by the content of the package,
+    the ids injected into it and the key it was signed with, so identical
+    signing requests only hit the signing server once. A lock on the key
+    makes concurrent requests for the same package wait for the first. The
+    cache is only used when the id of the signing key is set, see
+    SIGNED_APPS_KEY_ID.
+
+    `src_hash` is the hash of the package, if known, which saves reading
+    the package just to compute it.
+
+    Returns the sha256 hash of the signed package.
+    """
+    if not _get_endpoint(reviewer):
+        return _no_sign(src, dest)
+    if not use_cache or not _get_key_id(reviewer):
+        return _sign_app(src, [dest], ids, reviewer)
+
+    cached = _cached_signed_path(src, ids, reviewer, src_hash=src_hash)
+    with cache_lock('crypto:sign-app:%s' % os.path.basename(cached),
+                    timeout=SIGN_LOCK_TIMEOUT, wait=SIGN_LOCK_TIMEOUT):
+        if storage.exists(cached):
+            log.info('Using cached signed app: %s' % cached)
+            statsd.incr('services.sign.app.cache.hit')
+            copy_stored_file(cached, dest)
+            return _cached_signed_hash(cached)
+
+        statsd.incr('services.sign.app.cache.miss')
         try:
-            os.unlink(tempname)
-        except OSError:
-            # If the file has already been removed, don't worry about it.
-            pass
+            # Write the signed package to its destination and to the cache
+            # in the same pass.
+            signed_hash = _sign_app(src, [dest, cached], ids, reviewer)
+            with storage.open(_cached_hash_path(cached), 'w') as fobj:
+                fobj.write(signed_hash)
+            return signed_hash
+        except:
+            if storage.exists(cached):
+                storage.delete(cached)
+            raise
+
+
+def _get_key_id(reviewer=False):
+    return (settings.SIGNED_APPS_REVIEWER_KEY_ID if reviewer else
+            settings.SIGNED_APPS_KEY_ID)
+
+
+def _file_hash(path):
+    content = hashlib.sha256()
+    with storage.open(path, 'rb') as fobj:
+        for chunk in iter(lambda: fobj.read(DEFAULT_CHUNK_SIZE), ''):
+            content.update(chunk)
+    return 'sha256:%s' % content.hexdigest()
+
+
+def _cached_signed_path(src, ids, reviewer, src_hash=None):
+    """
+    Returns the path of the signed package in the signing cache, which is
+    keyed by the hash of the package content, the ids, the signing key and
+    whether it is signed for reviewers.
+    """
+    key = hashlib.sha256('\n'.join([src_hash or _file_hash(src), ids or '',
+                                    _get_key_id(reviewer),
+                                    'reviewer' if reviewer else 'public']))
+    return os.path.join(settings.SIGNED_APPS_CACHE_PATH,
+                        key.hexdigest() + '.zip')
+
+
+def _cached_hash_path(cached):
+    """Returns the path the hash of the cached package at `cached` is in."""
+    return os.path.splitext(cached)[0] + '.sha256'
+
+
+def _cached_signed_hash(cached):
+    hash_path = _cached_hash_path(cached)
+    if storage.exists(hash_path):
+        with storage.open(hash_path) as fobj:
+            return fobj.read()
+    return _file_hash(cached)
 
 
-def _sign_app(src, dest, ids, reviewer, tempname):
+class HashingWriter(object):
+    """
+    A write only file object that writes to all of `files` at once, keeping
+    track of the size and sha256 of what was written.
+    """
+
+    def __init__(self, *files):
+        self.files = files
+        self.size = 0
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        for fobj in self.files:
+            fobj.write(data)
+        self.size += len(data)
+        self.hash.update(data)
+
+
+def _sign_app(src, dests, ids, reviewer):
     """
     Generate a manifest and signature and send signature to signing server to
     be signed.
+
+    The signed package is written to each of the storage paths in `dests` in
+    one pass, and the size of each is checked against what was written.
     """
     active_endpoint = _get_endpoint(reviewer)
     timeout = settings.SIGNED_APPS_SERVER_TIMEOUT
 
-    if not active_endpoint:
-        _no_sign(src, dest)
-        return
+    with storage.open(src, 'rb') as srcf:
+        # Extract necessary info from the archive
+        try:
+            jar = JarExtractor(srcf, None, ids, omit_signature_sections=(
+                settings.SIGNED_APPS_OMIT_PER_FILE_SIGS))
+        except:
+            log.error('Archive extraction failed. Bad archive?', exc_info=True)
+            raise SigningError('Archive extraction failed. Bad archive?')
 
-    # Extract necessary info from the archive
-    try:
-        jar = JarExtractor(
-            storage.open(src, 'r'), tempname,
-            ids,
-            omit_signature_sections=settings.SIGNED_APPS_OMIT_PER_FILE_SIGS)
-    except:
-        log.error('Archive extraction failed. Bad archive?', exc_info=True)
-        raise SigningError('Archive extraction failed. Bad archive?')
+        log.info('App signature contents: %s' % jar.signatures)
 
-    log.info('App signature contents: %s' % jar.signatures)
+        log.info('Calling service: %s' % active_endpoint)
+        try:
+            with statsd.timer('services.sign.app'):
+                response = get_client(active_endpoint).post(
+                    active_endpoint, timeout,
+                    files={'file': ('zigbert.sf', str(jar.signatures))})
+        except requests.exceptions.HTTPError, error:
+            # Will occur when a 3xx or greater code is returned.
+            log.error('Posting to app signing failed: %s, %s' % (
+                error.response.status, error))
+            raise SigningError('Posting to app signing failed: %s, %s' % (
+                error.response.status, error))
 
-    log.info('Calling service: %s' % active_endpoint)
-    try:
-        with statsd.timer('services.sign.app'):
-            response = requests.post(active_endpoint, timeout=timeout,
-                                     files={'file': ('zigbert.sf',
-                                                     str(jar.signatures))})
-    except requests.exceptions.HTTPError, error:
-        # Will occur when a 3xx or greater code is returned.
-        log.error('Posting to app signing failed: %s, %s' % (
-            error.response.status, error))
-        raise SigningError('Posting to app signing failed: %s, %s' % (
-            error.response.status, error))
-
-    except:
-        # Will occur when some other error occurs.
-        log.error('Posting to app signing failed', exc_info=True)
-        raise SigningError('Posting to app signing failed')
-
-    if response.status_code != 200:
-        log.error('Posting to app signing failed: %s' % response.reason)
-        raise SigningError('Posting to app signing failed: %s'
-                           % response.reason)
-
-    pkcs7 = b64decode(json.loads(response.content)['zigbert.rsa'])
+        except:
+            # Will occur when some other error occurs.
+            log.error('Posting to app signing failed', exc_info=True)
+            raise SigningError('Posting to app signing failed')
+
+        if response.status_code != 200:
+            log.error('Posting to app signing failed: %s' % response.reason)
+            raise SigningError('Posting to app signing failed: %s'
+                               % response.reason)
+
+        pkcs7 = b64decode(json.loads(response.content)['zigbert.rsa'])
+        try:
+            with statsd.timer('services.sign.app.write'):
+                writer = _write_signed(jar, pkcs7, dests)
+        except:
+            log.error('App signing failed', exc_info=True)
+            raise SigningError('App signing failed')
+
+    for dest in dests:
+        size = storage.size(dest)
+        if size != writer.size:
+            log.error('Signed app %s is %s bytes, expected %s'
+                      % (dest, size, writer.size))
+            raise SigningError('Signed app size mismatch')
+
+    signed_hash = 'sha256:%s' % writer.hash.hexdigest()
+    log.info('Signed app written: %s, %s bytes, %s'
+             % (', '.join(dests), writer.size, signed_hash))
+    return signed_hash
+
+
+def _write_signed(jar, pkcs7, dests):
+    """
+    Write the signed version of the archive to each of `dests`, keeping track
+    of the size and hash of what was written.
+
+    zigbert.rsa has to be the first file in the archive and it depends on the
+    digests of every other file, so they can't be computed while the archive
+    is written. `JarExtractor.make_signed` writes it to a local file, which is
+    streamed to all of `dests` at once.
+    """
+    tempname = tempfile.mktemp()
+    outs = []
     try:
-        jar.make_signed(pkcs7)
-    except:
-        log.error('App signing failed', exc_info=True)
-        raise SigningError('App signing failed')
-    with storage.open(dest, 'w') as destf:
-        tempf = open(tempname)
-        shutil.copyfileobj(tempf, destf)
+        jar.make_signed(pkcs7, tempname)
+        outs = [storage.open(dest, 'wb') for dest in dests]
+        writer = HashingWriter(*outs)
+        with open(tempname, 'rb') as tempf:
+            for chunk in iter(lambda: tempf.read(DEFAULT_CHUNK_SIZE), ''):
+                writer.write(chunk)
+    finally:
+        for out in outs:
+            out.close()
+        try:
+            os.unlink(tempname)
+        except OSError:
+            # If the file was never written, don't worry about it.
+            pass
+    return writer
 
 
 def _get_endpoint(reviewer=False):
@@ -120,10 +255,11 @@ def _no_sign(src, dest):
     if not os.path.exists(dest_dir):
         os.makedirs(dest_dir)
     shutil.copy(src, dest)
+    return _file_hash(dest)
 
 
 @task
-def sign(version_id, reviewer=False, resign=False, **kw):
+def sign(version_id, reviewer=False, resign=False, use_cache=True, **kw):
     version = Version.objects.get(pk=version_id)
     app = version.addon
     log.info('Signing version: %s of app: %s' % (version_id, app))
@@ -163,7 +299,8 @@ def sign(version_id, reviewer=False, resign=False, **kw):
         })
     with statsd.timer('services.sign.app'):
         try:
-            sign_app(file_obj.file_path, path, ids, reviewer)
+            sign_app(file_obj.file_path, path, ids, reviewer,
+                     use_cache=use_cache, src_hash=file_obj.hash)
         except SigningError:
             log.info('[Webapp:%s] Signing failed' % app.id)
             if storage.exists(path):
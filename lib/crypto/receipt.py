@@ -1,4 +1,7 @@
 import json
+import os
+import threading
+from multiprocessing.pool import ThreadPool
 
 from django.conf import settings
 from django_statsd.clients import statsd
@@ -7,9 +10,15 @@ import commonware.log
 import jwt
 import requests
 
+from lib.crypto.signing import get_client
 
 log = commonware.log.getLogger('z.crypto')
 
+# The threads sign_many sends receipts from, one pool per process. Keyed on
+# the pid so that forked workers don't use threads of their parent.
+_pools = {}
+_pools_lock = threading.Lock()
+
 
 class SigningError(Exception):
     pass
@@ -36,8 +45,8 @@ def sign(receipt):
 
     try:
         with statsd.timer('services.sign.receipt'):
-            req = requests.post(destination, data=data, headers=headers,
-                                timeout=timeout)
+            req = get_client(settings.SIGNING_SERVER).post(
+                destination, timeout, data=data, headers=headers)
     except requests.Timeout:
         statsd.incr('services.sign.receipt.timeout')
         log.error('Posting to receipt signing timed out')
@@ -57,6 +66,36 @@ def sign(receipt):
     return json.loads(req.content)['receipt']
 
 
+def sign_many(receipts):
+    """
+    Send several receipts to the signing service at once.
+
+    The requests are pipelined over the pooled signing server connections,
+    so at most SIGNING_CLIENT_POOL_SIZE are in flight at a time. Returns the
+    signed receipts in the same order. If any of them fails, SigningError
+    is raised.
+    """
+    receipts = list(receipts)
+    if len(receipts) < 2:
+        return map(sign, receipts)
+
+    with statsd.timer('services.sign.receipt.many'):
+        return get_pool().map(sign, receipts)
+
+
+def get_pool():
+    """Return the per-process thread pool of `sign_many`, creating it once."""
+    pid = os.getpid()
+    pool = _pools.get(pid)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(pid)
+            if pool is None:
+                pool = _pools[pid] = ThreadPool(
+                    settings.SIGNING_CLIENT_POOL_SIZE)
+    return pool
+
+
 def decode(receipt):
     """
     Decode and verify that the receipt is sound from a crypto point of view.
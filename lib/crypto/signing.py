@@ -0,0 +1,87 @@
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+
+import commonware.log
+import requests
+from django_statsd.clients import statsd
+from requests.adapters import HTTPAdapter
+
+
+log = commonware.log.getLogger('z.crypto')
+
+# One client per (process, server). Keyed on the pid so that forked workers
+# never share sockets with their parent.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class SigningClient(object):
+    """
+    A pooled, keep-alive HTTP client for a signing server.
+
+    Connections are reused between signing requests so that each signature
+    doesn't pay for a new TCP and TLS handshake. The number of requests in
+    flight against the server is bounded by the pool size, and failed
+    requests are retried with jittered exponential backoff.
+    """
+
+    def __init__(self, server, pool_size=None, retries=None, backoff=None):
+        self.server = server
+        self.pool_size = pool_size or settings.SIGNING_CLIENT_POOL_SIZE
+        self.retries = (settings.SIGNING_CLIENT_RETRIES if retries is None
+                        else retries)
+        self.backoff = (settings.SIGNING_CLIENT_RETRY_BACKOFF
+                        if backoff is None else backoff)
+        self.semaphore = threading.BoundedSemaphore(self.pool_size)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.pool_size,
+                              pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def delay(self, attempt):
+        """Full jitter: a random delay up to backoff * 2 ** attempt."""
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def post(self, url, timeout, **kw):
+        """
+        POST to the signing server, retrying on connection errors, timeouts
+        and 5xx responses. Once the retries are used up the last exception
+        is raised or the last response is returned, so callers handle
+        errors exactly as they would for `requests.post`.
+        """
+        attempt = 0
+        while True:
+            try:
+                with self.semaphore:
+                    response = self.session.post(url, timeout=timeout, **kw)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+                log.warning('Signing request to %s failed, retrying' % url,
+                            exc_info=True)
+            else:
+                if response.status_code < 500 or attempt >= self.retries:
+                    return response
+                log.warning('Signing request to %s returned %s, retrying'
+                            % (url, response.status_code))
+            statsd.incr('services.sign.retry')
+            time.sleep(self.delay(attempt))
+            attempt += 1
+
+
+def get_client(server):
+    """Return the per-process `SigningClient` for `server`."""
+    key = (os.getpid(), server)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = SigningClient(server)
+    return client
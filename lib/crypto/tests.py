@@ -6,15 +6,17 @@ import zipfile
 
 from django.conf import settings  # For mocking.
 from django.core.files.storage import default_storage as storage
+from django.test.utils import override_settings
 
 import jwt
 import mock
 from nose.tools import eq_, raises
-from requests import Timeout
+from requests import ConnectionError, Timeout
 
 import amo.tests
-from lib.crypto import packaged
-from lib.crypto.receipt import crack, sign, SigningError
+from lib.crypto import packaged, receipt
+from lib.crypto.receipt import crack, sign, sign_many, SigningError
+from lib.crypto.signing import get_client, SigningClient
 from mkt.site.fixtures import fixture
 from mkt.versions.models import Version
 from mkt.webapps.models import Webapp
@@ -38,7 +40,7 @@ def mock_sign(version_id, reviewer=False):
     return path
 
 
-@mock.patch('lib.crypto.receipt.requests.post')
+@mock.patch('lib.crypto.signing.requests.Session.post')
 @mock.patch.object(settings, 'SIGNING_SERVER', 'http://localhost')
 class TestReceipt(amo.tests.TestCase):
 
@@ -75,6 +77,96 @@ class TestReceipt(amo.tests.TestCase):
         req.return_value = self.get_response(206)
         sign('x')
 
+    def test_retry_timeout(self, req):
+        req.side_effect = [Timeout, self.get_response(200)]
+        sign('x')
+        eq_(req.call_count, 2)
+
+    def test_retry_server_error(self, req):
+        req.side_effect = [self.get_response(503), self.get_response(200)]
+        sign('x')
+        eq_(req.call_count, 2)
+
+    @raises(SigningError)
+    def test_retries_exhausted(self, req):
+        req.return_value = self.get_response(503)
+        try:
+            sign('x')
+        finally:
+            eq_(req.call_count, settings.SIGNING_CLIENT_RETRIES + 1)
+
+    def test_no_retry_client_error(self, req):
+        req.return_value = self.get_response(403)
+        with self.assertRaises(SigningError):
+            sign('x')
+        eq_(req.call_count, 1)
+
+    def test_sign_many(self, req):
+        req.side_effect = lambda url, data, **kw: mock.Mock(
+            status_code=200, content=json.dumps({'receipt': data}))
+        eq_(sign_many(['a', 'b', 'c']), ['a', 'b', 'c'])
+        eq_(req.call_count, 3)
+
+    def test_sign_many_empty(self, req):
+        eq_(sign_many([]), [])
+        assert not req.called
+
+    @raises(SigningError)
+    def test_sign_many_error(self, req):
+        req.side_effect = [self.get_response(200), self.get_response(403)]
+        sign_many(['a', 'b'])
+
+    def test_sign_many_pool(self, req):
+        req.side_effect = lambda url, data, **kw: mock.Mock(
+            status_code=200, content=json.dumps({'receipt': data}))
+        sign_many(['a', 'b'])
+        pool = receipt.get_pool()
+        sign_many(['c', 'd'])
+        # The threads are reused between calls.
+        eq_(receipt.get_pool(), pool)
+
+    @mock.patch('lib.crypto.receipt.os.getpid')
+    def test_sign_many_pool_per_process(self, getpid, req):
+        getpid.return_value = 1
+        pool = receipt.get_pool()
+        getpid.return_value = 2
+        assert receipt.get_pool() != pool
+        for pid in (1, 2):
+            receipt._pools.pop(pid).terminate()
+
+
+class TestSigningClient(amo.tests.TestCase):
+
+    def test_shared(self):
+        eq_(get_client('http://localhost'), get_client('http://localhost'))
+        assert (get_client('http://localhost') !=
+                get_client('http://otherhost'))
+
+    @mock.patch('lib.crypto.signing.os.getpid')
+    def test_per_process(self, getpid):
+        getpid.return_value = 1
+        client = get_client('http://localhost')
+        getpid.return_value = 2
+        assert get_client('http://localhost') != client
+
+    def test_pool(self):
+        client = SigningClient('http://localhost', pool_size=3)
+        adapter = client.session.get_adapter('https://localhost')
+        eq_(adapter._pool_maxsize, 3)
+        eq_(adapter._pool_block, True)
+
+    @mock.patch('lib.crypto.signing.time.sleep')
+    @mock.patch('lib.crypto.signing.requests.Session.post')
+    def test_backoff(self, post, sleep):
+        post.side_effect = ConnectionError
+        client = SigningClient('http://localhost', retries=2, backoff=1)
+        with self.assertRaises(ConnectionError):
+            client.post('http://localhost', 1)
+        eq_(post.call_count, 3)
+        eq_(sleep.call_count, 2)
+        assert 0 <= sleep.call_args_list[0][0][0] <= 1
+        assert 0 <= sleep.call_args_list[1][0][0] <= 2
+
 
 class TestCrack(amo.tests.TestCase):
 
@@ -174,6 +266,12 @@ class TestPackaged(PackagedApp, amo.tests.TestCase):
             packaged.sign(self.version.pk)
         assert _no_sign.called
 
+    def test_server_inactive_hash(self):
+        with self.settings(SIGNED_APPS_SERVER_ACTIVE=False):
+            signed_hash = packaged.sign_app(
+                self.file.file_path, self.file.signed_file_path, None)
+        eq_(signed_hash, self.file.generate_hash(self.file.signed_file_path))
+
     @mock.patch('lib.crypto.packaged._no_sign')
     def test_reviewer_server_inactive(self, _no_sign):
         with self.settings(SIGNED_APPS_REVIEWER_SERVER_ACTIVE=False):
@@ -197,7 +295,7 @@ class TestPackaged(PackagedApp, amo.tests.TestCase):
             'Unexpected endpoint returned.')
 
     @mock.patch.object(packaged, '_get_endpoint', lambda _: '/fake/url/')
-    @mock.patch('requests.post')
+    @mock.patch('requests.Session.post')
     def test_inject_ids(self, post):
         post().status_code = 200
         post().content = '{"zigbert.rsa": ""}'
@@ -205,3 +303,132 @@ class TestPackaged(PackagedApp, amo.tests.TestCase):
         zf = zipfile.ZipFile(self.file.signed_file_path, mode='r')
         ids_data = zf.read('META-INF/ids.json')
         eq_(sorted(json.loads(ids_data).keys()), ['id', 'version'])
+
+
+@mock.patch.object(packaged, '_get_endpoint', lambda _: '/fake/url/')
+@mock.patch('requests.Session.post')
+@override_settings(SIGNED_APPS_KEY_ID='key',
+                   SIGNED_APPS_REVIEWER_KEY_ID='reviewer-key')
+class TestPackagedCache(PackagedApp, amo.tests.TestCase):
+
+    def setUp(self):
+        super(TestPackagedCache, self).setUp()
+        self.setup_files()
+
+    def sign(self, ids='{"id": "1"}', reviewer=False, **kw):
+        packaged.sign_app(self.file.file_path, self.file.signed_file_path,
+                          ids, reviewer, **kw)
+
+    def test_cached(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        post.reset_mock()
+        self.sign()
+        storage.delete(self.file.signed_file_path)
+        self.sign()
+        eq_(post.call_count, 1)
+        assert storage.exists(self.file.signed_file_path)
+
+    def test_not_cached_different_ids(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        post.reset_mock()
+        self.sign()
+        self.sign(ids='{"id": "2"}')
+        eq_(post.call_count, 2)
+
+    def test_not_cached_reviewer(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        post.reset_mock()
+        self.sign()
+        self.sign(reviewer=True)
+        eq_(post.call_count, 2)
+
+    def test_not_cached_key_rotated(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        post.reset_mock()
+        self.sign()
+        with self.settings(SIGNED_APPS_KEY_ID='new-key'):
+            self.sign()
+        eq_(post.call_count, 2)
+
+    def test_not_cached_without_key_id(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        post.reset_mock()
+        with self.settings(SIGNED_APPS_KEY_ID=''):
+            self.sign()
+            self.sign()
+        eq_(post.call_count, 2)
+
+    def test_use_cache_false(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        post.reset_mock()
+        self.sign(use_cache=False)
+        self.sign(use_cache=False)
+        eq_(post.call_count, 2)
+
+    def test_failure_not_cached(self, post):
+        post().status_code = 500
+        post().reason = 'Server error'
+        with self.assertRaises(packaged.SigningError):
+            self.sign()
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        post.reset_mock()
+        self.sign()
+        eq_(post.call_count, 1)
+
+    def test_signed_written_once_to_all(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        packaged.sign_app(self.file.file_path, self.file.signed_file_path,
+                          '{"id": "1"}', False)
+        cached = packaged._cached_signed_path(
+            self.file.file_path, '{"id": "1"}', False)
+        with storage.open(self.file.signed_file_path) as signed:
+            with storage.open(cached) as cachedf:
+                eq_(signed.read(), cachedf.read())
+
+    def test_signed_rsa_first(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        self.sign()
+        zf = zipfile.ZipFile(self.file.signed_file_path, mode='r')
+        eq_(zf.namelist()[0], 'META-INF/zigbert.rsa')
+        assert 'META-INF/manifest.mf' in zf.namelist()
+        assert 'META-INF/zigbert.sf' in zf.namelist()
+
+    def test_signed_hash(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        signed_hash = packaged.sign_app(
+            self.file.file_path, self.file.signed_file_path, '{"id": "1"}',
+            False, use_cache=False)
+        eq_(signed_hash, self.file.generate_hash(self.file.signed_file_path))
+
+    def test_signed_hash_cached(self, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        signed_hash = packaged.sign_app(
+            self.file.file_path, self.file.signed_file_path, '{"id": "1"}',
+            False)
+        eq_(packaged.sign_app(
+            self.file.file_path, self.file.signed_file_path, '{"id": "1"}',
+            False), signed_hash)
+        eq_(signed_hash, self.file.generate_hash(self.file.signed_file_path))
+
+    @mock.patch('lib.crypto.packaged.storage.size')
+    def test_size_mismatch(self, size, post):
+        post().status_code = 200
+        post().content = '{"zigbert.rsa": ""}'
+        size.return_value = 1
+        with self.assertRaises(packaged.SigningError):
+            self.sign()
+        post.reset_mock()
+        size.side_effect = lambda path: os.path.getsize(path)
+        self.sign()
+        eq_(post.call_count, 1)
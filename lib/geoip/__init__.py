@@ -3,12 +3,31 @@ import logging
 import requests
 from django_statsd.clients import statsd
 
+from lib.geoip.ranges import RangeTable
+from lib.misc.lru import LRUCache
 from mkt import regions
 
 log = logging.getLogger('z.geoip')
 
+# Compiled range tables, shared by every GeoIP in the process.
+_tables = {}
+
+
+def get_table(path):
+    if path not in _tables:
+        _tables[path] = RangeTable(path)
+    return _tables[path]
+
 
 def is_public(ip):
+    if ':' in ip:
+        ip = ip.lower()
+        if ip.startswith('::ffff:') and '.' in ip:
+            # An IPv4 mapped address.
+            return is_public(ip[7:])
+        # Loopback, unique local (fc00::/7) and link local (fe80::/10).
+        return not (ip == '::1' or ip[:2] in ('fc', 'fd') or
+                    ip[:3] in ('fe8', 'fe9', 'fea', 'feb'))
     parts = map(int, ip.split('.'))
     # localhost
     if ip == '127.0.0.1':
@@ -26,13 +45,18 @@ def is_public(ip):
 
 
 class GeoIP:
-    """Call to geodude server to resolve an IP to Geo Info block."""
+    """
+    Resolve an IP to a country, using the local range table in GEOIP_DB_PATH
+    if there is one, otherwise calling the geodude server.
+    """
 
     def __init__(self, settings):
         self.timeout = float(getattr(settings, 'GEOIP_DEFAULT_TIMEOUT', .2))
         self.url = getattr(settings, 'GEOIP_URL', '')
         self.default_val = getattr(settings, 'GEOIP_DEFAULT_VAL',
                                    regions.RESTOFWORLD.slug).lower()
+        self.db_path = getattr(settings, 'GEOIP_DB_PATH', '')
+        self.recent = LRUCache(getattr(settings, 'GEOIP_LRU_SIZE', 10000))
 
     def lookup(self, address):
         """Resolve an IP address to a block of geo information.
@@ -41,8 +65,16 @@ class GeoIP:
         return the default as defined by the settings, or "restofworld".
 
         """
-        public_ip = is_public(address)
-        if self.url and public_ip:
+        try:
+            public_ip = is_public(address)
+        except (ValueError, AttributeError):
+            log.info('GeoIP lookup skipped for invalid IP: {0}'
+                     .format(address))
+            return self.default_val
+
+        if self.db_path and public_ip:
+            return self.lookup_local(address)
+        elif self.url and public_ip:
             with statsd.timer('z.geoip'):
                 res = None
                 try:
@@ -73,3 +105,25 @@ class GeoIP:
                 log.info('Geodude lookup skipped for private IP: {0}'
                          .format(address))
         return self.default_val
+
+    def lookup_local(self, address):
+        """Resolve an IP address using the local range table."""
+        country_code = self.recent.get(address)
+        if country_code is not None:
+            statsd.incr('z.geoip.local.hit')
+            return country_code
+
+        with statsd.timer('z.geoip.local'):
+            try:
+                country_code = get_table(self.db_path).lookup(address)
+            except ValueError:
+                country_code = None
+            except (IOError, OSError):
+                statsd.incr('z.geoip.local.error')
+                log.error('GeoIP database could not be loaded: {0}'
+                          .format(self.db_path), exc_info=True)
+                return self.default_val
+
+        country_code = country_code or self.default_val
+        self.recent[address] = country_code
+        return country_code
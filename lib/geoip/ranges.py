@@ -0,0 +1,101 @@
+"""
+A local, in-process country lookup for IP addresses.
+
+The country ranges are compiled from a CSV file into a flat file of fixed
+size records, sorted by the start of the range:
+
+    start address (16 bytes) | end address (16 bytes) | country code (2 bytes)
+
+Addresses are stored as 16 byte big-endian IPv6 addresses, with IPv4
+addresses mapped into ::ffff:0:0/96, so that comparing the raw bytes
+compares the addresses. The compiled file is memory-mapped and searched
+with a binary search, so it's shared between processes and costs nothing
+to load.
+"""
+import csv
+import mmap
+import socket
+
+ADDRESS_SIZE = 16
+RECORD_SIZE = ADDRESS_SIZE * 2 + 2
+IPV4_PREFIX = '\x00' * 10 + '\xff\xff'
+
+
+def pack_address(address):
+    """
+    Returns the address as 16 bytes, or raises ValueError if it is not a
+    valid IPv4 or IPv6 address.
+    """
+    try:
+        if ':' in address:
+            return socket.inet_pton(socket.AF_INET6, address)
+        return IPV4_PREFIX + socket.inet_pton(socket.AF_INET, address)
+    except (socket.error, TypeError):
+        raise ValueError('Invalid IP address: %r' % address)
+
+
+def compile_ranges(src, dest):
+    """
+    Compile the country ranges in the CSV file object `src` into the file at
+    `dest`. Rows are `start,end,country_code`, or the legacy GeoLite country
+    format of `start,end,start_int,end_int,country_code,country_name`.
+
+    Returns the number of ranges written.
+    """
+    records = []
+    for row in csv.reader(src):
+        if not row or row[0].startswith('#'):
+            continue
+        country = (row[4] if len(row) >= 6 else row[2]).strip().lower()
+        if len(country) != 2:
+            continue
+        try:
+            start = pack_address(row[0].strip())
+            end = pack_address(row[1].strip())
+        except ValueError:
+            continue
+        records.append((start, end, country))
+
+    records.sort()
+    with open(dest, 'wb') as out:
+        for start, end, country in records:
+            out.write(start + end + country)
+    return len(records)
+
+
+class RangeTable(object):
+    """A memory-mapped, compiled table of country ranges."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as fobj:
+            self.data = mmap.mmap(fobj.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = len(self.data) // RECORD_SIZE
+
+    def __len__(self):
+        return self.count
+
+    def start(self, index):
+        offset = index * RECORD_SIZE
+        return self.data[offset:offset + ADDRESS_SIZE]
+
+    def lookup(self, address):
+        """
+        Returns the lowercase country code for the address, or None if it
+        isn't in any range. Raises ValueError for an invalid address.
+        """
+        key = pack_address(address)
+        # Find the last range starting at or before the address.
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.start(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        if not low:
+            return None
+        offset = (low - 1) * RECORD_SIZE + ADDRESS_SIZE
+        if key > self.data[offset:offset + ADDRESS_SIZE]:
+            return None
+        offset += ADDRESS_SIZE
+        return self.data[offset:offset + 2]
@@ -1,4 +1,7 @@
+import os
+import tempfile
 from random import randint
+from StringIO import StringIO
 
 import mock
 import requests
@@ -6,12 +9,31 @@ from nose.tools import eq_
 
 import amo.tests
 
-from lib.geoip import GeoIP
+from lib.geoip import GeoIP, is_public
+from lib.geoip.ranges import compile_ranges, RangeTable
 
 
-def generate_settings(url='', default='restofworld', timeout=0.2):
+def generate_settings(url='', default='restofworld', timeout=0.2,
+                      db_path=''):
     return mock.Mock(GEOIP_URL=url, GEOIP_DEFAULT_VAL=default,
-                     GEOIP_DEFAULT_TIMEOUT=timeout)
+                     GEOIP_DEFAULT_TIMEOUT=timeout, GEOIP_DB_PATH=db_path,
+                     GEOIP_LRU_SIZE=10)
+
+
+RANGES = """\
+# start,end,country
+1.0.0.0,1.0.0.255,AU
+"2.0.0.0","2.15.255.255","33554432","34603007","FR","France"
+5.0.0.0,5.0.0.255,XYZ
+2001:db8::,2001:db8::ffff,DE
+bad,address,US
+"""
+
+
+def compile_table():
+    path = tempfile.mktemp()
+    compile_ranges(StringIO(RANGES), path)
+    return path
 
 
 class GeoIPTest(amo.tests.TestCase):
@@ -86,3 +108,86 @@ class GeoIPTest(amo.tests.TestCase):
             result = geoip.lookup(ip)
             assert not mock_post.called
             eq_(result, 'restofworld')
+
+    def test_private_ipv6(self):
+        for ip in ['::1', 'fd00::1', 'fe80::1', '::ffff:10.0.0.1']:
+            assert not is_public(ip), ip
+        for ip in ['2001:db8::1', '::ffff:8.8.8.8']:
+            assert is_public(ip), ip
+
+    @mock.patch('requests.post')
+    def test_invalid_ip(self, mock_post):
+        geoip = GeoIP(generate_settings(url='localhost'))
+        eq_(geoip.lookup('not-an-ip'), 'restofworld')
+        eq_(geoip.lookup(None), 'restofworld')
+        assert not mock_post.called
+
+
+class RangeTableTest(amo.tests.TestCase):
+
+    def setUp(self):
+        self.path = compile_table()
+        self.table = RangeTable(self.path)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_compiled(self):
+        eq_(len(self.table), 3)
+
+    def test_lookup(self):
+        eq_(self.table.lookup('1.0.0.0'), 'au')
+        eq_(self.table.lookup('1.0.0.128'), 'au')
+        eq_(self.table.lookup('1.0.0.255'), 'au')
+        eq_(self.table.lookup('2.3.4.5'), 'fr')
+
+    def test_lookup_ipv6(self):
+        eq_(self.table.lookup('2001:db8::1'), 'de')
+        eq_(self.table.lookup('::ffff:2.3.4.5'), 'fr')
+        eq_(self.table.lookup('2001:db9::'), None)
+
+    def test_not_found(self):
+        eq_(self.table.lookup('0.255.255.255'), None)
+        eq_(self.table.lookup('1.0.1.0'), None)
+        eq_(self.table.lookup('5.0.0.1'), None)
+        eq_(self.table.lookup('255.255.255.255'), None)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.table.lookup('1.2.3')
+
+
+class LocalGeoIPTest(amo.tests.TestCase):
+
+    def setUp(self):
+        self.path = compile_table()
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    @mock.patch('requests.post')
+    def test_lookup(self, mock_post):
+        geoip = GeoIP(generate_settings(url='localhost', db_path=self.path))
+        eq_(geoip.lookup('2.3.4.5'), 'fr')
+        eq_(geoip.lookup('2001:db8::1'), 'de')
+        assert not mock_post.called
+
+    def test_not_found(self):
+        geoip = GeoIP(generate_settings(db_path=self.path))
+        eq_(geoip.lookup('8.8.8.8'), 'restofworld')
+
+    def test_private_ip(self):
+        geoip = GeoIP(generate_settings(db_path=self.path))
+        eq_(geoip.lookup('10.0.0.1'), 'restofworld')
+
+    @mock.patch('lib.geoip.get_table')
+    def test_recent(self, get_table):
+        get_table.return_value.lookup.return_value = 'fr'
+        geoip = GeoIP(generate_settings(db_path=self.path))
+        eq_(geoip.lookup('2.3.4.5'), 'fr')
+        eq_(geoip.lookup('2.3.4.5'), 'fr')
+        eq_(get_table.return_value.lookup.call_count, 1)
+
+    def test_missing_db(self):
+        geoip = GeoIP(generate_settings(db_path='/does/not/exist'))
+        eq_(geoip.lookup('2.3.4.5'), 'restofworld')
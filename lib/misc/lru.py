@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+
+
+_missing = object()
+
+
+class LRUCache(object):
+    """
+    A small, thread safe, least recently used cache for use within a process.
+
+    Python 2 has no functools.lru_cache, and we often want to be able to
+    invalidate single entries anyway:
+
+        cache = LRUCache(1000)
+        value = cache.get(key)
+        if value is None:
+            value = cache[key] = expensive(key)
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self.data.pop(key, _missing)
+            if value is _missing:
+                return default
+            # Move it to the most recently used end.
+            self.data[key] = value
+            return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = value
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            return self.data.pop(key, default)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
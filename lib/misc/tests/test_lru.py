@@ -0,0 +1,43 @@
+from nose.tools import eq_
+
+import amo.tests
+from lib.misc.lru import LRUCache
+
+
+class TestLRUCache(amo.tests.TestCase):
+
+    def test_get_set(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        eq_(cache.get('a'), 1)
+        eq_(cache['a'], 1)
+        eq_(cache.get('b'), None)
+        eq_(cache.get('b', 2), 2)
+        with self.assertRaises(KeyError):
+            cache['b']
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache.get('a')
+        cache['c'] = 3
+        eq_(len(cache), 2)
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+
+    def test_falsy_values(self):
+        cache = LRUCache(2)
+        cache['a'] = None
+        assert 'a' in cache
+        eq_(cache.get('a', 1), None)
+
+    def test_pop_clear(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        eq_(cache.pop('a'), 1)
+        assert 'a' not in cache
+        cache.clear()
+        eq_(len(cache), 0)
@@ -0,0 +1,5 @@
+ALTER TABLE `app_manifest`
+    ADD COLUMN `is_offline` bool NOT NULL DEFAULT 0,
+    ADD COLUMN `app_type` varchar(20) NOT NULL DEFAULT '',
+    ADD COLUMN `permissions` longtext,
+    ADD COLUMN `launch_path` varchar(255) NOT NULL DEFAULT '';
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+
+from celeryutils import task
+
+from amo.utils import chunked
+from mkt.site.decorators import write
+from mkt.webapps.models import AppManifest
+
+
+@task
+@write
+def _task(ids, **kw):
+    for manifest in AppManifest.objects.filter(pk__in=ids):
+        # The attributes are set from the manifest on pre_save.
+        manifest.save()
+
+
+def run():
+    """Fill in the attributes denormalized from the app manifests."""
+    ids = AppManifest.objects.values_list('id', flat=True)
+    for chunk in chunked(ids, 100):
+        _task.delay(chunk)
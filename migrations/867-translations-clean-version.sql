@@ -0,0 +1,4 @@
+ALTER TABLE `translations` ADD COLUMN `clean_version` smallint unsigned;
+-- Existing clean strings were cleaned as version 1 does.
+UPDATE `translations` SET `clean_version` = 1
+    WHERE `localized_string_clean` IS NOT NULL;
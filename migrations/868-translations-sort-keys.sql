@@ -0,0 +1,8 @@
+CREATE TABLE `translations_sort_keys` (
+    `id` int(11) unsigned AUTO_INCREMENT NOT NULL PRIMARY KEY,
+    `translation_id` int(11) unsigned NOT NULL,
+    `locale` varchar(10) NOT NULL,
+    `sort_key` varchar(255) NOT NULL,
+    UNIQUE (`translation_id`, `locale`),
+    KEY `translations_sort_keys_locale_sort_key` (`locale`, `sort_key`)
+) ENGINE=InnoDB CHARACTER SET utf8 COLLATE utf8_general_ci;
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+
+from celeryutils import task
+
+from amo.utils import chunked
+from mkt.site.decorators import write
+from mkt.translations.models import update_object_sort_keys
+from mkt.webapps.models import Webapp
+
+
+@task
+@write
+def _task(ids, **kw):
+    update_object_sort_keys(Webapp, Webapp.with_deleted.no_transforms()
+                                          .filter(pk__in=ids))
+
+
+def run():
+    """Compute the sort keys for the names of all the apps."""
+    ids = Webapp.with_deleted.values_list('id', flat=True)
+    for chunk in chunked(ids, 100):
+        _task.delay(chunk)
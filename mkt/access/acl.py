@@ -1,18 +1,81 @@
+from django.core.cache import cache
+
 import amo
+from amo.utils import cache_ns_key
+
+
+class Permissions(object):
+    """
+    The rules of a set of groups, parsed once into a dict of the actions
+    allowed for each app, so that checking a permission is a couple of
+    lookups.
+    """
+
+    def __init__(self, rules=()):
+        self.actions = {}
+        for rule in rules:
+            for part in rule.split(','):
+                rule_app, rule_action = part.split(':')
+                self.actions.setdefault(rule_app, set()).add(rule_action)
+
+    def allows(self, app, action):
+        """
+        'Admin:%' is true if the rules include any of:
+        ('Admin:*', 'Admin:%s'%whatever, '*:*',).
+        """
+        for rule_app in (app, '*'):
+            actions = self.actions.get(rule_app)
+            if actions and ('*' in actions or action in actions or
+                            action == '%'):
+                return True
+        return False
 
 
 def match_rules(rules, app, action):
     """
     This will match rules found in Group.
     """
-    for rule in rules.split(','):
-        rule_app, rule_action = rule.split(':')
-        if rule_app == '*' or rule_app == app:
-            if (rule_action == '*'
-                or rule_action == action
-                or action == '%'):
-                return True
-    return False
+    return Permissions([rules]).allows(app, action)
+
+
+def permissions_key(user_id):
+    return 'acl:permissions:%s:%s' % (
+        cache_ns_key('acl:user:%s' % user_id), cache_ns_key('acl:groups'))
+
+
+def get_permissions(user):
+    """
+    Returns the compiled Permissions for all of the user's groups, cached
+    until their groups or any group's rules change.
+    """
+    if not user or not user.is_authenticated():
+        return Permissions()
+    key = permissions_key(user.pk)
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = Permissions(user.groups.values_list('rules', flat=True))
+        cache.set(key, permissions)
+    return permissions
+
+
+def invalidate_user_permissions(user_id):
+    cache_ns_key('acl:user:%s' % user_id, increment=True)
+
+
+def invalidate_group_permissions():
+    cache_ns_key('acl:groups', increment=True)
+
+
+def request_permissions(request):
+    """
+    Returns the Permissions for the request, as set up by ACLMiddleware,
+    or compiled from `request.groups` for requests that were not.
+    """
+    permissions = getattr(request, 'permissions', None)
+    if not isinstance(permissions, Permissions):
+        permissions = Permissions(group.rules for group in
+                                  getattr(request, 'groups', ()))
+    return permissions
 
 
 def action_allowed(request, app, action):
@@ -22,16 +85,12 @@ def action_allowed(request, app, action):
     'Admin:%' is true if the user has any of:
     ('Admin:*', 'Admin:%s'%whatever, '*:*',) as rules.
     """
-    allowed = any(match_rules(group.rules, app, action) for group in
-                  getattr(request, 'groups', ()))
-    return allowed
+    return request_permissions(request).allows(app, action)
 
 
 def action_allowed_user(user, app, action):
     """Similar to action_allowed, but takes user instead of request."""
-    allowed = any(match_rules(group.rules, app, action) for group in
-                  user.groups.all())
-    return allowed
+    return get_permissions(user).allows(app, action)
 
 
 def check_ownership(request, obj, require_owner=False, require_author=False,
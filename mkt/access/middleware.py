@@ -4,6 +4,8 @@ their ACLs into the request.
 """
 from functools import partial
 
+from django.utils.functional import SimpleLazyObject
+
 import commonware.log
 
 import amo
@@ -23,6 +25,8 @@ class ACLMiddleware(object):
         if request.user.is_authenticated():
             amo.set_user(request.user)
             request.groups = request.user.groups.all()
+            request.permissions = SimpleLazyObject(
+                partial(acl.get_permissions, request.user))
 
     def process_response(self, request, response):
         amo.set_user(None)
@@ -5,6 +5,7 @@ from django.db.models import signals
 import commonware.log
 
 import amo
+from mkt.access import acl
 from mkt.site.models import ModelBase
 
 log = commonware.log.getLogger('z.users')
@@ -37,6 +38,7 @@ class GroupUser(models.Model):
 @dispatch.receiver(signals.post_save, sender=GroupUser,
                    dispatch_uid='groupuser.post_save')
 def groupuser_post_save(sender, instance, **kw):
+    acl.invalidate_user_permissions(instance.user_id)
     if kw.get('raw'):
         return
 
@@ -47,8 +49,17 @@ def groupuser_post_save(sender, instance, **kw):
 @dispatch.receiver(signals.post_delete, sender=GroupUser,
                    dispatch_uid='groupuser.post_delete')
 def groupuser_post_delete(sender, instance, **kw):
+    acl.invalidate_user_permissions(instance.user_id)
     if kw.get('raw'):
         return
 
     amo.log(amo.LOG.GROUP_USER_REMOVED, instance.group, instance.user)
     log.info('Removed %s from %s' % (instance.user, instance.group))
+
+
+@dispatch.receiver(signals.post_save, sender=Group,
+                   dispatch_uid='group.post_save')
+@dispatch.receiver(signals.post_delete, sender=Group,
+                   dispatch_uid='group.post_delete')
+def group_changed(sender, instance, **kw):
+    acl.invalidate_group_permissions()
@@ -11,7 +11,8 @@ from mkt.webapps.models import Webapp
 from mkt.users.models import UserProfile
 
 from .acl import (action_allowed, check_addon_ownership, check_ownership,
-                  check_reviewer, match_rules)
+                  check_reviewer, get_permissions, match_rules, Permissions)
+from .models import Group
 
 
 class ACLTestCase(amo.tests.TestCase):
@@ -56,6 +57,50 @@ class ACLTestCase(amo.tests.TestCase):
         self.assertLoginRedirects(r, url)
 
 
+class TestPermissions(amo.tests.TestCase):
+    fixtures = fixture('user_999')
+
+    def setUp(self):
+        self.user = UserProfile.objects.get(pk=999)
+
+    def test_allows(self):
+        permissions = Permissions(['Apps:Edit,Stats:*', 'Admin:Foo'])
+        assert permissions.allows('Apps', 'Edit')
+        assert permissions.allows('Apps', '%')
+        assert permissions.allows('Stats', 'View')
+        assert permissions.allows('Admin', '%')
+        assert not permissions.allows('Apps', 'Review')
+        assert not permissions.allows('Users', '%')
+        assert Permissions(['*:*']).allows('Users', 'Edit')
+        assert Permissions(['*:Edit']).allows('Users', 'Edit')
+        assert not Permissions(['*:Edit']).allows('Users', 'View')
+        assert not Permissions().allows('Users', '%')
+
+    def test_anonymous(self):
+        assert not get_permissions(AnonymousUser()).allows('Apps', '%')
+
+    def test_cached(self):
+        self.grant_permission(self.user, 'Apps:Review')
+        assert get_permissions(self.user).allows('Apps', 'Review')
+        with self.assertNumQueries(0):
+            assert get_permissions(self.user).allows('Apps', 'Review')
+
+    def test_group_membership_changed(self):
+        assert not get_permissions(self.user).allows('Apps', 'Review')
+        self.grant_permission(self.user, 'Apps:Review')
+        assert get_permissions(self.user).allows('Apps', 'Review')
+        self.remove_permission(self.user, 'Apps:Review')
+        assert not get_permissions(self.user).allows('Apps', 'Review')
+
+    def test_group_rules_changed(self):
+        self.grant_permission(self.user, 'Apps:Review')
+        assert not get_permissions(self.user).allows('Apps', 'Edit')
+        group = Group.objects.get(rules='Apps:Review')
+        group.rules = 'Apps:Edit'
+        group.save()
+        assert get_permissions(self.user).allows('Apps', 'Edit')
+
+
 class TestHasPerm(amo.tests.TestCase):
     fixtures = fixture('group_admin', 'user_999', 'user_admin',
                        'user_admin_group', 'webapp_337141')
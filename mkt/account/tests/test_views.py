@@ -393,6 +393,13 @@ class TestLoginHandler(TestCase):
         eq_(data['apps']['purchased'], [])
         eq_(data['apps']['developed'], [])
 
+    def test_login_over_other_user(self):
+        # The permissions are for the user logging in, not the session's.
+        self.login(UserProfile.objects.create(email='other@mozilla.com'))
+        profile = UserProfile.objects.create(email='cvan@mozilla.com')
+        self.grant_permission(profile, 'Apps:Review')
+        ok_(self._test_login()['permissions']['reviewer'])
+
     @patch('mkt.users.models.UserProfile.purchase_ids')
     def test_relevant_apps(self, purchase_ids):
         profile = UserProfile.objects.create(email='cvan@mozilla.com')
@@ -31,6 +31,7 @@ from mkt.users.models import UserProfile
 from mkt.users.tasks import send_fxa_mail
 from mkt.users.views import browserid_authenticate
 
+from mkt.access import acl
 from mkt.account.serializers import (AccountSerializer, AccountInfoSerializer,
                                      FeedbackSerializer, FxALoginSerializer,
                                      LoginSerializer, NewsletterSerializer,
@@ -218,6 +219,8 @@ class FxALoginView(CORSMixin, CreateAPIViewWithoutModel):
 
         request.user = profile
         request.groups = profile.groups.all()
+        # The permissions the middleware set up were for the previous user.
+        request.permissions = acl.get_permissions(profile)
         # We want to return completely custom data, not the serializer's.
         data = {
             'error': None,
@@ -279,6 +282,8 @@ class LoginView(CORSMixin, CreateAPIViewWithoutModel):
 
         request.user = profile
         request.groups = profile.groups.all()
+        # The permissions the middleware set up were for the previous user.
+        request.permissions = acl.get_permissions(profile)
 
         auth.login(request, profile)
         profile.log_login_attempt(True)  # TODO: move this to the signal.
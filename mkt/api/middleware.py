@@ -24,6 +24,7 @@ from oauthlib.oauth1.rfc5849 import signature
 
 from mkt.api.models import Access, ACCESS_TOKEN, Token
 from mkt.api.oauth import server, validator
+from mkt.api.principal import get_principal
 from mkt.carriers import get_carrier
 from mkt.users.models import UserProfile
 
@@ -77,12 +78,9 @@ class RestOAuthMiddleware(object):
                 log.error(u'Cannot find APIAccess token with that key: %s'
                           % oauth_req.attempted_key)
                 return
-            uid = Token.objects.filter(
-                token_type=ACCESS_TOKEN,
-                key=oauth_req.resource_owner_key).values_list(
-                    'user_id', flat=True)[0]
-            request.user = UserProfile.objects.select_related(
-                'user').get(pk=uid)
+            request.user, roles = get_principal(
+                'oauth3', oauth_req.resource_owner_key,
+                lambda: load_token_user(oauth_req.resource_owner_key))
         else:
             # This is 2-legged OAuth.
             log.info('Trying 2 legged OAuth')
@@ -97,15 +95,11 @@ class RestOAuthMiddleware(object):
             except ValueError:
                 log.error('ValueError on verifying_request', exc_info=True)
                 return
-            uid = Access.objects.filter(
-                key=client_key).values_list(
-                    'user_id', flat=True)[0]
-            request.user = UserProfile.objects.select_related(
-                'user').get(pk=uid)
+            request.user, roles = get_principal(
+                'oauth2', client_key, lambda: load_access_user(client_key))
 
         # But you cannot have one of these roles.
         denied_groups = set(['Admins'])
-        roles = set(request.user.groups.values_list('name', flat=True))
         if roles and roles.intersection(denied_groups):
             log.info(u'Attempt to use API with denied role, user: %s'
                      % request.user.pk)
@@ -119,6 +113,20 @@ class RestOAuthMiddleware(object):
         log.info('Successful OAuth with user: %s' % request.user)
 
 
+def load_token_user(key):
+    """Returns the user for a 3-legged OAuth access token key."""
+    uid = Token.objects.filter(token_type=ACCESS_TOKEN, key=key).values_list(
+        'user_id', flat=True)[0]
+    return UserProfile.objects.select_related('user').get(pk=uid)
+
+
+def load_access_user(key):
+    """Returns the user for a 2-legged OAuth client key."""
+    uid = Access.objects.filter(key=key).values_list(
+        'user_id', flat=True)[0]
+    return UserProfile.objects.select_related('user').get(pk=uid)
+
+
 class TwoLeggedOAuthError(Exception):
     pass
 
@@ -181,7 +189,10 @@ class RestSharedSecretMiddleware(object):
                                consumer_id, hashlib.sha512).hexdigest() == hm
             if matches:
                 try:
-                    request.user = UserProfile.objects.get(email=email)
+                    request.user = get_principal(
+                        'secret', auth,
+                        lambda: UserProfile.objects.get(email=email),
+                        with_roles=False)[0]
                     request.authed_from.append('RestSharedSecret')
                 except UserProfile.DoesNotExist:
                     log.info('Auth token matches absent user (%s)' % email)
@@ -1,10 +1,14 @@
 import os
 import time
 
+from django.contrib.auth.signals import user_logged_out
 from django.db import models
+from django.dispatch import receiver
 
 from aesfield.field import AESField
 
+from mkt.access.models import GroupUser
+from mkt.api.principal import invalidate_principal, invalidate_user_principals
 from mkt.site.models import ModelBase
 from mkt.users.models import UserProfile
 
@@ -64,3 +68,39 @@ class Nonce(ModelBase):
 
 def generate():
     return os.urandom(64).encode('hex')
+
+
+@receiver(models.signals.post_save, sender=Access,
+          dispatch_uid='api_access_principal')
+@receiver(models.signals.post_delete, sender=Access,
+          dispatch_uid='api_access_principal_delete')
+def invalidate_access_principal(sender, instance, **kw):
+    invalidate_principal('oauth2', instance.key)
+
+
+@receiver(models.signals.post_save, sender=Token,
+          dispatch_uid='api_token_principal')
+@receiver(models.signals.post_delete, sender=Token,
+          dispatch_uid='api_token_principal_delete')
+def invalidate_token_principal(sender, instance, **kw):
+    invalidate_principal('oauth3', instance.key)
+
+
+@receiver(models.signals.post_save, sender=GroupUser,
+          dispatch_uid='api_groupuser_principal')
+@receiver(models.signals.post_delete, sender=GroupUser,
+          dispatch_uid='api_groupuser_principal_delete')
+def invalidate_groupuser_principals(sender, instance, **kw):
+    invalidate_user_principals(instance.user_id)
+
+
+@receiver(models.signals.post_save, sender=UserProfile,
+          dispatch_uid='api_user_principal')
+def invalidate_user_principal(sender, instance, **kw):
+    invalidate_user_principals(instance.pk)
+
+
+@receiver(user_logged_out, dispatch_uid='api_logout_principal')
+def invalidate_logout_principals(sender, request, user, **kw):
+    if user:
+        invalidate_user_principals(user.pk)
@@ -0,0 +1,79 @@
+"""
+Stores for the OAuth nonces seen by the API, to refuse replayed requests.
+
+A nonce only has to be remembered for as long as its timestamp would be
+accepted, so the default store keeps them in the cache with a TTL and an
+atomic add. The `oauth_nonce` table is kept as a fallback for when the cache
+is unavailable, and can be used on its own by setting OAUTH_NONCE_STORE to
+'mkt.api.nonces.DBNonceStore'.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.importlib import import_module
+
+import commonware.log
+
+
+log = commonware.log.getLogger('z.api')
+
+_store = None
+
+
+class DBNonceStore(object):
+    """Remembers nonces as rows in the `oauth_nonce` table."""
+
+    def add(self, client_key, timestamp, nonce, request_token=None,
+            access_token=None):
+        # Circular import.
+        from mkt.api.models import Nonce
+        n, created = Nonce.objects.safer_get_or_create(
+            defaults={'client_key': client_key},
+            nonce=nonce, timestamp=timestamp,
+            request_token=request_token,
+            access_token=access_token)
+        return created
+
+
+class CacheNonceStore(object):
+    """
+    Remembers nonces in the cache for OAUTH_NONCE_TTL seconds, falling back
+    to the database if the cache can't be reached.
+    """
+
+    def __init__(self):
+        self.fallback = DBNonceStore()
+
+    def key(self, *parts):
+        parts = u':'.join(u'%s' % (p or '') for p in parts).encode('utf8')
+        return 'oauth:nonce:%s' % hashlib.sha1(parts).hexdigest()
+
+    def add(self, client_key, timestamp, nonce, request_token=None,
+            access_token=None):
+        key = self.key(client_key, timestamp, nonce, request_token,
+                       access_token)
+        try:
+            if cache.add(key, 1, settings.OAUTH_NONCE_TTL):
+                return True
+            # The memcached clients don't raise when the server is down, the
+            # add just fails. If the nonce isn't there, it wasn't seen.
+            if cache.get(key) is not None:
+                return False
+            log.error('Could not store OAuth nonce in the cache, '
+                      'using the database')
+        except Exception:
+            log.error('Could not store OAuth nonce in the cache, '
+                      'using the database', exc_info=True)
+        return self.fallback.add(client_key, timestamp, nonce,
+                                 request_token=request_token,
+                                 access_token=access_token)
+
+
+def get_store():
+    """Returns the nonce store configured by OAUTH_NONCE_STORE."""
+    global _store
+    if _store is None:
+        module, cls = settings.OAUTH_NONCE_STORE.rsplit('.', 1)
+        _store = getattr(import_module(module), cls)()
+    return _store
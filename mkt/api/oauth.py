@@ -10,7 +10,8 @@ from oauthlib import oauth1
 from oauthlib.common import safe_string_equals
 
 from amo.utils import urlparams
-from mkt.api.models import Access, Nonce, Token, REQUEST_TOKEN, ACCESS_TOKEN
+from mkt.api.models import Access, Token, REQUEST_TOKEN, ACCESS_TOKEN
+from mkt.api.nonces import get_store
 from mkt.site.decorators import login_required
 
 
@@ -69,12 +70,9 @@ class MarketplaceOAuthRequestValidator(oauth1.RequestValidator):
     def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
                                      request, request_token=None,
                                      access_token=None):
-        n, created = Nonce.objects.safer_get_or_create(
-            defaults={'client_key': client_key},
-            nonce=nonce, timestamp=timestamp,
-            request_token=request_token,
-            access_token=access_token)
-        return created
+        return get_store().add(client_key, timestamp, nonce,
+                               request_token=request_token,
+                               access_token=access_token)
 
     def validate_requested_realms(self, client_key, realms, request):
         return True
@@ -0,0 +1,61 @@
+"""
+A short lived cache of who API credentials belong to.
+
+Authenticating an API request otherwise looks up the token or access record,
+the user and the user's groups on every request. Entries are keyed by the
+credential and hold the user and their group names for
+API_PRINCIPAL_CACHE_TIMEOUT seconds.
+
+Entries for a credential are dropped when it is revoked, and all the entries
+for a user are dropped by bumping a per-user namespace when they log out,
+change groups or are saved.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from amo.utils import cache_ns_key
+
+
+def principal_key(kind, identity):
+    return 'api:principal:%s:%s' % (kind, hashlib.sha1(identity).hexdigest())
+
+
+def user_namespace(user_id, increment=False):
+    return cache_ns_key('api:principal:user:%s' % user_id, increment)
+
+
+def get_principal(kind, identity, load_user, with_roles=True):
+    """
+    Returns the user and the set of their group names for the credential
+    `identity` of type `kind`, from the cache if possible, otherwise by
+    calling `load_user`. Any exception raised by `load_user` is passed on
+    and nothing is cached.
+
+    If `with_roles` is False, the groups aren't looked up and are None.
+    """
+    key = principal_key(kind, identity)
+    entry = cache.get(key)
+    if (entry and (entry['roles'] is not None or not with_roles) and
+            entry['ns'] == user_namespace(entry['user'].pk)):
+        return entry['user'], entry['roles']
+
+    user = load_user()
+    roles = (set(user.groups.values_list('name', flat=True)) if with_roles
+             else None)
+    if settings.API_PRINCIPAL_CACHE_TIMEOUT:
+        cache.set(key, {'user': user, 'roles': roles,
+                        'ns': user_namespace(user.pk)},
+                  settings.API_PRINCIPAL_CACHE_TIMEOUT)
+    return user, roles
+
+
+def invalidate_principal(kind, identity):
+    """Forget the user for a credential, eg: when it is revoked."""
+    cache.delete(principal_key(kind, identity))
+
+
+def invalidate_user_principals(user_id):
+    """Forget all the credentials for a user."""
+    user_namespace(user_id, increment=True)
@@ -73,6 +73,28 @@ class TestRestOAuthAuthentication(TestCase):
         self.add_group_user(self.profile, 'App Reviewers')
         ok_(self.auth.authenticate(Request(self.call())))
 
+    @patch('mkt.api.middleware.load_access_user')
+    def test_principal_cached(self, load_access_user):
+        load_access_user.return_value = self.profile
+        eq_(self.call().user, self.profile)
+        eq_(self.call().user, self.profile)
+        eq_(load_access_user.call_count, 1)
+
+    def test_principal_group_added(self):
+        ok_(self.auth.authenticate(Request(self.call())))
+        self.add_group_user(self.profile, 'Admins')
+        ok_(not self.auth.authenticate(Request(self.call())))
+
+    def test_principal_access_revoked(self):
+        ok_(self.auth.authenticate(Request(self.call())))
+        self.access.delete()
+        ok_(not self.auth.authenticate(Request(self.call())))
+
+    def test_principal_user_saved(self):
+        self.call()
+        self.profile.update(display_name='changed')
+        eq_(self.call().user.display_name, 'changed')
+
 
 class TestRestAnonymousAuthentication(TestCase):
 
@@ -146,6 +168,24 @@ class TestSharedSecretAuthentication(TestCase):
         ok_(not self.auth.authenticate(Request(req)))
         ok_(not req.user.is_authenticated())
 
+    @patch('mkt.api.middleware.UserProfile.objects.get')
+    def test_session_auth_cached(self, get):
+        get.return_value = self.profile
+        for x in range(2):
+            req = RequestFactory().post(
+                '/api/',
+                HTTP_AUTHORIZATION='mkt-shared-secret '
+                'cfinke@m.com,56b6f1a3dd735d962c56'
+                'ce7d8f46e02ec1d4748d2c00c407d75f0969d08bb'
+                '9c68c31b3371aa8130317815c89e5072e31bb94b4'
+                '121c5c165f3515838d4d6c60c4,165d631d3c3045'
+                '458b4516242dad7ae')
+            req.user = AnonymousUser()
+            for m in self.middlewares:
+                m().process_request(req)
+            eq_(req.user.pk, self.profile.pk)
+        eq_(get.call_count, 1)
+
     def test_session_auth_no_post(self):
         req = RequestFactory().post('/api/')
         req.user = AnonymousUser()
@@ -7,6 +7,7 @@ from decimal import Decimal
 from StringIO import StringIO
 
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
 
 from mock import patch
 from nose.tools import eq_
@@ -588,6 +589,17 @@ class TestListHandler(CreateHandler, AMOPaths):
         pks = set([data['objects'][0]['id'], data['objects'][1]['id']])
         eq_(pks, set([app.pk for app in apps]))
 
+    @override_settings(WEBAPP_EXCLUSIONS_CACHE_TIMEOUT=60)
+    def test_excluded(self):
+        apps = self.create_apps([2519], [2519])
+        apps[1].addonexcludedregion.create(region=regions.BR.id)
+        res = self.client.get(self.list_url, data={'region': 'br'})
+        data = json.loads(res.content)
+        eq_(data['meta']['total_count'], 1)
+        eq_(data['objects'][0]['id'], apps[0].pk)
+        res = self.client.get(self.list_url, data={'region': 'us'})
+        eq_(json.loads(res.content)['meta']['total_count'], 2)
+
     def test_lang(self):
         app = app_factory(description={'fr': 'Le blah', 'en-US': 'Blah'})
         url = reverse('app-detail', args=[app.pk])
@@ -599,8 +611,10 @@ class TestListHandler(CreateHandler, AMOPaths):
         eq_(json.loads(res.content)['description'], 'Le blah')
 
 
+@override_settings(WEBAPP_GRAPH_CACHE_TIMEOUT=60,
+                   WEBAPP_DETAIL_CACHE_TIMEOUT=60)
 class TestAppDetail(RestOAuth):
-    fixtures = fixture('user_2519', 'webapp_337141')
+    fixtures = fixture('user_2519', 'user_999', 'webapp_337141')
 
     def setUp(self, api_name='apps'):
         super(TestAppDetail, self).setUp()
@@ -627,6 +641,7 @@ class TestAppDetail(RestOAuth):
         res = self.client.get(url)
         eq_(res.status_code, 404)
 
+    @override_settings(WEBAPP_EXCLUSIONS_CACHE_TIMEOUT=60)
     def test_nonregion(self):
         self.app.addonexcludedregion.create(region=regions.BR.id)
         self.app.support_url = u'http://www.example.com/fake_support_url'
@@ -638,6 +653,7 @@ class TestAppDetail(RestOAuth):
         eq_(data['support_email'], 'foo@bar.com')
         eq_(data['support_url'], 'http://www.example.com/fake_support_url')
 
+    @override_settings(WEBAPP_EXCLUSIONS_CACHE_TIMEOUT=60)
     def test_owner_nonregion(self):
         AddonUser.objects.create(addon_id=337141, user_id=self.user.pk)
         AddonExcludedRegion.objects.create(addon_id=337141,
@@ -667,6 +683,35 @@ class TestAppDetail(RestOAuth):
         data = json.loads(res.content)
         eq_(data['tags'], ['example1', 'example2'])
 
+    def test_cached(self):
+        eq_(self.client.get(self.get_url).json['public_stats'], False)
+        self.app.update(public_stats=True)
+        eq_(self.client.get(self.get_url).json['public_stats'], True)
+
+    def test_cached_queryset_updated(self):
+        # By id, the app itself comes from Webapp.get_cached.
+        url = reverse('app-detail', kwargs={'pk': self.app.pk})
+        eq_(self.client.get(url).json['public_stats'], False)
+        Webapp.objects.filter(pk=self.app.pk).update(public_stats=True)
+        eq_(self.client.get(url).json['public_stats'], True)
+
+    def test_cached_user(self):
+        eq_(self.client.get(self.get_url).json['user']['developed'], False)
+        AddonUser.objects.create(addon=self.app, user=self.profile)
+        eq_(self.client.get(self.get_url).json['user']['developed'], True)
+
+    def test_cached_user_not_shared(self):
+        AddonUser.objects.create(addon=self.app, user=self.profile)
+        eq_(self.client.get(self.get_url).json['user']['developed'], True)
+        access = Access.objects.create(key='otherClientKeyForTests',
+                                       secret=generate(),
+                                       user=UserProfile.objects.get(pk=999))
+        other = RestOAuthClient(access)
+        # The cached response doesn't have the first user's fields.
+        eq_(other.get(self.get_url).json['user']['developed'], False)
+        eq_(self.client.get(self.get_url).json['user']['developed'], True)
+        eq_(self.anon.get(self.get_url).json.get('user'), None)
+
     def test_banner_message(self):
         geodata = self.app.geodata
         geodata.banner_regions = [mkt.regions.BR.id, mkt.regions.AR.id]
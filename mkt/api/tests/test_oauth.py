@@ -10,6 +10,7 @@ from django.test.client import FakePayload
 from django.utils.encoding import iri_to_uri, smart_str
 
 from django_browserid.tests import mock_browserid
+from mock import patch
 from nose.tools import eq_, ok_
 from oauthlib import oauth1
 from pyquery import PyQuery as pq
@@ -20,7 +21,9 @@ from amo.helpers import urlparams
 from amo.tests import JSONClient, TestCase
 from mkt.api import authentication
 from mkt.api.middleware import RestOAuthMiddleware
-from mkt.api.models import Access, ACCESS_TOKEN, generate, REQUEST_TOKEN, Token
+from mkt.api.models import (Access, ACCESS_TOKEN, generate, Nonce,
+                            REQUEST_TOKEN, Token)
+from mkt.api.nonces import CacheNonceStore, DBNonceStore
 from mkt.api.tests import BaseAPI
 from mkt.site.fixtures import fixture
 from mkt.site.helpers import absolutify
@@ -369,3 +372,45 @@ class Test2LeggedOAuthFlow(TestCase):
         RestOAuthMiddleware().process_request(req)
         ok_(not auth.authenticate(Request(req)))
         ok_(not req.user.is_authenticated())
+
+
+class TestNonceStores(TestCase):
+
+    def test_cache(self):
+        store = CacheNonceStore()
+        ok_(store.add('key', 1, 'nonce'))
+        ok_(not store.add('key', 1, 'nonce'))
+        ok_(store.add('key', 1, 'nonce', access_token='token'))
+        ok_(store.add('key', 2, 'nonce'))
+        eq_(Nonce.objects.count(), 0)
+
+    @patch('mkt.api.nonces.cache.add')
+    def test_cache_unavailable(self, add):
+        add.side_effect = ValueError
+        store = CacheNonceStore()
+        ok_(store.add('key', 1, 'nonce'))
+        ok_(not store.add('key', 1, 'nonce'))
+        eq_(Nonce.objects.count(), 1)
+
+    @patch('mkt.api.nonces.cache')
+    def test_cache_unreachable(self, cache):
+        # The memcached clients return a failure instead of raising.
+        cache.add.return_value = False
+        cache.get.return_value = None
+        store = CacheNonceStore()
+        ok_(store.add('key', 1, 'nonce'))
+        ok_(not store.add('key', 1, 'nonce'))
+        eq_(Nonce.objects.count(), 1)
+
+    @patch('mkt.api.nonces.cache')
+    def test_cache_replay(self, cache):
+        cache.add.return_value = False
+        cache.get.return_value = 1
+        ok_(not CacheNonceStore().add('key', 1, 'nonce'))
+        eq_(Nonce.objects.count(), 0)
+
+    def test_db(self):
+        store = DBNonceStore()
+        ok_(store.add('key', 1, 'nonce'))
+        ok_(not store.add('key', 1, 'nonce'))
+        eq_(Nonce.objects.count(), 1)
@@ -12,6 +12,7 @@ from mkt.api.views import (CarrierViewSet, CategoryViewSet,
                            RegionViewSet, site_config)
 from mkt.collections.views import CollectionImageViewSet, CollectionViewSet
 from mkt.comm.urls import api_patterns as comm_api_patterns
+from mkt.detail.urls import api_patterns as detail_api_patterns
 from mkt.developers.urls import dev_api_patterns, payments_api_patterns
 from mkt.features.views import AppFeaturesList
 from mkt.receipts.urls import receipt_api_patterns
@@ -79,6 +80,7 @@ urlpatterns = patterns('',
     url('', include(abuse_api_patterns)),
     url('', include(account_api_patterns)),
     url('', include('mkt.installs.urls')),
+    url('', include(detail_api_patterns)),
     url('', include(reviewer_api_patterns)),
     url('', include('mkt.webpay.urls')),
     url('', include(dev_api_patterns)),
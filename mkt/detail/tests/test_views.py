@@ -4,6 +4,7 @@ import json
 import zipfile
 
 from django.core.files.storage import default_storage as storage
+from django.core.urlresolvers import reverse
 
 import mock
 from nose.tools import eq_
@@ -184,6 +185,30 @@ class TestPackagedManifest(amo.tests.TestCase):
         eq_(res.content, '')
         eq_(res.status_code, 304)
 
+    @mock.patch('mkt.webapps.models.Webapp.build_mini_manifest')
+    def test_conditional_get_cached(self, _mock):
+        _mock.return_value = self._mocked_json()
+        etag = self.client.get(self.url)['ETag']
+        with mock.patch('mkt.detail.views.get_object_or_404') as get_object:
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        eq_(res.status_code, 304)
+        eq_(res['ETag'], etag)
+        assert not get_object.called
+
+        self.app.update(status=amo.STATUS_DISABLED)
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        eq_(res.status_code, 404)
+
+    @mock.patch('mkt.webapps.models.Webapp.build_mini_manifest')
+    def test_validators_cached(self, _mock):
+        _mock.return_value = self._mocked_json()
+        etag = self.client.get(self.url)['ETag']
+        eq_(etag, '"%s"' % self.get_digest_from_manifest())
+        with mock.patch.object(Webapp, 'get_manifest_validators') as get_:
+            res = self.client.get(self.url)
+        eq_(res['ETag'], etag)
+        assert not get_.called
+
     @mock.patch('mkt.webapps.models.Webapp.get_cached_manifest')
     def test_logged_out(self, _mock):
         _mock.return_value = self._mocked_json()
@@ -205,3 +230,77 @@ class TestPackagedManifest(amo.tests.TestCase):
         _storage.size.return_value = 1234
         self.client.get(self.url)
         assert _sign.sign.called
+
+
+@mock.patch('mkt.webapps.models.Webapp.build_mini_manifest')
+class TestUpdateCheck(amo.tests.TestCase):
+    fixtures = fixture('webapp_337141')
+
+    def setUp(self):
+        self.app = Webapp.objects.get(pk=337141)
+        self.app.update(is_packaged=True)
+        self.url = reverse('app-update-check')
+        self.manifest_url = self.app.get_manifest_url()
+
+    def mini_manifest(self):
+        return json.dumps({'name': 'Packaged App', 'version': '1.0'})
+
+    def post(self, apps):
+        return self.client.post(self.url, json.dumps({'apps': apps}),
+                                content_type='application/json')
+
+    def get_etag(self):
+        return self.client.get(self.manifest_url)['ETag']
+
+    def test_has_cors(self, _mock):
+        self.assertCORS(self.post([]), 'post')
+
+    def test_current(self, _mock):
+        _mock.return_value = self.mini_manifest()
+        etag = self.get_etag()
+        with mock.patch.object(Webapp.objects, 'filter') as filter_:
+            res = self.post([{'manifest_url': self.manifest_url,
+                              'etag': etag}])
+        eq_(res.status_code, 200)
+        eq_(json.loads(res.content)['updates'], [])
+        assert not filter_.called
+
+    def test_updated(self, _mock):
+        _mock.return_value = self.mini_manifest()
+        res = self.post([{'manifest_url': self.manifest_url,
+                          'etag': 'old'}])
+        eq_(res.status_code, 200)
+        updates = json.loads(res.content)['updates']
+        eq_(len(updates), 1)
+        eq_(updates[0]['id'], self.app.pk)
+        eq_(updates[0]['manifest_url'], self.manifest_url)
+        eq_(updates[0]['manifest'], json.loads(self.mini_manifest()))
+        eq_('"%s"' % updates[0]['etag'], self.get_etag())
+
+    def test_version(self, _mock):
+        _mock.return_value = self.mini_manifest()
+        version = self.app.current_version.version
+        res = self.post([{'id': self.app.pk, 'version': version}])
+        eq_(json.loads(res.content)['updates'], [])
+        res = self.post([{'id': self.app.pk, 'version': '0.1'}])
+        eq_(json.loads(res.content)['updates'][0]['version'], version)
+
+    def test_not_public(self, _mock):
+        _mock.return_value = self.mini_manifest()
+        self.app.update(status=amo.STATUS_APPROVED)
+        res = self.post([{'id': self.app.pk, 'etag': 'old'}])
+        eq_(json.loads(res.content)['updates'], [])
+
+    def test_unknown(self, _mock):
+        res = self.post([{'id': 0, 'etag': 'old'},
+                         {'manifest_url': 'http://example.com/manifest.webapp',
+                          'etag': 'old'}])
+        eq_(res.status_code, 200)
+        eq_(json.loads(res.content)['updates'], [])
+
+    def test_invalid(self, _mock):
+        eq_(self.client.post(self.url, json.dumps({}),
+                             content_type='application/json').status_code,
+            400)
+        eq_(self.post(['nope']).status_code, 400)
+        eq_(self.post([{'id': self.app.pk}] * 201).status_code, 400)
@@ -1,5 +1,6 @@
-from django.conf.urls import include, patterns
+from django.conf.urls import include, patterns, url
 
+from mkt.detail.views import update_check
 from mkt.purchase.urls import app_purchase_patterns
 from mkt.receipts.urls import app_receipt_patterns
 
@@ -9,3 +10,7 @@ urlpatterns = patterns('',
     ('^purchase/', include(app_purchase_patterns)),
     ('^purchase/', include(app_receipt_patterns)),
 )
+
+api_patterns = patterns('',
+    url(r'^apps/updates/$', update_check, name='app-update-check'),
+)
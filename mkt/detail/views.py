@@ -1,20 +1,36 @@
-import hashlib
+import json
+import re
 
 from django import http
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
-from django.views.decorators.http import etag
+from django.views.decorators.http import condition
 
 import commonware.log
+from rest_framework.decorators import (authentication_classes,
+                                       parser_classes, permission_classes)
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
 import amo
+from amo.utils import not_modified
+from mkt.api.authentication import RestAnonymousAuthentication
+from mkt.api.base import cors_api_view
 from mkt.constants import MANIFEST_CONTENT_TYPE
 from mkt.site.decorators import allow_cross_site_request
 from mkt.webapps.decorators import app_view_factory
-from mkt.webapps.models import Webapp
+from mkt.webapps.models import manifest_validators_key, Webapp
 
 
 log = commonware.log.getLogger('z.detail')
 
+# The most apps that can be checked for updates in one request.
+MAX_UPDATE_CHECKS = 200
+
+MANIFEST_URL_RE = re.compile(r'/app/%s/manifest\.webapp' % amo.ADDON_UUID)
+
 
 addon_all_view = app_view_factory(qs=Webapp.objects.all)
 
@@ -26,29 +42,29 @@ def manifest(request, uuid):
     If not a packaged app, returns a 404.
 
     """
+    # Devices checking for updates send the ETag they have, which is usually
+    # still current, so answer those from the cache first.
+    if request.META.get('HTTP_IF_NONE_MATCH'):
+        validators = cache.get(manifest_validators_key(uuid))
+        response = validators and not_modified(request, validators['etag'])
+        if response:
+            return response
+
     addon = get_object_or_404(Webapp, guid=uuid, is_packaged=True)
     is_avail = addon.status in [amo.STATUS_PUBLIC, amo.STATUS_UNLISTED,
                                 amo.STATUS_BLOCKED]
-    is_owner = addon.authors.filter(pk=request.user.pk).exists()
     is_owner_avail = addon.status == amo.STATUS_APPROVED
-    package_etag = hashlib.sha256()
 
     if (addon.is_packaged and
         not addon.disabled_by_user and
-        (is_avail or (is_owner_avail and is_owner))):
+        (is_avail or (is_owner_avail and
+                      addon.authors.filter(pk=request.user.pk).exists()))):
 
         manifest_content = addon.get_cached_manifest()
-        package_etag.update(manifest_content)
+        validators = addon.get_cached_manifest_validators(manifest_content)
 
-        if addon.is_packaged:
-            # Update the hash with the content of the package itself.
-            package_file = addon.get_latest_file()
-            if package_file:
-                package_etag.update(package_file.hash)
-
-        manifest_etag = package_etag.hexdigest()
-
-        @etag(lambda r, a: manifest_etag)
+        @condition(etag_func=lambda r, a: validators['etag'],
+                   last_modified_func=lambda r, a: validators['modified'])
         def _inner_view(request, addon):
             response = http.HttpResponse(manifest_content,
                                          content_type=MANIFEST_CONTENT_TYPE)
@@ -58,3 +74,78 @@ def manifest(request, uuid):
 
     else:
         raise http.Http404
+
+
+@cors_api_view(['POST'])
+@authentication_classes([RestAnonymousAuthentication])
+@parser_classes([JSONParser])
+@permission_classes([AllowAny])
+def update_check(request):
+    """
+    Checks a device's packaged apps for updates in one request.
+
+    Takes a list of `apps`, each with the `manifest_url` or `id` of an app and
+    the `etag` of the mini-manifest the device has or its `version`. Returns
+    the apps that have been updated since, with their new mini-manifest.
+    """
+    apps = request.DATA.get('apps') if isinstance(request.DATA, dict) else None
+    if not isinstance(apps, list) or not all(isinstance(a, dict)
+                                             for a in apps):
+        raise ParseError('A list of apps is required.')
+    if len(apps) > MAX_UPDATE_CHECKS:
+        raise ParseError('Too many apps, the limit is %s.'
+                         % MAX_UPDATE_CHECKS)
+
+    checks = {}
+    by_id = {}
+    for app in apps:
+        match = MANIFEST_URL_RE.search(unicode(app.get('manifest_url') or ''))
+        if match:
+            checks[match.group('uuid')] = app
+        elif unicode(app.get('id', '')).isdigit():
+            by_id[int(app['id'])] = app
+    if by_id:
+        for pk, guid in (Webapp.objects.filter(pk__in=by_id, is_packaged=True)
+                         .values_list('pk', 'guid')):
+            checks[guid] = by_id[pk]
+
+    # Most apps are up to date, which the cached validators can tell.
+    cached = cache.get_many([manifest_validators_key(guid)
+                             for guid in checks])
+    changed = [guid for guid, app in checks.items()
+               if not is_current(app, cached.get(
+                   manifest_validators_key(guid)))]
+
+    updates = []
+    if changed:
+        for addon in Webapp.objects.filter(guid__in=changed,
+                                           is_packaged=True):
+            if not addon.has_public_manifest():
+                continue
+            manifest_content = addon.get_cached_manifest()
+            validators = addon.get_cached_manifest_validators(
+                manifest_content)
+            if (not validators['version'] or
+                    is_current(checks[addon.guid], validators)):
+                continue
+            updates.append({
+                'id': addon.pk,
+                'manifest_url': addon.get_manifest_url(),
+                'etag': validators['etag'],
+                'version': validators['version'],
+                'manifest': json.loads(manifest_content),
+            })
+    return Response({'updates': updates})
+
+
+def is_current(app, validators):
+    """
+    If the app a device checks for updates is up to date according to the
+    cached `validators` of its mini-manifest.
+    """
+    if not validators:
+        return False
+    etag = unicode(app.get('etag') or '').strip('"')
+    if etag:
+        return etag == validators['etag']
+    return unicode(app.get('version') or '') == validators.get('version')
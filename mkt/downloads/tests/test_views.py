@@ -73,5 +73,26 @@ class TestDownload(BasePackagedAppTest):
         eq_(res.status_code, 200)
         assert settings.XSENDFILE_HEADER in res
 
+    @mock.patch('lib.crypto.packaged.sign')
+    def test_conditional_get(self, sign):
+        etag = self.file.hash.split(':')[-1]
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH='"%s"' % etag)
+        eq_(res.status_code, 304)
+        eq_(res['ETag'], '"%s"' % etag)
+        assert not sign.called
+
+    @mock.patch.object(packaged, 'sign', mock_sign)
+    def test_conditional_get_cached(self):
+        etag = self.file.hash.split(':')[-1]
+        eq_(self.client.get(self.url).status_code, 200)
+        with mock.patch('mkt.downloads.views.get_object_or_404') as get_object:
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH='"%s"' % etag)
+        eq_(res.status_code, 304)
+        assert not get_object.called
+
+        self.file.update(status=amo.STATUS_PENDING)
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH='"%s"' % etag)
+        eq_(res.status_code, 404)
+
     def test_has_cors(self):
         self.assertCORS(self.client.get(self.url), 'get')
@@ -1,14 +1,16 @@
 from django import http
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 
 import commonware.log
 
 import amo
-from amo.utils import HttpResponseSendFile
+from amo.utils import HttpResponseSendFile, not_modified
 from mkt.access import acl
 from mkt.files.models import File
 from mkt.site.decorators import allow_cross_site_request
-from mkt.webapps.models import Webapp
+from mkt.webapps.models import (cache_download_etag, download_etag,
+                                download_etag_key, Webapp)
 
 
 log = commonware.log.getLogger('z.downloads')
@@ -16,6 +18,14 @@ log = commonware.log.getLogger('z.downloads')
 
 @allow_cross_site_request
 def download_file(request, file_id, type=None):
+    # Devices updating an app send the ETag of the package they have, which
+    # is usually still current, so answer those from the cache first.
+    if request.META.get('HTTP_IF_NONE_MATCH'):
+        response = not_modified(request,
+                                cache.get(download_etag_key(file_id)))
+        if response:
+            return response
+
     file = get_object_or_404(File, pk=file_id)
     webapp = get_object_or_404(Webapp, pk=file.version.addon_id,
                                is_packaged=True)
@@ -27,6 +37,11 @@ def download_file(request, file_id, type=None):
 
     # We treat blocked files like public files so users get the update.
     if file.status in [amo.STATUS_PUBLIC, amo.STATUS_BLOCKED]:
+        response = not_modified(request, download_etag(file))
+        if response:
+            return response
+        if not webapp.is_disabled:
+            cache_download_etag(file)
         path = webapp.sign_if_packaged(file.version_id)
 
     else:
@@ -38,4 +53,4 @@ def download_file(request, file_id, type=None):
 
     log.info('Downloading package: %s from %s' % (webapp.id, path))
     return HttpResponseSendFile(request, path, content_type='application/zip',
-                                etag=file.hash.split(':')[-1])
+                                etag=download_etag(file))
@@ -39,7 +39,7 @@ from mkt.reviewers.models import QUEUE_TARAKO
 from mkt.site.decorators import json_view, login_required, permission_required
 from mkt.users.models import UserProfile
 from mkt.webapps.indexers import WebappIndexer
-from mkt.webapps.models import Webapp
+from mkt.webapps.models import AppManifest, Webapp
 
 
 log = commonware.log.getLogger('z.lookup')
@@ -266,7 +266,11 @@ def app_summary(request, addon_id):
 
     permissions = {}
     if app.latest_version:
-        permissions = app.latest_version.manifest.get('permissions', {})
+        try:
+            permissions = (app.latest_version.manifest_json.permissions or
+                           {})
+        except AppManifest.DoesNotExist:
+            permissions = app.latest_version.manifest.get('permissions', {})
 
     return render(request, 'lookup/app_summary.html', {
         'abuse_reports': app.abuse_reports.count(), 'app': app,
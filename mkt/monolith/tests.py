@@ -10,11 +10,15 @@ from django.core.urlresolvers import reverse
 from django.test import client
 
 from amo.tests import TestCase
+from mkt.abuse.models import AbuseReport
 from mkt.api.tests.test_oauth import RestOAuth
+from mkt.ratings.models import Review
 from mkt.site.fixtures import fixture
+from mkt.users.models import UserProfile
+from mkt.webapps.models import Webapp
 
 from .models import MonolithRecord, record_stat
-from .views import daterange
+from .views import _get_query_result, daterange
 
 
 class RequestFactory(client.RequestFactory):
@@ -226,3 +230,59 @@ class TestDateRange(TestCase):
         eq_(len(range), 7)
         eq_(range[0], self.week_ago)
         ok_(self.today not in range)
+
+
+class TestQueryResult(TestCase):
+    fixtures = fixture('webapp_337141', 'user_2519')
+
+    def setUp(self):
+        self.app = Webapp.objects.get(pk=337141)
+        self.user = UserProfile.objects.get(pk=2519)
+        self.today = datetime.date.today()
+
+    def date(self, days):
+        return self.today - datetime.timedelta(days=days)
+
+    def review(self, days, rating):
+        review = Review.objects.create(addon=self.app, user=self.user,
+                                       rating=rating)
+        Review.objects.filter(pk=review.pk).update(
+            created=datetime.datetime.combine(self.date(days),
+                                              datetime.time(12)))
+
+    def test_slice(self):
+        self.review(3, 4)
+        self.review(3, 2)
+        self.review(1, 5)
+        self.review(10, 1)
+        data = _get_query_result('apps_ratings', self.date(5), self.today)
+        eq_([(d['recorded'], d['value']) for d in data],
+            [(self.date(3), {'count': 2, 'app-id': 337141}),
+             (self.date(1), {'count': 1, 'app-id': 337141})])
+        eq_(data[0]['key'], 'apps_ratings')
+        eq_(data[0]['user_hash'], None)
+
+    def test_slice_abuse_reports(self):
+        report = AbuseReport.objects.create(addon=self.app, message='bad')
+        AbuseReport.objects.filter(pk=report.pk).update(
+            created=self.date(2))
+        data = _get_query_result('apps_abuse_reports', self.date(5),
+                                 self.today)
+        eq_([(d['recorded'], d['value']) for d in data],
+            [(self.date(2), {'count': 1, 'app-id': 337141})])
+
+    def test_total(self):
+        self.review(10, 1)
+        self.review(2, 5)
+        data = _get_query_result('apps_average_rating', self.date(4),
+                                 self.today)
+        # Every day has the average of the ratings up until then.
+        eq_([(d['recorded'], d['value']['count']) for d in data],
+            [(self.date(4), 1.0), (self.date(3), 1.0), (self.date(2), 3.0),
+             (self.date(1), 3.0)])
+
+    @mock.patch('mkt.monolith.views._group_by_day')
+    def test_one_query(self, _group_by_day):
+        _group_by_day.return_value = []
+        _get_query_result('apps_ratings', self.date(90), self.today)
+        eq_(_group_by_day.call_count, 1)
@@ -1,7 +1,7 @@
 import datetime
 import logging
 
-from django.db.models import Avg, Count
+from django.db.models import Count, Sum
 from rest_framework import status
 from rest_framework.exceptions import ParseError
 from rest_framework.generics import ListAPIView
@@ -24,33 +24,17 @@ log = logging.getLogger('z.monolith')
 # apps/stats/tasks.py here.
 STATS = {
     'apps_ratings': {
-        'qs': Review.objects
-            .filter(editorreview=0)
-            .values('addon')
-            .annotate(count=Count('addon')),
+        'qs': Review.objects.filter(editorreview=0),
         'type': 'slice',
-        'field_map': {
-            'count': 'count',
-            'app-id': 'addon'},
     },
     'apps_average_rating': {
-        'qs': Review.objects
-            .filter(editorreview=0)
-            .values('addon')
-            .annotate(avg=Avg('rating')),
+        'qs': Review.objects.filter(editorreview=0),
         'type': 'total',
-        'field_map': {
-            'count': 'avg',
-            'app-id': 'addon'},
+        'field': 'rating',
     },
     'apps_abuse_reports': {
-        'qs': AbuseReport.objects
-            .values('addon')
-            .annotate(count=Count('addon')),
+        'qs': AbuseReport.objects.all(),
         'type': 'slice',
-        'field_map': {
-            'count': 'count',
-            'app-id': 'addon'},
     }
 }
 
@@ -60,12 +44,26 @@ def daterange(start, end):
         yield start + datetime.timedelta(n)
 
 
+def _group_by_day(qs, **aggregates):
+    """Aggregates `qs` by the day the objects were created and by app."""
+    day = 'DATE(%s.created)' % qs.model._meta.db_table
+    # Clear the ordering, Django would group by it as well.
+    return (qs.order_by().extra(select={'day': day})
+              .values('day', 'addon').annotate(**aggregates))
+
+
+def _record(key, day, count, app_id):
+    return {'key': key,
+            'recorded': day,
+            'user_hash': None,
+            'value': {'count': count, 'app-id': app_id}}
+
+
 def _get_query_result(key, start, end):
     # To do on-the-fly queries we have to produce results as if they
-    # were calculated daily, which means we need to iterate over each
-    # day in the range and perform an aggregation on this date.
-
-    data = []
+    # were calculated daily. Rather than running an aggregation for each
+    # day in the range, the objects are grouped by day and app in one
+    # query and the days are filled in here.
     today = datetime.date.today()
     stat = STATS[key]
 
@@ -75,27 +73,40 @@ def _get_query_result(key, start, end):
     if not end:
         end = today
 
+    qs = stat['qs'].filter(created__gte=start, created__lt=end)
+
+    if stat['type'] != 'total':
+        # Counts of the objects created on each day, days without any
+        # are left out.
+        rows = sorted(_group_by_day(qs, count=Count('addon')),
+                      key=lambda row: (row['day'], row['addon']))
+        return [_record(key, row['day'], row['count'], row['addon'])
+                for row in rows]
+
+    # If it's a totalling stat, each day has the average of all the objects
+    # up until that point in time. Start with the totals from before the
+    # range and add each day's to them.
+    field = stat['field']
+    aggregates = {'total': Sum(field), 'count': Count(field)}
+    totals = {}
+    before = (stat['qs'].filter(created__lt=start).order_by()
+              .values('addon').annotate(**aggregates))
+    for row in before:
+        totals[row['addon']] = [row['total'] or 0, row['count']]
+
+    days = {}
+    for row in _group_by_day(qs, **aggregates):
+        days.setdefault(row['day'], []).append(row)
+
+    data = []
     for day in daterange(start, end):
-        if stat['type'] == 'total':
-            # If it's a totalling queryset, we want to filter by the
-            # end date until the beginning of time to get the total
-            # objects up until this point in time.
-            date_filtered = stat['qs'].filter(
-                created__lt=(day + datetime.timedelta(days=1)))
-        else:
-            # Otherwise, we want to filter by both start/end to get
-            # counts on a specific day.
-            date_filtered = stat['qs'].filter(
-                created__gte=day,
-                created__lt=(day + datetime.timedelta(days=1)))
-
-        data.extend([{
-            'key': key,
-            'recorded': day,
-            'user_hash': None,
-            'value': {'count': d.get(stat['field_map']['count']),
-                      'app-id': d.get(stat['field_map']['app-id'])}}
-            for d in date_filtered])
+        for row in days.get(day, []):
+            app_totals = totals.setdefault(row['addon'], [0, 0])
+            app_totals[0] += row['total'] or 0
+            app_totals[1] += row['count']
+        data.extend(
+            _record(key, day, float(total) / count if count else None, app)
+            for app, (total, count) in sorted(totals.items()))
 
     return data
 
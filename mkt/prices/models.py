@@ -61,10 +61,6 @@ def price_key(data):
 
 class PriceManager(ManagerBase):
 
-    def get_query_set(self):
-        qs = super(PriceManager, self).get_query_set()
-        return qs.transform(Price.transformer)
-
     def active(self):
         return self.filter(active=True).order_by('price')
 
@@ -94,13 +90,6 @@ class Price(ModelBase):
         # Display the price in unamiguous USD, eg: 0.99 USD
         return '{0} USD'.format(self.price)
 
-    @staticmethod
-    def transformer(prices):
-        # There are a constrained number of price currencies, let's just
-        # get them all.
-        Price._currencies = dict((price_key(model_to_dict(p)), p)
-                                 for p in PriceCurrency.objects.all())
-
     def get_price_currency(self, carrier=None, region=None, provider=None):
         """
         Returns the PriceCurrency object or none.
@@ -114,20 +103,12 @@ class Price(ModelBase):
         # This is probably ok for now, because Bango is the default fall back
         # however we might need to think about this for the long term.
         provider = provider or PROVIDER_BANGO
-        if not hasattr(self, '_currencies'):
-            Price.transformer([])
 
         lookup = price_key({
             'tier': self.id, 'carrier': carrier,
             'provider': provider, 'region': region
         })
-
-        try:
-            price_currency = Price._currencies[lookup]
-        except KeyError:
-            return None
-
-        return price_currency
+        return get_price_table().currencies.get(lookup)
 
     def get_price_data(self, carrier=None, region=None, provider=None):
         """
@@ -165,7 +146,8 @@ class Price(ModelBase):
         """
         providers = [provider] if provider else default_providers()
         return [model_to_dict(o) for o in
-                self.pricecurrency_set.filter(provider__in=providers)]
+                get_price_table().tier_currencies.get(self.id, ())
+                if o.provider in providers]
 
     def regions_by_name(self, provider=None):
         """A list of price regions sorted by name.
@@ -288,6 +270,88 @@ def update_price_currency(sender, instance, **kw):
         index_webapps.delay(ids)
 
 
+PRICE_TABLE_KEY = 'prices:table:generation'
+
+_price_table = None
+
+
+class PriceTable(object):
+    """
+    A snapshot of all the price tiers and their currencies.
+
+    There are a constrained number of them and they rarely change, so each
+    process keeps them all in memory and only reloads them when the
+    generation in the cache moves on, see `get_price_table`. The objects in
+    the table are shared, don't change them.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.tiers = dict((p.id, p) for p in Price.objects.no_cache())
+
+        currencies = list(PriceCurrency.objects.no_cache().order_by('id'))
+        self.currencies = dict((price_key(model_to_dict(c)), c)
+                               for c in currencies)
+        tier_currencies = {}
+        paid = {}
+        for currency in currencies:
+            tier_currencies.setdefault(currency.tier_id, []).append(currency)
+            if currency.paid:
+                paid.setdefault((currency.tier_id, currency.provider),
+                                set()).add(currency.region)
+        self.tier_currencies = dict((tier, tuple(c)) for tier, c
+                                    in tier_currencies.items())
+        self.paid = dict((key, frozenset(regions)) for key, regions
+                         in paid.items())
+
+    def paid_regions(self, tiers, providers=None):
+        """
+        Returns a dict of tier id to the set of region ids each of the
+        `tiers` can be paid for in, with any of `providers`.
+
+        :param optional providers: a list of provider ids. Defaults to
+            settings.PAYMENT_PROVIDERS.
+        """
+        providers = providers or default_providers()
+        return dict((tier, frozenset().union(*[self.paid.get((tier, p), ())
+                                               for p in providers]))
+                    for tier in tiers)
+
+
+def get_price_table():
+    """
+    Returns the PriceTable, reloading it if the prices changed since it was
+    loaded.
+    """
+    global _price_table
+    generation = cache.get(PRICE_TABLE_KEY)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(PRICE_TABLE_KEY, generation, None):
+            generation = cache.get(PRICE_TABLE_KEY, generation)
+    if _price_table is None or _price_table.generation != generation:
+        _price_table = PriceTable(generation)
+    return _price_table
+
+
+def invalidate_price_table():
+    """Makes every process reload the PriceTable on its next use."""
+    cache.set(PRICE_TABLE_KEY, uuid.uuid4().hex, None)
+
+
+@receiver(models.signals.post_save, sender=Price,
+          dispatch_uid='price_table_save_price')
+@receiver(models.signals.post_delete, sender=Price,
+          dispatch_uid='price_table_delete_price')
+@receiver(models.signals.post_save, sender=PriceCurrency,
+          dispatch_uid='price_table_save_price_currency')
+@receiver(models.signals.post_delete, sender=PriceCurrency,
+          dispatch_uid='price_table_delete_price_currency')
+def price_table_changed(sender, **kw):
+    # Fixtures count too, the table has to pick them up.
+    invalidate_price_table()
+
+
 class AddonPurchase(ModelBase):
     addon = models.ForeignKey('webapps.Webapp')
     type = models.PositiveIntegerField(default=amo.CONTRIB_PURCHASE,
@@ -358,12 +422,15 @@ def create_addon_purchase(sender, instance, **kw):
             addon=instance.addon, install_type=install_type)
 
     elif instance.type in [amo.CONTRIB_REFUND, amo.CONTRIB_CHARGEBACK]:
+        from mkt.receipts.utils import invalidate_receipts  # Circular import
         purchases = AddonPurchase.objects.filter(addon=instance.addon,
                                                  user=instance.user)
         for p in purchases:
             log.debug('Changing addon purchase: %s, addon %s, user %s'
                       % (p.pk, instance.addon.pk, instance.user.pk))
             p.update(type=instance.type)
+            # Don't hand out stored receipts for a refunded purchase.
+            invalidate_receipts(instance.addon.pk, instance.user.pk, p.uuid)
 
     cache.delete(memoize_key('users:purchase-ids', instance.user.pk))
 
@@ -12,7 +12,8 @@ from mkt.constants import apps
 from mkt.constants.payments import PROVIDER_BANGO, PROVIDER_BOKU
 from mkt.constants.regions import (ALL_REGION_IDS, BR, HU, RESTOFWORLD, SPAIN,
                                    UK, US)
-from mkt.prices.models import AddonPremium, Price, PriceCurrency, Refund
+from mkt.prices.models import (AddonPremium, get_price_table, Price,
+                               PriceCurrency, Refund)
 from mkt.purchase.models import Contribution
 from mkt.site.fixtures import fixture
 from mkt.users.models import UserProfile
@@ -39,8 +40,6 @@ class TestPrice(amo.tests.TestCase):
 
     def setUp(self):
         self.tier_one = Price.objects.get(pk=1)
-        if hasattr(Price, '_currencies'):
-            del Price._currencies  # needed to pick up fixtures.
 
     def test_active(self):
         eq_(Price.objects.count(), 2)
@@ -84,12 +83,13 @@ class TestPrice(amo.tests.TestCase):
         eq_(Price.objects.get(pk=1).get_price(), Decimal('0.99'))
         eq_(Price.objects.get(pk=1).get_price_locale(), u'$0.99')
 
-    def test_transformer(self):
+    def test_price_table(self):
         price = Price.objects.get(pk=1)
         price.get_price_locale()
-        # Warm up Price._currencies.
+        # Warm up the price table.
         with self.assertNumQueries(0):
             eq_(price.get_price_locale(), u'$0.99')
+            eq_(len(price.prices()), 2)
 
     def test_get_tier_price(self):
         eq_(Price.objects.get(pk=2).get_price_locale(region=BR.id), 'R$1.01')
@@ -171,6 +171,38 @@ class TestPrice(amo.tests.TestCase):
                 PROVIDER_BANGO: [BR, SPAIN, RESTOFWORLD]})
 
 
+class TestPriceTable(amo.tests.TestCase):
+    fixtures = fixture('prices2')
+
+    def test_reloaded_on_change(self):
+        table = get_price_table()
+        eq_(get_price_table(), table)
+        PriceCurrency.objects.get(pk=3).update(price='2.00')
+        new = get_price_table()
+        ok_(new is not table)
+        eq_(new.tier_currencies[2][0].price, Decimal('2.00'))
+
+    def test_reloaded_on_delete(self):
+        table = get_price_table()
+        Price.objects.get(pk=1).delete()
+        ok_(1 in table.tiers)
+        ok_(1 not in get_price_table().tiers)
+
+    def test_paid_regions(self):
+        PriceCurrency.objects.get(pk=3).update(paid=False)
+        poland = PriceCurrency.objects.get(pk=1).region
+        eq_(get_price_table().paid_regions([1, 2]),
+            {1: frozenset([poland, RESTOFWORLD.id]),
+             2: frozenset([SPAIN.id, RESTOFWORLD.id])})
+
+    def test_paid_regions_providers(self):
+        eq_(get_price_table().paid_regions([2], [PROVIDER_BOKU]),
+            {2: frozenset([UK.id])})
+
+    def test_paid_regions_unknown_tier(self):
+        eq_(get_price_table().paid_regions([4999]), {4999: frozenset()})
+
+
 class TestPriceCurrencyChanges(amo.tests.TestCase):
 
     def setUp(self):
@@ -10,7 +10,10 @@ from nose.tools import eq_
 import amo
 import amo.tests
 from amo.tests import app_factory
-from mkt.receipts.utils import create_receipt, get_key
+from mkt.prices.models import AddonPurchase
+from mkt.purchase.models import Contribution
+from mkt.receipts.utils import (create_receipt, get_key, get_or_create_receipt,
+                                invalidate_receipts)
 from mkt.site.fixtures import fixture
 from mkt.site.helpers import absolutify
 from mkt.webapps.models import AddonUser, Installed, Webapp
@@ -89,6 +92,85 @@ class TestReceipt(amo.tests.TestCase):
                                  TEST_LEEWAY)
         eq_(receipt['reissue'], absolutify(reverse('receipt.reissue')))
 
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_receipt_reused(self, sign):
+        sign.return_value = 'signed'
+        eq_(get_or_create_receipt(self.app, self.user, 'some-uuid'), 'signed')
+        eq_(get_or_create_receipt(self.app, self.user, 'some-uuid'), 'signed')
+        eq_(sign.call_count, 1)
+
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_receipt_not_reused_other_user(self, sign):
+        sign.return_value = 'signed'
+        get_or_create_receipt(self.app, self.user, 'some-uuid')
+        get_or_create_receipt(self.app, self.other_user, 'other-uuid')
+        eq_(sign.call_count, 2)
+
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_receipt_not_reused_other_flavour(self, sign):
+        sign.return_value = 'signed'
+        AddonUser.objects.create(addon=self.app, user=self.user)
+        get_or_create_receipt(self.app, self.user, 'some-uuid')
+        get_or_create_receipt(self.app, self.user, 'some-uuid',
+                              flavour='developer')
+        eq_(sign.call_count, 2)
+
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_receipt_not_reused_after_purchase(self, sign):
+        sign.return_value = 'signed'
+        get_or_create_receipt(self.app, self.user, 'none')
+        purchase = AddonPurchase.objects.create(addon=self.app,
+                                                user=self.user)
+        get_or_create_receipt(self.app, self.user, purchase.uuid)
+        eq_(sign.call_args[0][0]['user']['value'], purchase.uuid)
+        eq_(sign.call_count, 2)
+
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_receipt_not_reused_other_url(self, sign):
+        sign.return_value = 'signed'
+        get_or_create_receipt(self.app, self.user, 'some-uuid')
+        self.app.update(is_packaged=True, app_domain='app://other.example.com')
+        get_or_create_receipt(self.app, self.user, 'some-uuid')
+        eq_(sign.call_count, 2)
+
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_receipt_not_reused_stale(self, sign):
+        sign.return_value = 'signed'
+        get_or_create_receipt(self.app, self.user, 'some-uuid')
+        later = (calendar.timegm(time.gmtime()) +
+                 settings.WEBAPPS_RECEIPT_EXPIRY_SECONDS)
+        with mock.patch('mkt.receipts.utils.calendar.timegm') as timegm:
+            timegm.return_value = later
+            get_or_create_receipt(self.app, self.user, 'some-uuid')
+        eq_(sign.call_count, 2)
+
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_receipt_reuse_disabled(self, sign):
+        sign.return_value = 'signed'
+        with self.settings(WEBAPPS_RECEIPT_REUSE_FRACTION=0):
+            get_or_create_receipt(self.app, self.user, 'some-uuid')
+            get_or_create_receipt(self.app, self.user, 'some-uuid')
+        eq_(sign.call_count, 2)
+
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_receipt_invalidated(self, sign):
+        sign.return_value = 'signed'
+        get_or_create_receipt(self.app, self.user, 'some-uuid')
+        invalidate_receipts(self.app.pk, self.user.pk)
+        get_or_create_receipt(self.app, self.user, 'some-uuid')
+        eq_(sign.call_count, 2)
+
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_receipt_invalidated_on_refund(self, sign):
+        sign.return_value = 'signed'
+        purchase = AddonPurchase.objects.create(addon=self.app,
+                                                user=self.user)
+        get_or_create_receipt(self.app, self.user, purchase.uuid)
+        Contribution.objects.create(addon=self.app, user=self.user,
+                                    type=amo.CONTRIB_REFUND)
+        get_or_create_receipt(self.app, self.user, purchase.uuid)
+        eq_(sign.call_count, 2)
+
     def test_receipt_not_reviewer(self):
         with self.assertRaises(ValueError):
             create_receipt(self.app, self.user, 'some-uuid',
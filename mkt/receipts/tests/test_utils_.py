@@ -1,6 +1,7 @@
 import calendar
 import time
 
+import mock
 from nose.tools import eq_
 
 from receipts.receipts import Receipt
@@ -29,3 +30,15 @@ class TestReissue(ReceiptTest):
             eq_(new[same], old[same], (
                 '{0} for new: {1} should be the same as old: {2}'.format(
                     greater, new[same], old[same])))
+
+    def test_reused(self):
+        receipt = sign(self.sample_app_receipt())
+        eq_(reissue_receipt(receipt), reissue_receipt(receipt))
+
+    @mock.patch('mkt.receipts.utils.sign')
+    def test_reused_signs_once(self, sign_):
+        sign_.return_value = 'signed'
+        receipt = sign(self.sample_app_receipt())
+        reissue_receipt(receipt)
+        reissue_receipt(receipt)
+        eq_(sign_.call_count, 1)
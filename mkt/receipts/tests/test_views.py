@@ -257,7 +257,7 @@ class TestReceiptIssue(amo.tests.TestCase):
         self.reviewer = UserProfile.objects.get(pk=5497308)
         self.user = UserProfile.objects.get(pk=999)
 
-    @mock.patch('mkt.receipts.views.create_receipt')
+    @mock.patch('mkt.receipts.views.get_or_create_receipt')
     def test_issued(self, create_receipt):
         create_receipt.return_value = 'foo'
         self.client.login(username=self.reviewer.email, password='password')
@@ -281,7 +281,7 @@ class TestReceiptIssue(amo.tests.TestCase):
         res = self.client.post(self.url)
         eq_(res.status_code, 403)
 
-    @mock.patch('mkt.receipts.views.create_receipt')
+    @mock.patch('mkt.receipts.views.get_or_create_receipt')
     def test_issued_developer(self, create_receipt):
         create_receipt.return_value = 'foo'
         AddonUser.objects.create(user=self.user, addon=self.app)
@@ -292,7 +292,7 @@ class TestReceiptIssue(amo.tests.TestCase):
         eq_(self.user.installed_set.all()[0].install_type,
             apps.INSTALL_TYPE_DEVELOPER)
 
-    @mock.patch('mkt.receipts.views.create_receipt')
+    @mock.patch('mkt.receipts.views.get_or_create_receipt')
     def test_unicode_name(self, create_receipt):
         """
         Regression test to ensure that the CEF log works. Pass through the
@@ -1,8 +1,10 @@
 import calendar
 import time
 from urllib import urlencode
+from urlparse import parse_qsl
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.urlresolvers import reverse
 
@@ -16,6 +18,10 @@ from mkt.access import acl
 from mkt.site.helpers import absolutify
 
 
+# Memcached treats timeouts of more than 30 days as absolute timestamps.
+MAX_REUSE_TIMEOUT = 60 * 60 * 24 * 30
+
+
 def get_uuid(app, user):
     """
     Returns a users uuid suitable for use in the receipt, by looking up
@@ -48,6 +54,89 @@ def create_receipt(webapp, user, uuid, flavour=None, contrib=None):
                                     contrib=contrib))
 
 
+def receipt_store_key(app_id, user_key, typ):
+    """
+    The key a signed receipt is stored under for reuse.
+
+    :params app_id: the app id.
+    :params user_key: the UserProfile pk for issued receipts, or the
+            directed identifier for reissued receipts.
+    :params typ: the receipt type, eg: purchase-receipt.
+    """
+    return 'receipts:store:%s:%s:%s' % (app_id, user_key, typ)
+
+
+def receipt_contents(data):
+    """The receipt `data`, without the timestamps that change each time."""
+    return dict((k, v) for k, v in data.items()
+                if k not in ('exp', 'iat', 'nbf'))
+
+
+def store_receipt(key, data, signed):
+    """
+    Store a signed receipt so that it can be handed out again until
+    WEBAPPS_RECEIPT_REUSE_FRACTION of its lifetime has passed.
+    """
+    timeout = min(int((data['exp'] - data['iat']) *
+                      settings.WEBAPPS_RECEIPT_REUSE_FRACTION),
+                  MAX_REUSE_TIMEOUT)
+    if timeout > 0:
+        cache.set(key, {'receipt': signed, 'iat': data['iat'],
+                        'exp': data['exp'],
+                        'contents': receipt_contents(data)}, timeout)
+
+
+def get_stored_receipt(key, data):
+    """
+    Return a stored receipt that is still fresh enough to reuse, if it has
+    the same contents as the receipt `data`, eg: the same directed
+    identifier.
+    """
+    stored = cache.get(key)
+    if not stored or stored.get('contents') != receipt_contents(data):
+        return None
+    reuse_until = stored['iat'] + ((stored['exp'] - stored['iat']) *
+                                   settings.WEBAPPS_RECEIPT_REUSE_FRACTION)
+    if calendar.timegm(time.gmtime()) >= reuse_until:
+        return None
+    return stored['receipt']
+
+
+def get_or_create_receipt(webapp, user, uuid, flavour=None):
+    """
+    Returns a signed receipt for the user and app, reusing a previously
+    signed one if it is still fresh enough. This saves a round trip to the
+    signing server when the same user reinstalls the same app.
+
+    Takes the same parameters as `create_receipt_data`. In-app receipts are
+    tied to a contribution and are not reused, use `create_receipt`.
+    """
+    data = create_receipt_data(webapp, user, uuid, flavour=flavour)
+    key = receipt_store_key(webapp.pk, user.pk, data['typ'])
+    signed = get_stored_receipt(key, data)
+    if signed:
+        return signed
+
+    signed = sign(data)
+    store_receipt(key, data, signed)
+    return signed
+
+
+def invalidate_receipts(app_id, user_id, uuid=None):
+    """
+    Drop any stored receipts for the app and user, eg: after a refund.
+
+    :params uuid: the directed identifier used in the user's receipts, so
+            that stored reissued receipts are dropped as well.
+    """
+    keys = []
+    for typ in ('purchase-receipt', 'developer-receipt', 'reviewer-receipt'):
+        keys.append(receipt_store_key(app_id, user_id, typ))
+        if uuid:
+            keys.append(receipt_store_key(app_id, 'reissue:%s' % uuid, typ))
+    cache.delete_many(keys)
+
+
 def create_receipt_data(webapp, user, uuid, flavour=None, contrib=None):
     """
     Creates receipt data for use in payments.
@@ -138,12 +227,28 @@ def reissue_receipt(receipt):
     time_ = calendar.timegm(time.gmtime())
     receipt_obj = Receipt(receipt)
     data = receipt_obj.receipt_decoded()
+
+    # Reuse a recent reissue of the same receipt if there is one.
+    storedata = dict(parse_qsl(data.get('product', {}).get('storedata', '')))
+    key = None
+    if 'id' in storedata and 'contrib' not in storedata:
+        key = receipt_store_key(
+            storedata['id'],
+            'reissue:%s' % data.get('user', {}).get('value'),
+            data.get('typ'))
+        signed = get_stored_receipt(key, data)
+        if signed:
+            return signed
+
     data.update({
         'exp': time_ + settings.WEBAPPS_RECEIPT_EXPIRY_SECONDS,
         'iat': time_,
         'nbf': time_,
     })
-    return sign(data)
+    signed = sign(data)
+    if key:
+        store_receipt(key, data, signed)
+    return signed
 
 
 @nottest
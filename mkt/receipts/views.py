@@ -31,8 +31,8 @@ from mkt.installs.utils import record as utils_record
 from mkt.installs.utils import install_type
 from mkt.prices.models import AddonPurchase
 from mkt.receipts import forms
-from mkt.receipts.utils import (create_receipt, create_test_receipt, get_uuid,
-                                reissue_receipt)
+from mkt.receipts.utils import (create_test_receipt, get_or_create_receipt,
+                                get_uuid, reissue_receipt)
 from mkt.reviewers.views import reviewer_required
 from mkt.site.decorators import json_view, write
 from mkt.users.models import UserProfile
@@ -84,7 +84,7 @@ def _record(request, addon):
         error = ''
         receipt_cef.log(request, addon, 'sign', 'Receipt requested')
         try:
-            receipt = create_receipt(addon, request.user, uuid)
+            receipt = get_or_create_receipt(addon, request.user, uuid)
         except SigningError:
             error = _('There was a problem installing the app.')
 
@@ -174,8 +174,8 @@ def issue(request, addon):
     receipt_cef.log(request, addon, 'sign', 'Receipt signing for %s' % flavour)
     receipt = None
     try:
-        receipt = create_receipt(addon, user, get_uuid(addon, user),
-                                 flavour=flavour)
+        receipt = get_or_create_receipt(addon, user, get_uuid(addon, user),
+                                        flavour=flavour)
     except SigningError:
         error = _('There was a problem installing the app.')
 
@@ -284,7 +284,7 @@ def install_record(obj, request, install_type):
     log.info('Creating receipt: %s' % obj.pk)
     receipt_cef.log(request._request, obj, 'sign', 'Receipt signing')
     uuid = get_uuid(installed.addon, installed.user)
-    return create_receipt(installed.addon, installed.user, uuid)
+    return get_or_create_receipt(installed.addon, installed.user, uuid)
 
 
 @cors_api_view(['POST'])
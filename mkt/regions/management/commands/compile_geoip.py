@@ -0,0 +1,29 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from lib.geoip.ranges import compile_ranges
+
+
+class Command(BaseCommand):
+    args = '<csv file> [<output file>]'
+    help = ('Compile a CSV of country IP ranges into the table used for '
+            'local GeoIP lookups. The output defaults to GEOIP_DB_PATH.')
+
+    def handle(self, *args, **kw):
+        if not 1 <= len(args) <= 2:
+            raise CommandError('Usage: compile_geoip %s' % self.args)
+        src = args[0]
+        dest = args[1] if len(args) > 1 else settings.GEOIP_DB_PATH
+        if not dest:
+            raise CommandError('No output file given and GEOIP_DB_PATH '
+                               'is not set.')
+
+        # Write to a temporary file and move it into place, so that running
+        # processes keep using their memory-mapped copy of the old table.
+        tmp = dest + '.tmp'
+        with open(src, 'rb') as fobj:
+            count = compile_ranges(fobj, tmp)
+        os.rename(tmp, dest)
+        self.stdout.write('Compiled %s ranges into %s' % (count, dest))
@@ -7,6 +7,7 @@ from lib.geoip import GeoIP
 
 import mkt
 from mkt.regions.utils import parse_region
+from mkt.users.utils import record_user_attrs
 
 log = commonware.log.getLogger('mkt.regions')
 
@@ -57,11 +58,11 @@ class RegionMiddleware(object):
             log.info('Region not specified in URL; region set as {0}'
                      .format(user_region.slug))
 
-        # Update the region on the user object if it changed.
+        # Update the region on the user object if it changed. This is saved
+        # in the background, it doesn't need to hold up the request.
         if (request.user.is_authenticated() and
                 request.user.region != user_region.slug):
-            request.user.region = user_region.slug
-            request.user.save()
+            record_user_attrs(request.user, region=user_region.slug)
 
         # Persist the region on the request / local thread.
         self.store_region(request, user_region)
@@ -339,6 +339,10 @@ SIGNED_APPS_PATH = NETAPP_STORAGE + '/signed-apps'
 # Special reviewer signed ones for special people.
 SIGNED_APPS_REVIEWER_PATH = NETAPP_STORAGE + '/signed-apps-reviewer'
 
+# Signed packages keyed by content, ids and signing key, so that the same
+# package is only sent to the signing server once.
+SIGNED_APPS_CACHE_PATH = NETAPP_STORAGE + '/signed-apps-cache'
+
 ###########################################
 # URLs
 #
@@ -666,6 +670,9 @@ DUMPED_USERS_DAYS_DELETE = 3600 * 24 * 30
 # Files saved to TMP_PATH deleted 15 days after written.
 TMP_PATH_DAYS_DELETE = 3600 * 24 * 15
 
+# Packages in SIGNED_APPS_CACHE_PATH deleted 30 days after they were signed.
+SIGNED_APPS_CACHE_DAYS_DELETE = 3600 * 24 * 30
+
 # Please use all lowercase for the blacklist.
 EMAIL_BLACKLIST = (
     'nobody@mozilla.org',
@@ -732,6 +739,28 @@ if DEBUG:
 GEOIP_URL = ''
 GEOIP_DEFAULT_VAL = 'restofworld'
 GEOIP_DEFAULT_TIMEOUT = .2
+# A country range table compiled with `manage.py compile_geoip`. If set it's
+# used instead of the GeoIP server, and GEOIP_URL isn't needed.
+GEOIP_DB_PATH = ''
+# How many recently looked up addresses each process remembers.
+GEOIP_LRU_SIZE = 10000
+
+# Changes to user attributes like the last seen region are saved in the
+# background, at most every USER_ATTRS_FLUSH_INTERVAL seconds or as soon as
+# USER_ATTRS_FLUSH_SIZE users have changes waiting. A thread in each process
+# flushes them every USER_ATTRS_FLUSH_INTERVAL seconds when it is idle.
+USER_ATTRS_FLUSH_INTERVAL = 30
+USER_ATTRS_FLUSH_SIZE = 500
+
+# How long, in seconds, to remember which user API credentials belong to,
+# see mkt.api.principal. Set to 0 to look them up on every request.
+API_PRINCIPAL_CACHE_TIMEOUT = 60
+
+# Where to remember OAuth nonces, see mkt.api.nonces. They are kept for
+# OAUTH_NONCE_TTL seconds, which must be longer than the 10 minutes oauthlib
+# accepts timestamps for.
+OAUTH_NONCE_STORE = 'mkt.api.nonces.CacheNonceStore'
+OAUTH_NONCE_TTL = 60 * 15
 
 # Credentials for accessing Google Analytics stats.
 GOOGLE_ANALYTICS_CREDENTIALS = {}
@@ -1067,6 +1096,12 @@ SIGNED_APPS_REVIEWER_SERVER = ''
 # And how long we'll give the server to respond.
 SIGNED_APPS_SERVER_TIMEOUT = 10
 
+# Identifiers for the keys used by the app signing servers. Change these
+# when the keys are rotated so that previously signed packages aren't
+# reused. If empty, signed packages aren't cached.
+SIGNED_APPS_KEY_ID = ''
+SIGNED_APPS_REVIEWER_KEY_ID = ''
+
 # Send the more terse manifest signatures to the app signing server.
 SIGNED_APPS_OMIT_PER_FILE_SIGS = True
 
@@ -1083,6 +1118,15 @@ SIGNING_SERVER_TIMEOUT = 10
 # The domains that we will accept certificate issuers for receipts.
 SIGNING_VALID_ISSUERS = []
 
+# The maximum number of keep-alive connections, and so concurrent requests,
+# each process will open to a signing server.
+SIGNING_CLIENT_POOL_SIZE = 10
+
+# How many times a failed request to a signing server is retried, and the
+# base delay in seconds for the jittered exponential backoff between them.
+SIGNING_CLIENT_RETRIES = 2
+SIGNING_CLIENT_RETRY_BACKOFF = 0.1
+
 # Put the aliases for your slave databases in this list.
 SLAVE_DATABASES = []
 
@@ -1153,6 +1197,25 @@ TOWER_KEYWORDS = {
 }
 TOWER_ADD_HEADERS = True
 
+# How many translation ids each process reserves at once, see
+# TranslationIdAllocator. Set to 1 to reserve them one at a time within the
+# current transaction.
+TRANSLATION_ID_BLOCK_SIZE = 100
+
+# How long to keep the sets of all the locales of a translation, see
+# get_trans_sets. They are invalidated when a Translation is saved or deleted
+# and again at the end of the request, but a lagging slave can still have
+# the old rows cached again, for this long at most. Set to 0 to disable.
+TRANSLATION_SETS_CACHE_TIMEOUT = 60 * 60
+# How long each process keeps the sets it read in memory. The other
+# processes drop them when a Translation is saved by checking a generation in
+# the cache, this only bounds how long unused ones stay around.
+TRANSLATION_SETS_LRU_TIMEOUT = 60
+# How long to remember whether all the sort keys of a translated field are
+# there for a locale, see sort_keys_complete. Until they are, sorting on the
+# field joins the translations instead.
+TRANSLATION_SORT_KEYS_CHECK_TIMEOUT = 5 * 60
+
 # Path to uglifyjs (our JS minifier).
 UGLIFY_BIN = os.environ.get('UGLIFY_BIN',
                             path('node_modules/uglify-js/bin/uglifyjs'))
@@ -1194,11 +1257,31 @@ WEBAPPS_RECEIPT_EXPIRED_SEND = False
 # Set to 6 months for the next little while.
 WEBAPPS_RECEIPT_EXPIRY_SECONDS = 60 * 60 * 24 * 182
 
+# Signed receipts are reused for reinstalls and reissues until this fraction
+# of their lifetime has passed. Set to 0 to sign a new receipt every time.
+WEBAPPS_RECEIPT_REUSE_FRACTION = 0.1
+
 # The key we'll use to sign webapp receipts.
 WEBAPPS_RECEIPT_KEY = os.path.join(ROOT, 'mkt/webapps/tests/sample.key')
 
 WEBAPPS_UNIQUE_BY_DOMAIN = False
 
+# How long to keep fully loaded apps for the app detail API, see
+# Webapp.get_cached. They are invalidated whenever the app or its relations
+# are saved, but queryset updates of the relations (eg: versions or files)
+# are only seen once they expire, so keep this short. Set to 0 to disable.
+WEBAPP_GRAPH_CACHE_TIMEOUT = 5 * 60
+
+# The same for the serialized app detail API responses, per region,
+# language, API version and query string.
+WEBAPP_DETAIL_CACHE_TIMEOUT = 5 * 60
+
+# How long to keep the blocks of the region exclusion index, see
+# is_excluded_in. They are updated whenever exclusions are saved, but not by
+# queryset updates, which are only seen once the blocks expire, so keep this
+# short. Set to 0 to disable.
+WEBAPP_EXCLUSIONS_CACHE_TIMEOUT = 5 * 60
+
 # Whitelist IP addresses of the allowed clients that can post email
 # through the API.
 WHITELISTED_CLIENTS_EMAIL_API = []
@@ -253,7 +253,8 @@ def package_signer():
                             'nagios_check_packaged_app.zip')
     signed_path = tempfile.mktemp()
     try:
-        packaged.sign_app(app_path, signed_path, None, False)
+        packaged.sign_app(app_path, signed_path, None, False,
+                          use_cache=False)
         return '', 'Package signer working'
     except PackageSigningError, e:
         msg = 'Error on package signing (%s): %s' % (destination, e)
@@ -0,0 +1,45 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.utils import translation
+
+from mkt.translations.transformer import get_trans, get_trans_joined
+from mkt.webapps.models import Webapp
+
+HELP = 'Time loading app translations with and without the JOINs'
+
+
+class Command(BaseCommand):
+    """
+    Usage:
+
+        python manage.py benchmark_translations --apps=100 --locale=fr
+
+    """
+
+    option_list = BaseCommand.option_list + (
+        make_option('--apps', type='int', default=100,
+                    help='Number of apps to load translations for'),
+        make_option('--locale', default='en-US',
+                    help='Locale to load translations in'),
+        make_option('--repeat', type='int', default=10,
+                    help='Number of times to load them'),
+    )
+
+    help = HELP
+
+    def handle(self, *args, **kwargs):
+        apps = list(Webapp.with_deleted.no_cache().no_transforms()
+                    .order_by('-id')[:kwargs['apps']])
+        translation.activate(kwargs['locale'])
+        for loader in (get_trans_joined, get_trans):
+            timings = []
+            for i in range(kwargs['repeat']):
+                start = time.time()
+                loader(apps)
+                timings.append(time.time() - start)
+            timings.sort()
+            print '%s: %s apps, best %.1fms, median %.1fms' % (
+                loader.__name__, len(apps), timings[0] * 1000,
+                timings[len(timings) // 2] * 1000)
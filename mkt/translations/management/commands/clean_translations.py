@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import get_models
+
+from amo.utils import chunked
+from mkt.translations.models import PurifiedTranslation
+from mkt.translations.tasks import clean_translations
+
+
+class Command(BaseCommand):
+    help = ('Store the clean strings of purified and linkified translations '
+            'computed before the last PurifiedTranslation.CLEAN_VERSION.')
+
+    def handle(self, *args, **options):
+        for model in get_models():
+            for field in getattr(model._meta, 'translated_fields', []):
+                cls = field.rel.to
+                if not issubclass(cls, PurifiedTranslation):
+                    continue
+                ids = (model._base_manager
+                       .exclude(**{field.attname: None})
+                       .values_list(field.attname, flat=True))
+                for chunk in chunked(list(ids), 100):
+                    clean_translations.delay(cls.__name__, chunk)
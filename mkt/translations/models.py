@@ -1,13 +1,23 @@
 import collections
-from itertools import groupby
-
-from django.db import connections, models, router
+import operator
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import connections, DatabaseError, models, router
 from django.db.models.deletion import Collector
+from django.db.utils import load_backend
+from django.dispatch import receiver
 from django.utils import encoding
 
 import bleach
 import commonware.log
+from celery.signals import task_postrun
 
+from lib.misc.lru import LRUCache
 from mkt.site.models import ManagerBase, ModelBase
 from mkt.site.utils import linkify_with_outgoing
 
@@ -25,6 +35,7 @@ class TranslationManager(ManagerBase):
         qs = Translation.objects.filter(id__in=filter(None, ids),
                                         locale=locale)
         qs.update(localized_string=None, localized_string_clean=None)
+        invalidate_trans_sets(filter(None, ids))
 
 
 class Translation(ModelBase):
@@ -40,6 +51,9 @@ class Translation(ModelBase):
     locale = models.CharField(max_length=10)
     localized_string = models.TextField(null=True)
     localized_string_clean = models.TextField(null=True)
+    # The PurifiedTranslation.CLEAN_VERSION localized_string_clean was
+    # computed with.
+    clean_version = models.PositiveSmallIntegerField(null=True)
 
     objects = TranslationManager()
 
@@ -131,18 +145,7 @@ class Translation(ModelBase):
         """
         if id is None:
             # Get a sequence key for the new translation.
-            cursor = connections['default'].cursor()
-            cursor.execute("""UPDATE translations_seq
-                              SET id=LAST_INSERT_ID(id + @@global.auto_increment_increment)""")
-
-            # The sequence table should never be empty. But alas, if it is,
-            # let's fix it.
-            if not cursor.rowcount > 0:
-                cursor.execute("""INSERT INTO translations_seq (id)
-                                  VALUES(LAST_INSERT_ID(id + @@global.auto_increment_increment))""")
-
-            cursor.execute('SELECT LAST_INSERT_ID()')
-            id = cursor.fetchone()[0]
+            id = next_translation_id()
 
         # Update if one exists, otherwise create a new one.
         q = {'id': id, 'locale': locale}
@@ -176,12 +179,17 @@ class PurifiedTranslation(Translation):
         'abbr': ['title'],
         'acronym': ['title'],
     }
+    # Bump this when the allowed tags or the cleaning change, so that the
+    # clean strings stored with the translations get recomputed, see the
+    # clean_translations command.
+    CLEAN_VERSION = 1
 
     class Meta:
         proxy = True
 
     def __unicode__(self):
-        if not self.localized_string_clean:
+        if (not self.localized_string_clean or
+                self.clean_version != self.CLEAN_VERSION):
             self.clean()
         return unicode(self.localized_string_clean)
 
@@ -195,6 +203,7 @@ class PurifiedTranslation(Translation):
         super(PurifiedTranslation, self).clean()
         cleaned = self.clean_localized_string()
         self.localized_string_clean = utils.clean_nl(cleaned).strip()
+        self.clean_version = self.CLEAN_VERSION
 
     def clean_localized_string(self):
         # All links (text and markup) are normalized.
@@ -254,6 +263,95 @@ class TranslationSequence(models.Model):
         db_table = 'translations_seq'
 
 
+def reserve_translation_ids(cursor, count):
+    """
+    Moves translations_seq on by `count` ids and returns the last one with
+    the increment between ids.
+    """
+    cursor.execute("""UPDATE translations_seq
+                      SET id=LAST_INSERT_ID(
+                          id + @@global.auto_increment_increment * %s)""",
+                   [count])
+
+    # The sequence table should never be empty. But alas, if it is,
+    # let's fix it.
+    if not cursor.rowcount > 0:
+        cursor.execute("""INSERT INTO translations_seq (id)
+                          VALUES(LAST_INSERT_ID(
+                              id + @@global.auto_increment_increment * %s))""",
+                       [count])
+
+    cursor.execute('SELECT LAST_INSERT_ID(), '
+                   '@@global.auto_increment_increment')
+    return cursor.fetchone()
+
+
+class TranslationIdAllocator(object):
+    """
+    Hands out translation ids from blocks of `size` ids reserved at once.
+
+    The blocks are reserved on a connection of their own, outside of any
+    transaction, so that a rollback can't give ids this process still holds
+    back to the sequence, and writers only hold the translations_seq row
+    for one statement per block. Unused ids are lost when the process ends.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.connection = None
+        self.next = self.last = self.step = None
+
+    def get_connection(self):
+        if self.connection is None:
+            settings_dict = connections['default'].settings_dict
+            backend = load_backend(settings_dict['ENGINE'])
+            self.connection = backend.DatabaseWrapper(settings_dict,
+                                                      'translations_seq')
+            # Reservations are serialized by self.lock.
+            self.connection.allow_thread_sharing = True
+        return self.connection
+
+    def reserve(self):
+        try:
+            last, step = reserve_translation_ids(
+                self.get_connection().cursor(), self.size)
+        except DatabaseError:
+            # The connection may have gone away while idle, try once more.
+            log.warning('Reconnecting to reserve translation ids.',
+                        exc_info=True)
+            self.connection.close()
+            last, step = reserve_translation_ids(
+                self.get_connection().cursor(), self.size)
+        self.last, self.step = last, step
+        self.next = last - step * (self.size - 1)
+
+    def get(self):
+        with self.lock:
+            if self.next is None or self.next > self.last:
+                self.reserve()
+            id = self.next
+            self.next += self.step
+            return id
+
+
+_allocator = None
+
+
+def next_translation_id():
+    """
+    Returns an id for a new translation, from a block reserved by this
+    process if TRANSLATION_ID_BLOCK_SIZE is more than 1.
+    """
+    global _allocator
+    if settings.TRANSLATION_ID_BLOCK_SIZE > 1:
+        if _allocator is None:
+            _allocator = TranslationIdAllocator(
+                settings.TRANSLATION_ID_BLOCK_SIZE)
+        return _allocator.get()
+    return reserve_translation_ids(connections['default'].cursor(), 1)[0]
+
+
 def delete_translation(obj, fieldname):
     field = obj._meta.get_field(fieldname)
     trans_id = getattr(obj, field.attname)
@@ -262,8 +360,141 @@ def delete_translation(obj, fieldname):
         Translation.objects.filter(id=trans_id).delete()
 
 
-def _sorted_groupby(seq, key):
-    return groupby(sorted(seq, key=key), key=key)
+trans_fields = [f.name for f in Translation._meta.fields]
+
+TRANS_SET_KEY = 'translations:set:2:%s'
+TRANS_SET_GENERATION_KEY = 'translations:set:generation'
+
+# The translation sets read recently, by id: (expiry time, generation, rows).
+trans_sets = LRUCache(1000)
+
+
+def bump_trans_sets_generation():
+    """
+    Bump the generation of the translation sets, which the per-process copies
+    are checked against. Returns the new value.
+    """
+    try:
+        return cache.incr(TRANS_SET_GENERATION_KEY)
+    except ValueError:
+        # Start at a value that can't have been used before.
+        generation = int(time.time() * 1000)
+        cache.set(TRANS_SET_GENERATION_KEY, generation, None)
+        return generation
+
+
+def get_trans_sets(ids, locales=None):
+    """
+    Returns a dict of translation id to the list of its Translations with a
+    string, in every locale or only in `locales` (lowercased), for each of
+    `ids`.
+
+    The sets are read from a per-process LRU, then the cache and then the
+    database, see TRANSLATION_SETS_CACHE_TIMEOUT. The copies in the LRU are
+    only used while the generation they were read at is current, which is
+    checked in the same cache round trip as the sets not in the LRU.
+    """
+    ids = set(ids) - set([None])
+    if not ids:
+        return {}
+    now = time.time()
+    in_lru = {}
+    if settings.TRANSLATION_SETS_LRU_TIMEOUT:
+        for trans_id in ids:
+            entry = trans_sets.get(trans_id)
+            if entry and entry[0] > now:
+                in_lru[trans_id] = entry
+
+    keys = []
+    if settings.TRANSLATION_SETS_CACHE_TIMEOUT:
+        keys.extend(TRANS_SET_KEY % i for i in ids - set(in_lru))
+    if settings.TRANSLATION_SETS_LRU_TIMEOUT:
+        keys.append(TRANS_SET_GENERATION_KEY)
+    cached = cache.get_many(keys) if keys else {}
+    generation = None
+    if settings.TRANSLATION_SETS_LRU_TIMEOUT:
+        generation = (cached.get(TRANS_SET_GENERATION_KEY) or
+                      bump_trans_sets_generation())
+
+    rows = dict((i, entry[2]) for i, entry in in_lru.items()
+                if entry[1] == generation)
+    fresh = set(rows)
+    if settings.TRANSLATION_SETS_CACHE_TIMEOUT:
+        # The sets changed since they were read in this process.
+        outdated = set(in_lru) - fresh
+        if outdated:
+            cached.update(cache.get_many([TRANS_SET_KEY % i
+                                          for i in outdated]))
+        for trans_id in ids - fresh:
+            if TRANS_SET_KEY % trans_id in cached:
+                rows[trans_id] = cached[TRANS_SET_KEY % trans_id]
+
+    missing = ids - set(rows)
+    if missing:
+        fetched = dict((i, []) for i in missing)
+        qs = (Translation.objects.no_cache()
+              .filter(id__in=missing, localized_string__isnull=False)
+              .order_by('autoid').values_list(*trans_fields))
+        position = trans_fields.index('id')
+        for row in qs:
+            fetched[row[position]].append(tuple(row))
+        if settings.TRANSLATION_SETS_CACHE_TIMEOUT:
+            cache.set_many(dict((TRANS_SET_KEY % i, r)
+                                for i, r in fetched.items()),
+                           settings.TRANSLATION_SETS_CACHE_TIMEOUT)
+        rows.update(fetched)
+
+    if settings.TRANSLATION_SETS_LRU_TIMEOUT:
+        expires = now + settings.TRANSLATION_SETS_LRU_TIMEOUT
+        for trans_id in ids - fresh:
+            trans_sets[trans_id] = (expires, generation, rows[trans_id])
+
+    position = trans_fields.index('locale')
+    return dict((i, [Translation(*r) for r in rows[i]
+                     if locales is None or r[position].lower() in locales])
+                for i in ids)
+
+
+def invalidate_trans_sets(ids):
+    for trans_id in ids:
+        trans_sets.pop(trans_id, None)
+    cache.delete_many([TRANS_SET_KEY % i for i in ids])
+    # The other processes drop their copies when they see the new generation.
+    bump_trans_sets_generation()
+
+
+_locals = threading.local()
+
+
+def _get_changed_trans_sets():
+    """Returns the ids of the sets the calling thread changed."""
+    return _locals.__dict__.setdefault('changed_trans_sets', set())
+
+
+@receiver(models.signals.post_save,
+          dispatch_uid='translation_sets_save')
+@receiver(models.signals.post_delete,
+          dispatch_uid='translation_sets_delete')
+def translation_sets_changed(sender, instance, **kw):
+    # Not limited to a sender, the proxies send their own signals.
+    if isinstance(instance, Translation) and instance.id is not None:
+        invalidate_trans_sets([instance.id])
+        # The transaction isn't committed yet, so the old rows could be
+        # cached again in the meantime. Invalidate once more at the end.
+        _get_changed_trans_sets().add(instance.id)
+
+
+@receiver(request_finished, dispatch_uid='translation_sets_request')
+@receiver(task_postrun, dispatch_uid='translation_sets_task')
+def invalidate_changed_trans_sets(**kw):
+    """
+    Invalidates the sets changed during the request or task again, once its
+    transaction is committed.
+    """
+    changed = _get_changed_trans_sets()
+    if changed:
+        invalidate_trans_sets(list(changed))
+        changed.clear()
 
 
 def attach_trans_dict(model, objs):
@@ -273,11 +504,9 @@ def attach_trans_dict(model, objs):
     ids = [getattr(obj, f.attname) for f in fields
            for obj in objs if getattr(obj, f.attname, None) is not None]
 
-    # Get translations in a dict, ids will be the keys. It's important to
-    # consume the result of groupby, which is an iterator.
-    qs = Translation.objects.filter(id__in=ids, localized_string__isnull=False)
-    all_translations = dict((k, list(v)) for k, v in
-                            _sorted_groupby(qs, lambda trans: trans.id))
+    # Get translations in a dict, ids will be the keys.
+    all_translations = dict((k, v) for k, v in get_trans_sets(ids).items()
+                            if v)
 
     def get_locale_and_string(translation, new_class):
         """Convert the translation to new_class (making PurifiedTranslations
@@ -298,3 +527,199 @@ def attach_trans_dict(model, objs):
 
             obj.translations[t_id] = [get_locale_and_string(t, field.rel.to)
                                       for t in field_translations]
+
+
+class TranslationSortKey(models.Model):
+    """
+    The key to sort the objects of a translated field by, for a translation
+    and a locale, see `order_by_translation`. It's the translation in that
+    locale or in the fallback locale of its object, so that sorting on it
+    can use the (locale, sort_key) index instead of joining translations
+    twice. Only kept for the fields registered with `register_sort_keys`.
+    """
+    translation_id = models.IntegerField()
+    locale = models.CharField(max_length=10)
+    sort_key = models.CharField(max_length=255)
+
+    class Meta:
+        db_table = 'translations_sort_keys'
+        unique_together = ('translation_id', 'locale')
+        index_together = [('locale', 'sort_key')]
+
+
+# The fields with sort keys, by model.
+sort_key_fields = {}
+
+
+def sort_key_locales():
+    return [locale.lower() for locale in settings.AMO_LANGUAGES]
+
+
+def make_sort_key(string):
+    """Returns the key to sort `string` by, ignoring case and accents."""
+    string = unicodedata.normalize('NFKD', u' '.join(string.split()))
+    return u''.join(c for c in string
+                    if not unicodedata.combining(c)).lower()[:255]
+
+
+def update_sort_keys(translations):
+    """
+    Updates the sort keys of the (translation id, fallback locale) pairs in
+    `translations`.
+    """
+    translations = dict(translations)
+    strings = collections.defaultdict(dict)
+    qs = (Translation.objects.no_cache()
+          .filter(id__in=translations, localized_string__isnull=False)
+          .values_list('id', 'locale', 'localized_string'))
+    for trans_id, locale, string in qs:
+        strings[trans_id][locale.lower()] = string
+
+    wanted = {}
+    for trans_id, fallback in translations.items():
+        default = strings[trans_id].get((fallback or '').lower())
+        for locale in sort_key_locales():
+            string = strings[trans_id].get(locale, default)
+            if string is not None:
+                wanted[trans_id, locale] = make_sort_key(string)
+
+    new = []
+    for key in TranslationSortKey.objects.filter(
+            translation_id__in=translations):
+        sort_key = wanted.pop((key.translation_id, key.locale), None)
+        if sort_key is None:
+            key.delete()
+        elif sort_key != key.sort_key:
+            key.sort_key = sort_key
+            key.save()
+    for (trans_id, locale), sort_key in wanted.items():
+        new.append(TranslationSortKey(translation_id=trans_id, locale=locale,
+                                      sort_key=sort_key))
+    TranslationSortKey.objects.bulk_create(new)
+
+
+def get_sort_key_fallbacks(model, objs):
+    """
+    Returns the (translation id, fallback locale) pairs for the fields with
+    sort keys of `objs`.
+    """
+    fallback = (model.get_fallback() if hasattr(model, 'get_fallback')
+                else settings.LANGUAGE_CODE)
+    pairs = []
+    for obj in objs:
+        locale = (getattr(obj, fallback.attname)
+                  if isinstance(fallback, models.Field) else fallback)
+        for field in sort_key_fields.get(model, []):
+            trans_id = getattr(obj, field.attname)
+            if trans_id is not None:
+                pairs.append((trans_id, locale))
+    return pairs
+
+
+def update_object_sort_keys(model, objs):
+    update_sort_keys(get_sort_key_fallbacks(model, objs))
+
+
+SORT_KEYS_COMPLETE_KEY = 'translations:sort-keys:complete:%s:%s:%s'
+
+
+def sort_keys_complete(model, field, locale):
+    """
+    Returns whether all the objects of `model` with a translation of `field`
+    in `locale` or in their fallback locale have a sort key for `locale`,
+    eg: not until the keys are backfilled. Objects without a key would be
+    left out when sorting on the keys only.
+    """
+    key = SORT_KEYS_COMPLETE_KEY % (model._meta.db_table, field.column,
+                                    locale)
+    complete = cache.get(key)
+    if complete is not None:
+        return complete
+
+    fallback = (model.get_fallback() if hasattr(model, 'get_fallback')
+                else settings.LANGUAGE_CODE)
+    column = '`%s`.`%s`' % (model._meta.db_table, field.column)
+    params = [locale, locale]
+    if isinstance(fallback, models.Field):
+        fallback_str = '`%s`.`%s`' % (model._meta.db_table, fallback.column)
+    else:
+        fallback_str = '%s'
+        params.append(fallback)
+    missing = model._base_manager.extra(
+        where=['%s IS NOT NULL' % column,
+               'NOT EXISTS (SELECT 1 FROM `%s` k WHERE '
+               'k.`translation_id` = %s AND k.`locale` = %%s)' % (
+                   TranslationSortKey._meta.db_table, column),
+               'EXISTS (SELECT 1 FROM `%s` t WHERE t.`id` = %s AND '
+               't.`localized_string` IS NOT NULL AND '
+               't.`locale` IN (%%s, %s))' % (
+                   Translation._meta.db_table, column, fallback_str)],
+        params=params)
+    complete = not missing.exists()
+    if settings.TRANSLATION_SORT_KEYS_CHECK_TIMEOUT:
+        cache.set(key, complete, settings.TRANSLATION_SORT_KEYS_CHECK_TIMEOUT)
+    return complete
+
+
+def register_sort_keys(model, field_name):
+    """
+    Keeps sort keys for the translated field `field_name` of `model`, for
+    `order_by_translation` to use.
+    """
+    sort_key_fields.setdefault(model, []).append(
+        model._meta.get_field(field_name))
+    uid = 'sort_keys_%s' % model._meta.db_table
+    if hasattr(model, 'on_change'):
+        model.on_change(sort_key_object_changed)
+    models.signals.post_save.connect(sort_key_object_saved, sender=model,
+                                     dispatch_uid=uid)
+    models.signals.post_delete.connect(sort_key_object_deleted, sender=model,
+                                       dispatch_uid=uid + '_delete')
+
+
+def sort_key_object_changed(old_attr=None, new_attr=None, instance=None,
+                            sender=None, **kw):
+    fallback = (sender.get_fallback() if hasattr(sender, 'get_fallback')
+                else None)
+    attrs = [sender._meta.pk.attname]
+    attrs.extend(f.attname for f in sort_key_fields[sender])
+    if isinstance(fallback, models.Field):
+        attrs.append(fallback.attname)
+    if any(old_attr.get(attr) != new_attr.get(attr) for attr in attrs):
+        update_object_sort_keys(sender, [instance])
+
+
+def sort_key_object_saved(sender, instance, **kw):
+    # Models with on_change only update the keys when the fields change, but
+    # that isn't sent when loading fixtures.
+    if kw.get('raw') or not hasattr(sender, 'on_change'):
+        update_object_sort_keys(sender, [instance])
+
+
+def sort_key_object_deleted(sender, instance, **kw):
+    ids = [trans_id for trans_id, locale
+           in get_sort_key_fallbacks(sender, [instance])]
+    TranslationSortKey.objects.filter(translation_id__in=ids).delete()
+
+
+@receiver(models.signals.post_save,
+          dispatch_uid='translation_sort_keys_save')
+@receiver(models.signals.post_delete,
+          dispatch_uid='translation_sort_keys_delete')
+def translation_sort_keys_changed(sender, instance, **kw):
+    # Fixtures count too, their objects may have been loaded first.
+    if (not sort_key_fields or not isinstance(instance, Translation) or
+            instance.id is None):
+        return
+    pairs = []
+    for model, fields in sort_key_fields.items():
+        owners = model._base_manager.filter(
+            reduce(operator.or_, [models.Q(**{f.attname: instance.id})
+                                  for f in fields]))
+        pairs.extend(get_sort_key_fallbacks(model, owners))
+    if pairs:
+        update_sort_keys(pairs)
+    else:
+        # The translation isn't used anymore, eg: it was the last one for
+        # its id and was deleted.
+        TranslationSortKey.objects.filter(translation_id=instance.id).delete()
@@ -4,6 +4,8 @@ from django.conf import settings
 from django.db import models
 from django.utils import translation as translation_utils
 
+from mkt.translations.models import (sort_key_fields, sort_key_locales,
+                                     sort_keys_complete, TranslationSortKey)
 from mkt.webapps import query
 
 
@@ -14,6 +16,10 @@ def order_by_translation(qs, fieldname):
 
     The model being sorted needs a get_fallback() classmethod that describes
     the fallback locale.  get_fallback() can return a string or a Field.
+
+    Fields registered with register_sort_keys are sorted on their precomputed
+    sort keys when all the objects have one for the current locale, without
+    joining the translations.
     """
     if fieldname.startswith('-'):
         desc = True
@@ -24,6 +30,21 @@ def order_by_translation(qs, fieldname):
     qs = qs.all()
     model = qs.model
     field = model._meta.get_field(fieldname)
+    prefix = '-' if desc else ''
+
+    lang = (translation_utils.get_language() or
+            settings.LANGUAGE_CODE).lower()
+    if (field in sort_key_fields.get(model, []) and
+            lang in sort_key_locales() and
+            sort_keys_complete(model, field, lang)):
+        table = TranslationSortKey._meta.db_table
+        return qs.extra(
+            tables=[table],
+            where=['%s.`translation_id` = %s.`%s`' % (
+                       table, model._meta.db_table, field.column),
+                   '%s.`locale` = %%s' % table],
+            params=[lang],
+            order_by=[prefix + '%s.sort_key' % table])
 
     # connection is a tuple (lhs, table, join_cols)
     connection = (model._meta.db_table, field.rel.to._meta.db_table,
@@ -47,7 +68,6 @@ def order_by_translation(qs, fieldname):
     f1, f2 = '%s.`localized_string`' % t1, '%s.`localized_string`' % t2
     name = 'translated_%s' % field.column
     ifnull = 'IFNULL(%s, %s)' % (f1, f2)
-    prefix = '-' if desc else ''
     return qs.extra(select={name: ifnull},
                     where=['(%s IS NOT NULL OR %s IS NOT NULL)' % (f1, f2)],
                     order_by=[prefix + name])
@@ -0,0 +1,30 @@
+import logging
+
+from celeryutils import task
+
+from mkt.site.decorators import write
+from mkt.translations import models as translations
+
+task_log = logging.getLogger('z.task')
+
+
+@task
+@write
+def clean_translations(class_name, ids, **kw):
+    """
+    Recomputes the stored clean strings of the translations with `ids` that
+    are stale, using the PurifiedTranslation subclass `class_name`.
+    """
+    cls = getattr(translations, class_name)
+    task_log.info('[%s@%s] Cleaning %s strings.' %
+                  (len(ids), clean_translations.rate_limit, class_name))
+    qs = (cls.objects.no_cache()
+          .filter(id__in=ids, localized_string__isnull=False)
+          .exclude(clean_version=cls.CLEAN_VERSION))
+    for trans in qs:
+        trans.clean()
+        # Not save(), the translation itself didn't change.
+        cls.objects.filter(autoid=trans.autoid).update(
+            localized_string_clean=trans.localized_string_clean,
+            clean_version=trans.clean_version)
+    translations.invalidate_trans_sets(ids)
@@ -4,7 +4,9 @@ from contextlib import nested
 
 import django
 from django.conf import settings
-from django.db import connections, reset_queries
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import connections, DatabaseError, models, reset_queries
 from django.test.utils import override_settings
 from django.utils import translation
 from django.utils.functional import lazy
@@ -12,17 +14,25 @@ from django.utils.functional import lazy
 import jinja2
 import multidb
 from amo.tests import TestCase
-from mock import patch
+from mock import Mock, patch
 from nose import SkipTest
 from nose.tools import eq_, ok_
 
 from mkt.translations import widgets
-from mkt.translations.models import (attach_trans_dict, LinkifiedTranslation,
+from mkt.translations.models import (attach_trans_dict, get_trans_sets,
+                                     LinkifiedTranslation, make_sort_key,
+                                     next_translation_id,
                                      NoLinksTranslation,
                                      NoLinksNoMarkupTranslation,
-                                     PurifiedTranslation, Translation,
-                                     TranslationSequence)
+                                     PurifiedTranslation, register_sort_keys,
+                                     sort_key_fields, sort_keys_complete,
+                                     TRANS_SET_GENERATION_KEY, TRANS_SET_KEY,
+                                     trans_sets,
+                                     Translation, TranslationIdAllocator,
+                                     TranslationSequence, TranslationSortKey,
+                                     update_object_sort_keys)
 from mkt.translations.query import order_by_translation
+from mkt.translations.transformer import get_trans, get_trans_joined
 from testapp.models import TranslatedModel, UntranslatedModel, FancyModel
 
 
@@ -78,11 +88,49 @@ class TranslationSequenceTestCase(TestCase):
             'Translation sequence needs to keep increasing.')
 
 
+class TestTranslationIdAllocator(TestCase):
+
+    def setUp(self):
+        self.allocator = TranslationIdAllocator(3)
+        patcher = patch('mkt.translations.models.reserve_translation_ids')
+        self.reserve = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.allocator.get_connection = lambda: connections['default']
+
+    def test_block(self):
+        self.reserve.return_value = (130, 10)
+        eq_([self.allocator.get() for i in range(3)], [110, 120, 130])
+        eq_(self.reserve.call_count, 1)
+        eq_(self.reserve.call_args[0][1], 3)
+
+    def test_next_block(self):
+        self.reserve.return_value = (3, 1)
+        eq_([self.allocator.get() for i in range(3)], [1, 2, 3])
+        self.reserve.return_value = (8, 1)
+        eq_([self.allocator.get() for i in range(2)], [6, 7])
+        eq_(self.reserve.call_count, 2)
+
+    def test_reconnect(self):
+        self.allocator.connection = connection = Mock()
+        self.reserve.side_effect = [DatabaseError, (3, 1)]
+        eq_(self.allocator.get(), 1)
+        ok_(connection.close.called)
+
+    @override_settings(TRANSLATION_ID_BLOCK_SIZE=1)
+    def test_next_translation_id(self):
+        self.reserve.return_value = (42, 1)
+        eq_(next_translation_id(), 42)
+        eq_(self.reserve.call_args[0][1], 1)
+
+
+@override_settings(TRANSLATION_SETS_CACHE_TIMEOUT=60,
+                   TRANSLATION_SETS_LRU_TIMEOUT=60)
 class TranslationTestCase(TestCase):
     fixtures = ['testapp/test_models.json']
 
     def setUp(self):
         super(TranslationTestCase, self).setUp()
+        trans_sets.clear()
         self.redirect_url = settings.REDIRECT_URL
         self.redirect_secret_key = settings.REDIRECT_SECRET_KEY
         settings.REDIRECT_URL = None
@@ -419,6 +467,142 @@ class TranslationTestCase(TestCase):
         eq_(obj.name.id, orig_name_id)
         eq_(obj.name.locale, 'de')
 
+    def test_fetch_translations_many(self):
+        with self.activate('de'):
+            objs = dict((o.id, o) for o in TranslatedModel.objects.all())
+            trans_eq(objs[1].name, 'German!! (unst unst)', 'de')
+            trans_eq(objs[1].description, 'some description', 'en-US')
+            trans_eq(objs[1].no_locale, 'blammo', 'en-US')
+            trans_eq(objs[3].name, 'speak American', 'en-US')
+            trans_eq(objs[4].name, 'hot dogs', 'en-US')
+            eq_(objs[3].description, None)
+
+    @patch.object(TranslatedModel, 'get_fallback', create=True)
+    def test_fetch_translations_field_fallback(self, get_fallback):
+        get_fallback.return_value = TranslatedModel._meta.get_field(
+            'default_locale')
+        with self.activate('es'):
+            objs = dict((o.id, o) for o in TranslatedModel.objects.all())
+            trans_eq(objs[1].name, 'German!! (unst unst)', 'de')
+            eq_(objs[1].description, None)
+            trans_eq(objs[1].no_locale, 'blammo', 'en-US')
+            trans_eq(objs[3].name, 'frenchie', 'fr')
+            trans_eq(objs[4].name, 'hot dogs', 'en-US')
+
+    def test_fetch_translations_locales(self):
+        objs = list(TranslatedModel.objects.no_transforms().filter(id=1))
+        with patch('mkt.translations.transformer.get_trans_sets',
+                   wraps=get_trans_sets) as get_sets:
+            with self.activate('de'):
+                get_trans(objs)
+        # Only the current and fallback locales, but in any locale for the
+        # fields that fall back to any of them.
+        eq_(get_sets.call_args_list[0][0][1], set(['de', 'en-us']))
+        eq_(list(get_sets.call_args_list[1][0]), [[objs[0].no_locale_id]])
+        trans_eq(objs[0].name, 'German!! (unst unst)', 'de')
+
+    def test_fetch_translations_same_as_joined(self):
+        for locale in ('en-US', 'de', 'fr'):
+            with self.activate(locale):
+                joined = list(TranslatedModel.objects.no_transforms()
+                              .order_by('id'))
+                get_trans_joined(joined)
+                objs = list(TranslatedModel.objects.no_transforms()
+                            .order_by('id'))
+                get_trans(objs)
+                for field in ('name', 'description', 'no_locale'):
+                    eq_([(unicode(getattr(o, field)),
+                          getattr(getattr(o, field), 'locale', None))
+                         for o in objs],
+                        [(unicode(getattr(o, field)),
+                          getattr(getattr(o, field), 'locale', None))
+                         for o in joined])
+
+
+class TestSortKeys(TestCase):
+    fixtures = ['testapp/test_models.json']
+
+    def setUp(self):
+        register_sort_keys(TranslatedModel, 'name')
+        update_object_sort_keys(TranslatedModel,
+                                TranslatedModel.objects.all())
+
+    def tearDown(self):
+        del sort_key_fields[TranslatedModel]
+        uid = 'sort_keys_%s' % TranslatedModel._meta.db_table
+        models.signals.post_save.disconnect(sender=TranslatedModel,
+                                            dispatch_uid=uid)
+        models.signals.post_delete.disconnect(sender=TranslatedModel,
+                                              dispatch_uid=uid + '_delete')
+
+    def sort_key(self, trans_id, locale):
+        return TranslationSortKey.objects.get(translation_id=trans_id,
+                                              locale=locale).sort_key
+
+    def test_make_sort_key(self):
+        eq_(make_sort_key(u'  \xc9lan   Vital '), u'elan vital')
+
+    def test_keys(self):
+        eq_(self.sort_key(1, 'de'), u'german!! (unst unst)')
+        # Falls back to the default locale.
+        eq_(self.sort_key(1, 'fr'), u'some name')
+        # Other fields don't get keys.
+        ok_(not TranslationSortKey.objects.filter(translation_id=2).exists())
+
+    def test_sorting(self):
+        with self.activate('de'):
+            q = TranslatedModel.objects.all()
+            eq_(ids(order_by_translation(q, 'name')), [1, 4, 3])
+            eq_(ids(order_by_translation(q, '-name')), [3, 4, 1])
+
+    def test_sorting_on_keys_only(self):
+        with self.activate('de'):
+            q = order_by_translation(TranslatedModel.objects.all(), 'name')
+            sql = str(q.query)
+        ok_('translations_sort_keys' in sql)
+        ok_('`translations`' not in sql)
+
+    def test_sorting_keeps_queryset(self):
+        q = TranslatedModel.objects.all()
+        sql = str(q.query)
+        with self.activate('de'):
+            order_by_translation(q, 'name')
+        eq_(str(q.query), sql)
+
+    def test_sorting_without_language(self):
+        # Uses the keys of the default locale.
+        translation.deactivate_all()
+        self.addCleanup(translation.activate, settings.LANGUAGE_CODE)
+        q = TranslatedModel.objects.all()
+        eq_(ids(order_by_translation(q, 'name')), [4, 1, 3])
+
+    def test_sorting_without_keys(self):
+        # Objects without a key are still listed, sorted on the translation.
+        TranslationSortKey.objects.filter(translation_id=4).delete()
+        field = TranslatedModel._meta.get_field('name')
+        ok_(not sort_keys_complete(TranslatedModel, field, 'de'))
+        ok_(sort_keys_complete(TranslatedModel, field, 'fr'))
+        with self.activate('de'):
+            q = TranslatedModel.objects.all()
+            eq_(ids(order_by_translation(q, 'name')), [1, 4, 3])
+            eq_(ids(order_by_translation(q, '-name')), [3, 4, 1])
+
+    def test_sorting_unknown_locale(self):
+        # Falls back to joining the translations.
+        with self.activate('xx'):
+            q = TranslatedModel.objects.all()
+            eq_(ids(order_by_translation(q, 'name')), [4, 1, 3])
+
+    def test_translation_saved(self):
+        trans = Translation.objects.get(id=4, locale='en-US')
+        trans.localized_string = 'Aardvark'
+        trans.save()
+        eq_(self.sort_key(4, 'de'), u'aardvark')
+
+    def test_object_deleted(self):
+        TranslatedModel.objects.get(id=4).delete()
+        ok_(not TranslationSortKey.objects.filter(translation_id=4).exists())
+
 
 class TranslationMultiDbTests(TestCase):
     fixtures = ['testapp/test_models.json']
@@ -510,6 +694,19 @@ class PurifiedTranslationTest(TestCase):
         x = PurifiedTranslation(localized_string=s)
         eq_(x.__html__(), '&lt;script&gt;some naughty xss&lt;/script&gt;')
 
+    def test_clean_version_saved(self):
+        obj = FancyModel.objects.create(purified=u'<b>bold</b>')
+        trans = Translation.objects.no_cache().get(id=obj.purified_id)
+        eq_(trans.localized_string_clean, u'<b>bold</b>')
+        eq_(trans.clean_version, PurifiedTranslation.CLEAN_VERSION)
+
+    def test_stale_clean_version(self):
+        x = PurifiedTranslation(localized_string=u'<b>new</b>',
+                                localized_string_clean=u'old',
+                                clean_version=0)
+        eq_(x.__html__(), u'<b>new</b>')
+        eq_(x.clean_version, PurifiedTranslation.CLEAN_VERSION)
+
     @patch('bleach.callbacks.nofollow', lambda attrs, new: attrs)
     def test_internal_link(self):
         s = u'<b>markup</b> <a href="http://addons.mozilla.org/foo">bar</a>'
@@ -897,11 +1094,16 @@ def test_cache_key():
         Translation._cache_key(1, 'default'))
 
 
+@override_settings(TRANSLATION_SETS_CACHE_TIMEOUT=60,
+                   TRANSLATION_SETS_LRU_TIMEOUT=60)
 class TestAttachTransDict(TestCase):
     """
     Tests for attach_trans_dict.
     """
 
+    def setUp(self):
+        trans_sets.clear()
+
     def test_basic(self):
         obj = FancyModel.objects.create(
             purified='Purified <script>alert(42)</script>!',
@@ -960,3 +1162,97 @@ class TestAttachTransDict(TestCase):
             set([('en-us', 'English 2 Linkified'),
                  ('es', 'Spanish 2 Linkified'),
                  ('fr', 'French 2 Linkified')]))
+
+
+@override_settings(TRANSLATION_SETS_CACHE_TIMEOUT=60,
+                   TRANSLATION_SETS_LRU_TIMEOUT=60)
+class TestTransSets(TestCase):
+    fixtures = ['testapp/test_models.json']
+
+    def setUp(self):
+        trans_sets.clear()
+
+    def tearDown(self):
+        trans_sets.clear()
+
+    def strings(self, trans_id):
+        return sorted((t.locale, t.localized_string)
+                      for t in get_trans_sets([trans_id])[trans_id])
+
+    def test_sets(self):
+        sets = get_trans_sets([1, 2, 999, None])
+        eq_(sorted(sets), [1, 2, 999])
+        eq_(sorted(t.locale for t in sets[1]), ['de', 'en-US'])
+        eq_(sets[999], [])
+
+    def test_cached(self):
+        get_trans_sets([1])
+        with self.assertNumQueries(0):
+            eq_(self.strings(1), [('de', 'German!! (unst unst)'),
+                                  ('en-US', 'some name')])
+
+    def test_cached_in_process(self):
+        get_trans_sets([1])
+        with patch.object(cache, 'get_many', wraps=cache.get_many) as get:
+            eq_(len(get_trans_sets([1])[1]), 2)
+        # Only the generation is checked.
+        get.assert_called_once_with([TRANS_SET_GENERATION_KEY])
+
+    def test_locales(self):
+        sets = get_trans_sets([1], locales=set(['en-us']))
+        eq_([t.localized_string for t in sets[1]], ['some name'])
+        eq_(len(get_trans_sets([1])[1]), 2)
+
+    def test_invalidated_on_save(self):
+        get_trans_sets([1])
+        trans = Translation.objects.get(id=1, locale='de')
+        trans.localized_string = 'Neu'
+        trans.save()
+        eq_(self.strings(1), [('de', 'Neu'), ('en-US', 'some name')])
+
+    def test_invalidated_in_other_processes(self):
+        get_trans_sets([1])
+        # Another process read the set at the same time.
+        other = trans_sets[1]
+        trans = Translation.objects.get(id=1, locale='de')
+        trans.localized_string = 'Neu'
+        trans.save()
+        trans_sets[1] = other
+        eq_(self.strings(1), [('de', 'Neu'), ('en-US', 'some name')])
+
+    def test_invalidated_on_proxy_save(self):
+        get_trans_sets([20])
+        trans = PurifiedTranslation.objects.get(id=20)
+        trans.localized_string = 'pure'
+        trans.save()
+        eq_(self.strings(20), [('en-US', 'pure')])
+
+    def test_invalidated_on_delete(self):
+        get_trans_sets([1])
+        Translation.objects.get(id=1, locale='de').delete()
+        eq_(self.strings(1), [('en-US', 'some name')])
+
+    def test_invalidated_on_remove_for(self):
+        get_trans_sets([1])
+        Translation.objects.remove_for(TranslatedModel.objects.get(id=1),
+                                       'de')
+        eq_(self.strings(1), [('en-US', 'some name')])
+
+    def test_invalidated_again_after_request(self):
+        get_trans_sets([1])
+        trans = Translation.objects.get(id=1, locale='de')
+        trans.localized_string = 'Neu'
+        trans.save()
+        # The old set is cached again before the transaction is committed.
+        cache.set(TRANS_SET_KEY % 1, 'stale')
+        request_finished.send(sender=self.__class__)
+        eq_(cache.get(TRANS_SET_KEY % 1), None)
+        eq_(self.strings(1), [('de', 'Neu'), ('en-US', 'some name')])
+
+    def test_attach_trans_dict(self):
+        obj = TranslatedModel.objects.get(id=1)
+        attach_trans_dict(TranslatedModel, [obj])
+        with self.assertNumQueries(0):
+            attach_trans_dict(TranslatedModel, [obj])
+        eq_(sorted(obj.translations[1]),
+            [('de', 'German!! (unst unst)'), ('en-us', 'some name')])
@@ -0,0 +1,43 @@
+from django.core.management import call_command
+
+from nose.tools import eq_
+
+from amo.tests import TestCase
+from mkt.translations.models import PurifiedTranslation, Translation
+from mkt.translations.tasks import clean_translations
+
+
+class TestCleanTranslations(TestCase):
+    fixtures = ['testapp/test_models.json']
+
+    def get(self, id):
+        return Translation.objects.no_cache().get(id=id)
+
+    def test_clean(self):
+        eq_(self.get(20).localized_string_clean, None)
+        clean_translations('PurifiedTranslation', [20])
+        trans = self.get(20)
+        eq_(trans.clean_version, PurifiedTranslation.CLEAN_VERSION)
+        expected = PurifiedTranslation(localized_string=trans.localized_string)
+        eq_(trans.localized_string_clean, unicode(expected))
+
+    def test_current_left_alone(self):
+        Translation.objects.filter(id=20).update(
+            localized_string_clean='done',
+            clean_version=PurifiedTranslation.CLEAN_VERSION)
+        clean_translations('PurifiedTranslation', [20])
+        eq_(self.get(20).localized_string_clean, 'done')
+
+    def test_stale(self):
+        Translation.objects.filter(id=20).update(
+            localized_string_clean='stale',
+            clean_version=PurifiedTranslation.CLEAN_VERSION - 1)
+        clean_translations('PurifiedTranslation', [20])
+        eq_(self.get(20).clean_version, PurifiedTranslation.CLEAN_VERSION)
+
+    def test_command(self):
+        call_command('clean_translations')
+        for id in (20, 30):
+            eq_(self.get(id).clean_version, PurifiedTranslation.CLEAN_VERSION)
+        # Plain translations don't have a clean string.
+        eq_(self.get(1).clean_version, None)
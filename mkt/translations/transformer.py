@@ -3,7 +3,7 @@ from django.db import connections, models, router
 from django.utils import translation
 
 from mkt.translations.fields import TranslatedField
-from mkt.translations.models import Translation
+from mkt.translations.models import get_trans_sets, trans_fields, Translation
 
 isnull = """IF(!ISNULL({t1}.localized_string), {t1}.{col}, {t2}.{col})
             AS {name}_{col}"""
@@ -12,25 +12,28 @@ join = """LEFT OUTER JOIN translations {t}
 no_locale_join = """LEFT OUTER JOIN translations {t}
                     ON {t}.id={model}.{name}"""
 
-trans_fields = [f.name for f in Translation._meta.fields]
 
+def get_translated_fields(model):
+    if not hasattr(model._meta, 'translated_fields'):
+        model._meta.translated_fields = [f for f in model._meta.fields
+                                         if isinstance(f, TranslatedField)]
+    return model._meta.translated_fields
 
-def build_query(model, connection):
-    qn = connection.ops.quote_name
-    selects, joins, params = [], [], []
 
+def get_fallback(model):
     # The model can define a fallback locale (which may be a Field).
     if hasattr(model, 'get_fallback'):
-        fallback = model.get_fallback()
-    else:
-        fallback = settings.LANGUAGE_CODE
+        return model.get_fallback()
+    return settings.LANGUAGE_CODE
 
-    if not hasattr(model._meta, 'translated_fields'):
-        model._meta.translated_fields = [f for f in model._meta.fields
-                                         if isinstance(f, TranslatedField)]
+
+def build_query(model, connection):
+    qn = connection.ops.quote_name
+    selects, joins, params = [], [], []
+    fallback = get_fallback(model)
 
     # Add the selects and joins for each translated field on the model.
-    for field in model._meta.translated_fields:
+    for field in get_translated_fields(model):
         if isinstance(fallback, models.Field):
             fallback_str = '%s.%s' % (qn(model._meta.db_table),
                                       qn(fallback.column))
@@ -61,7 +64,11 @@ def build_query(model, connection):
     return s, params
 
 
-def get_trans(items):
+def get_trans_joined(items):
+    """
+    Attaches translations with two LEFT JOINs against the translations table
+    per translated field. Replaced by `get_trans`, kept to compare the two.
+    """
     if not items:
         return
 
@@ -85,3 +92,61 @@ def get_trans(items):
             t = Translation(*row[start:start+step])
             if t.id is not None and t.localized_string is not None:
                 setattr(item, field.name, t)
+
+
+def get_trans(items):
+    """
+    Attaches the translations of all the translated fields of `items`, in
+    the current locale or the fallback locale.
+
+    Only the translations in the current and fallback locales are taken from
+    the cached translation sets, and the fallbacks are resolved here. Fields
+    with require_locale=False fall back to a translation in any locale.
+    """
+    if not items:
+        return
+
+    model = items[0].__class__
+    fields = get_translated_fields(model)
+    fallback = get_fallback(model)
+    lang = (translation.get_language() or '').lower()
+
+    # Translation ids, and the fallback locale for each item. Locales are
+    # compared without case, as MySQL does.
+    wanted = []
+    for item in items:
+        if isinstance(fallback, models.Field):
+            item_fallback = getattr(item, fallback.attname)
+        else:
+            item_fallback = fallback
+        item_fallback = (item_fallback or '').lower()
+        for field in fields:
+            trans_id = getattr(item, field.attname)
+            if trans_id is not None:
+                wanted.append((item, field, trans_id, item_fallback))
+    if not wanted:
+        return
+
+    locales = set([lang]).union(l for i, f, t, l in wanted)
+    sets = get_trans_sets((t for i, f, t, l in wanted if f.require_locale),
+                          locales)
+    any_locale = [t for i, f, t, l in wanted if not f.require_locale]
+    if any_locale:
+        sets.update(get_trans_sets(any_locale))
+
+    found, first = {}, {}
+    for trans_id, translations in sets.items():
+        for t in translations:
+            found.setdefault(trans_id, {}).setdefault(t.locale.lower(), t)
+        if translations:
+            first[trans_id] = translations[0]
+
+    for item, field, trans_id, item_fallback in wanted:
+        by_locale = found.get(trans_id, {})
+        t = by_locale.get(lang)
+        if t is None:
+            t = by_locale.get(item_fallback)
+        if t is None and not field.require_locale:
+            t = first.get(trans_id)
+        if t is not None:
+            setattr(item, field.name, t)
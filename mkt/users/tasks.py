@@ -23,6 +23,19 @@ fxa_email_types = fxa_email_subjects.keys()
 log = commonware.log.getLogger('z.users')
 
 
+@task
+def update_user_attrs(updates, **kw):
+    """
+    Save the user attributes batched up by `mkt.users.utils.UserAttrsBuffer`.
+    `updates` is a list of (user id, {attribute: value}).
+    """
+    users = UserProfile.objects.in_bulk([pk for pk, attrs in updates])
+    for pk, attrs in updates:
+        if pk in users:
+            users[pk].update(**attrs)
+    log.info('Saved attributes for %s users' % len(users))
+
+
 @task
 def send_mail(user_ids, subject, html_template, text_template, link):
     for user in UserProfile.objects.filter(pk__in=user_ids):
@@ -1,11 +1,14 @@
 import fudge
 import mock
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 from django.conf import settings
 
 import amo.tests
-from mkt.users.utils import autocreate_username
+from mkt.site.fixtures import fixture
+from mkt.users.models import UserProfile
+from mkt.users.utils import (autocreate_username, record_user_attrs,
+                             UserAttrsBuffer)
 
 
 class TestAutoCreateUsername(amo.tests.TestCase):
@@ -36,3 +39,100 @@ class TestAutoCreateUsername(amo.tests.TestCase):
         filter = (filter.expects_call().returns_fake().expects('count')
                   .returns(1).next_call().returns(1).next_call().returns(0))
         eq_(autocreate_username('existingname'), 'existingname3')
+
+
+@mock.patch('mkt.users.tasks.update_user_attrs.delay')
+class TestUserAttrsBuffer(amo.tests.TestCase):
+
+    def setUp(self):
+        self.buffer = UserAttrsBuffer()
+        self.real_start_timer = UserAttrsBuffer.start_timer
+        patcher = mock.patch.object(UserAttrsBuffer, 'start_timer')
+        self.start_timer = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_coalesced(self, delay):
+        with self.settings(USER_ATTRS_FLUSH_INTERVAL=60):
+            self.buffer.record(1, region='br')
+            self.buffer.record(1, region='us')
+            self.buffer.record(2, region='fr')
+            assert not delay.called
+            self.buffer.flush()
+        eq_(sorted(delay.call_args[0][0]),
+            [(1, {'region': 'us'}), (2, {'region': 'fr'})])
+
+    def test_flush_interval(self, delay):
+        with self.settings(USER_ATTRS_FLUSH_INTERVAL=0):
+            self.buffer.record(1, region='br')
+        eq_(delay.call_args[0][0], [(1, {'region': 'br'})])
+        eq_(self.buffer.pending, {})
+
+    def test_flush_size(self, delay):
+        with self.settings(USER_ATTRS_FLUSH_INTERVAL=60,
+                           USER_ATTRS_FLUSH_SIZE=2):
+            self.buffer.record(1, region='br')
+            assert not delay.called
+            self.buffer.record(2, region='br')
+        eq_(len(delay.call_args[0][0]), 2)
+
+    def test_flush_empty(self, delay):
+        self.buffer.flush()
+        assert not delay.called
+
+    def test_flush_if_due(self, delay):
+        with self.settings(USER_ATTRS_FLUSH_INTERVAL=60):
+            self.buffer.record(1, region='br')
+            self.buffer.flush_if_due()
+            assert not delay.called
+            self.buffer.last_flush -= 60
+            # No more updates are recorded, the timer sends the pending ones.
+            self.buffer.flush_if_due()
+        eq_(delay.call_args[0][0], [(1, {'region': 'br'})])
+        assert self.start_timer.called
+
+    @mock.patch('mkt.users.utils.time.sleep')
+    def test_run_timer(self, sleep, delay):
+        # Stop the loop after the first flush.
+        sleep.side_effect = [None, StopIteration]
+        with self.settings(USER_ATTRS_FLUSH_INTERVAL=60):
+            self.buffer.record(1, region='br')
+            self.buffer.last_flush -= 60
+            with self.assertRaises(StopIteration):
+                self.buffer.run_timer()
+        sleep.assert_called_with(60)
+        eq_(delay.call_args[0][0], [(1, {'region': 'br'})])
+
+    @mock.patch('mkt.users.utils.threading.Thread')
+    def test_start_timer_once(self, thread, delay):
+        with self.settings(USER_ATTRS_FLUSH_INTERVAL=60):
+            self.real_start_timer(self.buffer)
+            self.real_start_timer(self.buffer)
+        eq_(thread.call_count, 1)
+        ok_(thread.return_value.daemon)
+        thread.return_value.start.assert_called_with()
+
+    @mock.patch('mkt.users.utils.threading.Thread')
+    def test_no_timer_without_interval(self, thread, delay):
+        with self.settings(USER_ATTRS_FLUSH_INTERVAL=0):
+            self.real_start_timer(self.buffer)
+        assert not thread.called
+
+
+class TestRecordUserAttrs(amo.tests.TestCase):
+    fixtures = fixture('user_999')
+
+    def test_saved(self):
+        user = UserProfile.objects.get(pk=999)
+        record_user_attrs(user, region='br')
+        eq_(user.region, 'br')
+        eq_(UserProfile.objects.get(pk=999).region, 'br')
+
+    @mock.patch.object(UserAttrsBuffer, 'start_timer')
+    @mock.patch('mkt.users.utils._attrs_buffer', new_callable=UserAttrsBuffer)
+    def test_not_saved_in_request(self, attrs_buffer, start_timer):
+        user = UserProfile.objects.get(pk=999)
+        user.update(region='us')
+        with self.settings(USER_ATTRS_FLUSH_INTERVAL=60):
+            record_user_attrs(user, region='br')
+        eq_(UserProfile.objects.get(pk=999).region, 'us')
+        eq_(attrs_buffer.pending, {999: {'region': 'br'}})
@@ -1,3 +1,7 @@
+import atexit
+import os
+import threading
+import time
 import uuid
 from functools import partial
 
@@ -35,3 +39,88 @@ def autocreate_username(candidate, tries=1):
     if UserProfile.objects.filter(username=adjusted_u).count():
         return autocreate_username(candidate, tries=tries + 1)
     return adjusted_u
+
+
+class UserAttrsBuffer(object):
+    """
+    A write-behind buffer for telemetry-like user attributes, eg: the last
+    region a user was seen in, which change too often to save on every
+    request.
+
+    Updates are coalesced per user in this process and handed to a task in
+    batches, at most every USER_ATTRS_FLUSH_INTERVAL seconds or when
+    USER_ATTRS_FLUSH_SIZE users are waiting. A timer thread flushes the
+    updates that are due when there are no more requests to do it.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.time()
+        self.timer_pid = None
+
+    def record(self, user_id, **attrs):
+        self.start_timer()
+        with self.lock:
+            self.pending.setdefault(user_id, {}).update(attrs)
+            due = self.is_due()
+        if due:
+            self.flush()
+
+    def is_due(self):
+        return (len(self.pending) >= settings.USER_ATTRS_FLUSH_SIZE or
+                time.time() - self.last_flush >=
+                settings.USER_ATTRS_FLUSH_INTERVAL)
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.time()
+        if pending:
+            from mkt.users.tasks import update_user_attrs
+            update_user_attrs.delay(pending.items())
+
+    def flush_if_due(self):
+        with self.lock:
+            due = bool(self.pending) and self.is_due()
+        if due:
+            self.flush()
+
+    def start_timer(self):
+        """
+        Starts the timer thread, once per process since threads don't
+        survive a fork. Updates are flushed straight away without an interval.
+        """
+        if (not settings.USER_ATTRS_FLUSH_INTERVAL or
+                self.timer_pid == os.getpid()):
+            return
+        with self.lock:
+            if self.timer_pid == os.getpid():
+                return
+            self.timer_pid = os.getpid()
+        thread = threading.Thread(target=self.run_timer,
+                                  name='user-attrs-flush')
+        thread.daemon = True
+        thread.start()
+
+    def run_timer(self):
+        while True:
+            time.sleep(settings.USER_ATTRS_FLUSH_INTERVAL or 1)
+            try:
+                self.flush_if_due()
+            except Exception:
+                log.error('Could not flush user attributes', exc_info=True)
+
+
+_attrs_buffer = UserAttrsBuffer()
+atexit.register(_attrs_buffer.flush)
+
+
+def record_user_attrs(user, **attrs):
+    """
+    Set `attrs` on the user and save them in the background, without a
+    database write in the request.
+    """
+    for key, value in attrs.items():
+        setattr(user, key, value)
+    _attrs_buffer.record(user.pk, **attrs)
@@ -268,8 +268,14 @@ class Version(ModelBase):
         """
         if not self.addon.is_packaged or not self.all_files:
             return False
-        data = self.addon.get_manifest_json(file_obj=self.all_files[0])
-        return data.get('type') == 'privileged'
+        # To avoid circular import.
+        from mkt.webapps.models import AppManifest
+
+        try:
+            return self.manifest_json.app_type == 'privileged'
+        except AppManifest.DoesNotExist:
+            data = self.addon.get_manifest_json(file_obj=self.all_files[0])
+            return data.get('type') == 'privileged'
 
     @amo.cached_property
     def manifest(self):
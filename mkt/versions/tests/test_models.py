@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import json
 import os.path
 
 from django.conf import settings
@@ -12,7 +13,7 @@ from mkt.files.models import File
 from mkt.files.tests.test_models import UploadTest as BaseUploadTest
 from mkt.site.fixtures import fixture
 from mkt.versions.models import Version
-from mkt.webapps.models import Webapp
+from mkt.webapps.models import AppManifest, Webapp
 
 
 class TestVersion(BaseUploadTest, amo.tests.TestCase):
@@ -65,22 +66,29 @@ class TestVersion(BaseUploadTest, amo.tests.TestCase):
         addon = Webapp.objects.get(pk=337141)
         eq_(addon.current_version.is_privileged, False)
 
-    @mock.patch('mkt.webapps.models.Webapp.get_manifest_json')
-    def test_is_privileged_app(self, get_manifest_json):
-        get_manifest_json.return_value = {
-            'type': 'privileged'
-        }
+    def test_is_privileged_app(self):
         addon = Webapp.objects.get(pk=337141)
         addon.update(is_packaged=True)
+        addon.current_version.manifest_json.update(
+            manifest=json.dumps({'type': 'privileged'}))
         eq_(addon.current_version.is_privileged, True)
 
+    def test_is_privileged_non_privileged_app(self):
+        addon = Webapp.objects.get(pk=337141)
+        addon.update(is_packaged=True)
+        addon.current_version.manifest_json.update(manifest=json.dumps({}))
+        eq_(addon.current_version.is_privileged, False)
+
     @mock.patch('mkt.webapps.models.Webapp.get_manifest_json')
-    def test_is_privileged_non_privileged_app(self, get_manifest_json):
+    def test_is_privileged_without_app_manifest(self, get_manifest_json):
         get_manifest_json.return_value = {
+            'type': 'privileged'
         }
         addon = Webapp.objects.get(pk=337141)
         addon.update(is_packaged=True)
-        eq_(addon.current_version.is_privileged, False)
+        AppManifest.objects.filter(version=addon.current_version).delete()
+        eq_(Version.objects.get(pk=addon.current_version.pk).is_privileged,
+            True)
 
     def test_delete(self):
         version = Version.objects.all()[0]
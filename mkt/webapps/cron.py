@@ -6,6 +6,7 @@ import time
 from datetime import datetime, timedelta
 
 from django.conf import settings
+from django.db import connection
 from django.db.models import Q
 
 import commonware.log
@@ -198,6 +199,16 @@ def _remove_stale_files(path, age, msg):
             os.remove(file_path)
 
 
+def _delete_nonces(before, batch=10000):
+    cursor = connection.cursor()
+    sql = ('DELETE FROM %s WHERE created < %%s LIMIT %s'
+           % (Nonce._meta.db_table, batch))
+    while True:
+        cursor.execute(sql, [before])
+        if cursor.rowcount < batch:
+            break
+
+
 @cronjobs.register
 def mkt_gc(**kw):
     """Site-wide garbage collections."""
@@ -213,8 +224,10 @@ def mkt_gc(**kw):
         delete_logs.delay(chunk)
 
     # Clear oauth nonce rows. These expire after 10 minutes but we're just
-    # clearing those that are more than 1 day old.
-    Nonce.objects.filter(created__lt=days_ago(1)).delete()
+    # clearing those that are more than 1 day old. Nonces normally live in
+    # the cache, so there are only rows from when it was unavailable, but
+    # delete in batches without loading them in case there are many.
+    _delete_nonces(days_ago(1))
 
     # Delete the dump apps over 30 days.
     _remove_stale_files(settings.DUMPED_APPS_PATH,
@@ -234,6 +247,13 @@ def mkt_gc(**kw):
                         settings.TMP_PATH_DAYS_DELETE,
                         'Deleting TMP_PATH file: {0}')
 
+    # Delete the cached signed apps over 30 days, they are signed again
+    # when needed.
+    if os.path.exists(settings.SIGNED_APPS_CACHE_PATH):
+        _remove_stale_files(settings.SIGNED_APPS_CACHE_PATH,
+                            settings.SIGNED_APPS_CACHE_DAYS_DELETE,
+                            'Deleting cached signed app: {0}')
+
     # Delete stale FileUploads.
     for fu in FileUpload.objects.filter(created__lte=days_ago(90)):
         log.debug(u'[FileUpload:{uuid}] Removing file: {path}'
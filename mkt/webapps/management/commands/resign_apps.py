@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+import commonware.log
+
+import amo
+from lib.crypto.packaged import sign
+from mkt.webapps.models import Webapp
+
+
+HELP = """\
+Re-sign packaged web apps in this process through a pool of workers.
+
+Progress is written to a checkpoint file as each app is done, so if the
+command is interrupted, running it again with the same checkpoint will
+carry on where it left off. Use --restart to start over.
+
+To specify which webapps to sign:
+
+    `--webapps=1234,5678,...9012`
+
+If omitted, all listed packaged apps will be re-signed.
+"""
+
+
+log = commonware.log.getLogger('z.crypto')
+
+
+class Throttle(object):
+    """Let at most `rate` calls through per second, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next = 0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.time()
+            delay = self.next - now
+            self.next = max(now, self.next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--webapps',
+                    help='Webapp ids to process. Use commas to separate '
+                         'multiple ids.'),
+        make_option('--workers', type='int', default=4,
+                    help='Number of apps to sign at once, default: '
+                         '%default'),
+        make_option('--rate', type='float', default=0,
+                    help='Maximum number of apps to start signing per '
+                         'second, default: no limit'),
+        make_option('--checkpoint',
+                    default=os.path.join(settings.TMP_PATH,
+                                         'resign_apps.checkpoint'),
+                    help='File to record progress in, default: %default'),
+        make_option('--restart', action='store_true', default=False,
+                    help='Ignore the progress in the checkpoint file.'),
+        make_option('--use-cache', action='store_true', default=False,
+                    help='Reuse packages already signed with the current '
+                         'key id, eg: when re-signing to change the ids. '
+                         'Not for key rotations.'),
+    )
+
+    help = HELP
+
+    def handle(self, *args, **kw):
+        if kw['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        self.checkpoint = kw['checkpoint']
+        if kw['restart'] and os.path.exists(self.checkpoint):
+            os.unlink(self.checkpoint)
+        done = self.read_checkpoint()
+
+        qs = Webapp.objects.filter(is_packaged=True,
+                                   status__in=amo.LISTED_STATUSES)
+        if kw['webapps']:
+            pks = [int(a.strip()) for a in kw['webapps'].split(',')]
+            qs = qs.filter(pk__in=pks)
+
+        todo = []
+        for app in qs.order_by('pk'):
+            version = app.current_version
+            if not version:
+                self.stdout.write('Public app [id:%s] with no current version'
+                                  % app.pk)
+                continue
+            if version.pk in done:
+                continue
+            todo.append((app.pk, version.pk))
+
+        self.stdout.write('Re-signing %s apps, %s already done.'
+                          % (len(todo), len(done)))
+
+        self.use_cache = kw['use_cache']
+        self.throttle = Throttle(kw['rate'])
+        self.lock = threading.Lock()
+        self.failed = 0
+
+        start = time.time()
+        if kw['workers'] == 1:
+            map(self.resign, todo)
+        else:
+            pool = ThreadPool(kw['workers'])
+            try:
+                pool.map(self.resign_in_thread, todo)
+            finally:
+                pool.close()
+                pool.join()
+
+        self.stdout.write('Re-signed %s apps in %.1fs, %s failed.'
+                          % (len(todo), time.time() - start, self.failed))
+
+    def read_checkpoint(self):
+        """Returns the version ids successfully re-signed so far."""
+        done = set()
+        if not os.path.exists(self.checkpoint):
+            return done
+        with open(self.checkpoint) as fobj:
+            for line in fobj:
+                parts = line.split()
+                if len(parts) == 4 and parts[2] == 'ok':
+                    done.add(int(parts[1]))
+        return done
+
+    def resign_in_thread(self, ids):
+        try:
+            self.resign(ids)
+        finally:
+            # Each worker thread opens its own database connection.
+            connection.close()
+
+    def resign(self, ids):
+        app_id, version_id = ids
+        self.throttle.wait()
+        start = time.time()
+        try:
+            sign(version_id, resign=True, use_cache=self.use_cache)
+            status = 'ok'
+        except Exception:
+            log.error('[Webapp:%s] Re-signing version %s failed'
+                      % (app_id, version_id), exc_info=True)
+            status = 'failed'
+        elapsed = time.time() - start
+
+        line = '%s %s %s %.3f' % (app_id, version_id, status, elapsed)
+        with self.lock:
+            if status != 'ok':
+                self.failed += 1
+            with open(self.checkpoint, 'a') as fobj:
+                fobj.write(line + '\n')
+            self.stdout.write(line)
@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
+import collections
+import copy
 import datetime
 import hashlib
 import itertools
 import json
 import os
 import re
+import threading
 import time
 import urlparse
 import uuid
@@ -13,27 +16,30 @@ from django.conf import settings
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.storage import default_storage as storage
+from django.core.signals import request_finished
 from django.core.urlresolvers import reverse
 from django.db import models, transaction
 from django.db.models import signals as dbsignals, Max, Q
+from django.db.models.query import prefetch_related_objects
 from django.dispatch import receiver
 from django.utils.translation import trans_real as translation
 
 import caching.base as caching
 import commonware.log
+from celery.signals import task_postrun
 import json_field
-from cache_nuggets.lib import memoize, memoize_key
 from jinja2.filters import do_dictsort
 from tower import ugettext as _
 from tower import ugettext_lazy as _lazy
 
 import amo
 import mkt
-from amo.utils import (JSONEncoder, slugify, smart_path, sorted_groupby,
-                       urlparams)
+from amo.utils import (cache_lock, JSONEncoder, slugify, smart_path,
+                       sorted_groupby, urlparams)
 from lib.crypto import packaged
 from lib.iarc.client import get_iarc_client
 from lib.iarc.utils import get_iarc_app_title, render_xml
+from lib.misc.lru import LRUCache
 from lib.utils import static_url
 from mkt.access import acl
 from mkt.constants import APP_FEATURES, apps, iarc_mappings
@@ -41,7 +47,8 @@ from mkt.constants.applications import DEVICE_TYPES
 from mkt.constants.payments import PROVIDER_CHOICES
 from mkt.files.models import File, nfd_str
 from mkt.files.utils import parse_addon, WebAppParser
-from mkt.prices.models import AddonPremium, Price
+from mkt.prices.models import (AddonPremium, get_price_table, Price,
+                               PriceCurrency)
 from mkt.ratings.models import Review
 from mkt.regions.utils import parse_region
 from mkt.site.decorators import skip_cache, use_master, write
@@ -50,10 +57,10 @@ from mkt.site.mail import send_mail
 from mkt.site.models import (DynamicBoolFieldsMixin, ManagerBase, ModelBase,
                              OnChangeMixin)
 from mkt.site.storage_utils import copy_stored_file
-from mkt.tags.models import Tag
+from mkt.tags.models import AddonTag, Tag
 from mkt.translations.fields import (PurifiedField, save_signal,
                                      TranslatedField, Translation)
-from mkt.translations.models import attach_trans_dict
+from mkt.translations.models import attach_trans_dict, register_sort_keys
 from mkt.translations.utils import find_language, to_language
 from mkt.users.models import UserForeignKey, UserProfile
 from mkt.versions.models import Version
@@ -65,6 +72,10 @@ from mkt.webapps.utils import (dehydrate_content_rating, get_locale_properties,
 
 log = commonware.log.getLogger('z.addons')
 
+# Manifests parsed from packages, for versions without an AppManifest, by
+# file id and hash.
+parsed_manifests = LRUCache(100)
+
 
 def clean_slug(instance, slug_field='app_slug'):
     """Cleans a model instance slug.
@@ -181,9 +192,10 @@ def attach_prices(addons):
     prices = (AddonPremium.objects
               .filter(addon__in=addon_dict,
                       addon__premium_type__in=amo.ADDON_PREMIUMS)
-              .values_list('addon', 'price__price'))
-    for addon, price in prices:
-        addon_dict[addon].price = price
+              .values_list('addon', 'price'))
+    tiers = get_price_table().tiers
+    for addon, tier in prices:
+        addon_dict[addon].price = tiers[tier].price if tier in tiers else None
 
 
 def attach_translations(addons):
@@ -327,6 +339,18 @@ def reverse_version(version):
     return
 
 
+class WebappQuerySet(query.IndexQuerySet):
+
+    def update(self, **kw):
+        # Queryset updates don't send signals, so forget the cached apps
+        # they change here.
+        app_ids = list(self.values_list('id', flat=True))
+        rows = super(WebappQuerySet, self).update(**kw)
+        for app_id in app_ids:
+            invalidate_app_graph(app_id)
+        return rows
+
+
 class WebappManager(ManagerBase):
 
     def __init__(self, include_deleted=False):
@@ -335,7 +359,7 @@ class WebappManager(ManagerBase):
 
     def get_query_set(self):
         qs = super(WebappManager, self).get_query_set()
-        qs = qs._clone(klass=query.IndexQuerySet)
+        qs = qs._clone(klass=WebappQuerySet)
         if not self.include_deleted:
             qs = qs.exclude(status=amo.STATUS_DELETED)
         return qs.transform(Webapp.transformer)
@@ -661,9 +685,7 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
         if addon_dict is None:
             addon_dict = dict((a.id, a) for a in addons)
 
-        # There's a constrained amount of price tiers, may as well load
-        # them all and let cache machine keep them cached.
-        prices = dict((p.id, p) for p in Price.objects.all())
+        prices = get_price_table().tiers
         # Attach premium addons.
         qs = AddonPremium.objects.filter(addon__in=addons)
         premium_dict = dict((ap.addon_id, ap) for ap in qs)
@@ -1203,7 +1225,9 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
     def geodata(self):
         if hasattr(self, '_geodata'):
             return self._geodata
-        return Geodata.objects.get_or_create(addon=self)[0]
+        geodata = Geodata.objects.get_or_create(addon=self)[0]
+        setattr(self, Webapp._geodata.cache_name, geodata)
+        return geodata
 
     def get_api_url(self, action=None, api=None, resource=None, pk=False):
         """Reverse a URL for the API."""
@@ -1323,12 +1347,17 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
             # TODO: Remove this when we're satisified the above is working.
             log.info('Falling back to loading manifest from file system. '
                      'Webapp:%s File:%s' % (self.id, file_.id))
-            if file_.status == amo.STATUS_DISABLED:
-                file_path = file_.guarded_file_path
-            else:
-                file_path = file_.file_path
-
-            return WebAppParser().get_json_data(file_path)
+            key = (file_.id, file_.hash)
+            manifest = parsed_manifests.get(key)
+            if manifest is None:
+                if file_.status == amo.STATUS_DISABLED:
+                    file_path = file_.guarded_file_path
+                else:
+                    file_path = file_.file_path
+                manifest = parsed_manifests[key] = (
+                    WebAppParser().get_json_data(file_path))
+            # Callers are free to change what they get.
+            return copy.deepcopy(manifest)
 
     def manifest_updated(self, manifest, upload):
         """The manifest has updated, update the version and file.
@@ -1502,8 +1531,14 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
         """
         if self.is_packaged:
             return True
-        manifest = self.get_manifest_json()
-        return bool(manifest and 'appcache_path' in manifest)
+        version = self.current_version
+        if not version:
+            return False
+        try:
+            return version.manifest_json.is_offline
+        except AppManifest.DoesNotExist:
+            manifest = self.get_manifest_json()
+            return bool(manifest and 'appcache_path' in manifest)
 
     def mark_done(self):
         """When the submission process is done, update status accordingly."""
@@ -1655,8 +1690,11 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
 
         Note: free and in-app are not included in this.
         """
-        excluded = set(self.addonexcludedregion
-                           .values_list('region', flat=True))
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'addonexcludedregion' not in prefetched:
+            return get_excluded_regions(self.pk) if self.pk else []
+
+        excluded = set(aer.region for aer in self.addonexcludedregion.all())
 
         if self.is_premium():
             all_regions = set(mkt.regions.ALL_REGION_IDS)
@@ -1676,7 +1714,7 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
     def get_price_region_ids(self):
         tier = self.get_tier()
         if tier:
-            return sorted(p['region'] for p in tier.prices() if p['paid'])
+            return sorted(get_price_table().paid_regions([tier.id])[tier.id])
         return []
 
     def get_regions(self, regions=None):
@@ -1753,6 +1791,57 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
                 os.path.join(reverse('downloads.file', args=[file_obj.id]),
                              file_obj.filename))
 
+    @classmethod
+    def get_cached(cls, pk):
+        """
+        Returns the app with everything its detail page and API need already
+        loaded, from the cache if it's still current, or None if there is no
+        such app.
+
+        Cached apps are invalidated by bumping their generation, which the
+        signals at the bottom of this module do whenever the app or anything
+        attached to it changes, and so do queryset updates of apps. Queryset
+        updates of the rest are only seen once the app expires, see
+        WEBAPP_GRAPH_CACHE_TIMEOUT.
+        """
+        key = APP_GRAPH_KEY % pk
+        app, generation = get_app_cached(key, pk)
+        if app is not None:
+            return app
+
+        try:
+            app = cls.objects.get(pk=pk)
+        except cls.DoesNotExist:
+            return None
+        app.load_graph()
+        set_app_cached(key, pk, generation, app,
+                       settings.WEBAPP_GRAPH_CACHE_TIMEOUT)
+        return app
+
+    def load_graph(self):
+        """
+        Load the relations the transformer doesn't, so that they are stored
+        with the app when it is cached.
+        """
+        apps = [self]
+        upsell, upsold = self.upsell, self.upsold
+        if upsell:
+            apps.append(upsell.premium)
+        if upsold:
+            upsold.free
+        prefetch_related_objects(apps, ['addonexcludedregion'])
+        prefetch_related_objects([self], ['tags', 'content_ratings',
+                                          'versions'])
+        for app in apps:
+            app.geodata
+        for name in ('rating_descriptors', 'rating_interactives'):
+            # Sets the related object or None on the app.
+            hasattr(self, name)
+        self.is_offline
+        self.app_type
+        if self.current_version:
+            hasattr(self.current_version, 'features')
+
     def get_cached_manifest(self, force=False):
         """
         Creates the "mini" manifest for packaged apps and caches it.
@@ -1761,55 +1850,125 @@ class Webapp(UUIDModelMixin, OnChangeMixin, ModelBase):
         version of this manifest, e.g., when a new version of the packaged app
         is approved.
 
+        Only one process builds an app's manifest at a time. While it's being
+        rebuilt for a new version, other callers get the previous one, and
+        they only wait for it if there isn't one. Its validators are built
+        and cached with it, see `get_cached_manifest_validators`.
+
         If the addon is not a packaged app, this will not cache anything.
 
         """
         if not self.is_packaged:
             return
 
-        key = 'webapp:{0}:manifest'.format(self.pk)
-
-        if not force:
-            data = cache.get(key)
-            if data:
-                return data
-
         version = self.current_version
         if not version:
             # There's no valid version so we return an empty mini-manifest.
             # Note: We want to avoid caching this so when a version does become
             # available it can get picked up correctly.
             return '{}'
-        else:
-            # This will sign the package if it isn't already.
-            #
-            # Ensure that the calling method checks various permissions if
-            # needed. E.g. see mkt/detail/views.py. This is also called as a
-            # task after reviewer approval so we can't perform some checks
-            # here.
-            signed_file_path = packaged.sign(version.pk)
-            file_obj = version.all_files[0]
-            manifest = self.get_manifest_json(file_obj)
-            package_path = absolutify(
-                os.path.join(reverse('downloads.file', args=[file_obj.id]),
-                             file_obj.filename))
 
-            data = {
-                'name': manifest['name'],
-                'version': version.version,
-                'size': storage.size(signed_file_path),
-                'release_notes': version.releasenotes,
-                'package_path': package_path,
-            }
-            for key in ['developer', 'icons', 'locales']:
-                if key in manifest:
-                    data[key] = manifest[key]
+        key = manifest_key(self.pk)
+
+        def fresh(entry):
+            return isinstance(entry, dict) and entry['version'] == version.pk
+
+        entry = None if force else cache.get(key)
+        if fresh(entry):
+            return entry['data']
+        # Entries cached before they were tagged with a version are strings.
+        stale = entry['data'] if isinstance(entry, dict) else entry
+
+        with cache_lock(key, wait=0 if stale else 30) as locked:
+            if not locked and stale:
+                return stale
+            if not force or not locked:
+                # Someone else may have built it while we waited. If they are
+                # taking too long, build it anyway.
+                entry = cache.get(key)
+                if fresh(entry):
+                    return entry['data']
+            data = self.build_mini_manifest(version)
+            validators = self.get_manifest_validators(data)
+            cache.set(key, {'version': version.pk, 'data': data,
+                            'validators': validators}, None)
+            # Have the answers to conditional requests ready too.
+            if self.has_public_manifest():
+                cache.set(manifest_validators_key(self.guid), validators,
+                          None)
+            if not self.is_disabled:
+                cache_download_etag(version.all_files[0])
 
-        data = json.dumps(data, cls=JSONEncoder)
+        return data
 
-        cache.set(key, data, None)
+    def has_public_manifest(self):
+        """If anyone can get the mini-manifest of this packaged app."""
+        return (self.is_packaged and not self.disabled_by_user and
+                self.status in (amo.STATUS_PUBLIC, amo.STATUS_UNLISTED,
+                                amo.STATUS_BLOCKED))
+
+    def get_manifest_validators(self, manifest):
+        """
+        Returns a dict of the ETag, Last-Modified date and version of the
+        mini-manifest `manifest`. The ETag also depends on the package.
+        """
+        etag = hashlib.sha256()
+        etag.update(manifest)
+        modified = self.modified
+        package_file = self.get_latest_file()
+        if package_file:
+            # Update the hash with the content of the package itself.
+            etag.update(package_file.hash)
+            modified = package_file.modified
+        version = self.current_version
+        validators = {'etag': etag.hexdigest(), 'modified': modified,
+                      'version': version.version if version else None}
+        return validators
 
-        return data
+    def get_cached_manifest_validators(self, manifest):
+        """
+        Returns the validators of the mini-manifest `manifest` cached with
+        it when it was built, computing them again if it isn't the cached
+        manifest of the current version. They are only ever cached by
+        `get_cached_manifest`, for apps anyone can get they are also cached
+        by guid so that conditional requests and update checks can be
+        answered without loading the app.
+        """
+        entry = cache.get(manifest_key(self.pk))
+        version = self.current_version
+        if (isinstance(entry, dict) and version and
+                entry['version'] == version.pk and
+                entry['data'] == manifest and entry.get('validators')):
+            return entry['validators']
+        return self.get_manifest_validators(manifest)
+
+    def build_mini_manifest(self, version):
+        """Returns the mini manifest for a version as JSON."""
+        # This will sign the package if it isn't already.
+        #
+        # Ensure that the calling method checks various permissions if
+        # needed. E.g. see mkt/detail/views.py. This is also called as a
+        # task after reviewer approval so we can't perform some checks
+        # here.
+        signed_file_path = packaged.sign(version.pk)
+        file_obj = version.all_files[0]
+        manifest = self.get_manifest_json(file_obj)
+        package_path = absolutify(
+            os.path.join(reverse('downloads.file', args=[file_obj.id]),
+                         file_obj.filename))
+
+        data = {
+            'name': manifest['name'],
+            'version': version.version,
+            'size': storage.size(signed_file_path),
+            'release_notes': version.releasenotes,
+            'package_path': package_path,
+        }
+        for key in ['developer', 'icons', 'locales']:
+            if key in manifest:
+                data[key] = manifest[key]
+
+        return json.dumps(data, cls=JSONEncoder)
 
     def sign_if_packaged(self, version_pk, reviewer=False):
         if not self.is_packaged:
@@ -2236,6 +2395,9 @@ Webapp._meta.translated_fields = [
     Webapp._meta.get_field('support_url'),
 ]
 
+# Listings sorted by name use precomputed sort keys.
+register_sort_keys(Webapp, 'name')
+
 
 @receiver(dbsignals.post_save, sender=Webapp,
           dispatch_uid='webapp.search.index')
@@ -2390,11 +2552,13 @@ class AddonExcludedRegion(ModelBase):
         return mkt.regions.REGIONS_CHOICES_ID_DICT.get(self.region)
 
 
-@memoize(prefix='get_excluded_in')
 def get_excluded_in(region_id):
     """
     Return IDs of Webapp objects excluded from a particular region or excluded
     due to Geodata flags.
+
+    This loads every exclusion for the region, use is_excluded_in to check
+    single apps.
     """
     aers = list(AddonExcludedRegion.objects.filter(region=region_id)
                 .values_list('addon', flat=True))
@@ -2415,15 +2579,6 @@ def get_excluded_in(region_id):
     return set(aers + geodata_exclusions)
 
 
-@receiver(models.signals.post_save, sender=AddonExcludedRegion,
-          dispatch_uid='clean_memoized_exclusions')
-def clean_memoized_exclusions(sender, **kw):
-    if not kw.get('raw'):
-        for k in mkt.regions.ALL_REGION_IDS:
-            cache.delete_many([memoize_key('get_excluded_in', k)
-                               for k in mkt.regions.ALL_REGION_IDS])
-
-
 class IARCInfo(ModelBase):
     """
     Stored data for IARC.
@@ -2665,9 +2820,35 @@ class AppManifest(ModelBase):
     version = models.OneToOneField(Version, related_name='manifest_json')
     manifest = models.TextField()
 
+    # Denormalized from the manifest when it's saved, see `set_attributes`.
+    is_offline = models.BooleanField(default=False)
+    app_type = models.CharField(max_length=20, default='')
+    permissions = json_field.JSONField(default=None, null=True)
+    launch_path = models.CharField(max_length=255, default='')
+
     class Meta:
         db_table = 'app_manifest'
 
+    def set_attributes(self):
+        """Sets the attributes we need often from the manifest text."""
+        try:
+            data = json.loads(self.manifest) if self.manifest else {}
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        self.is_offline = 'appcache_path' in data
+        self.app_type = unicode(data.get('type') or '')[:20]
+        permissions = data.get('permissions')
+        self.permissions = permissions if isinstance(permissions, dict) else {}
+        self.launch_path = unicode(data.get('launch_path') or '')[:255]
+
+
+@receiver(dbsignals.pre_save, sender=AppManifest,
+          dispatch_uid='app_manifest_attributes')
+def app_manifest_attributes(sender, instance, **kw):
+    instance.set_attributes()
+
 
 class RegionListField(json_field.JSONField):
     def to_python(self, value):
@@ -2804,3 +2985,382 @@ for region in (mkt.regions.BR, mkt.regions.DE):
 # Save geodata translations when a Geodata instance is saved.
 models.signals.pre_save.connect(save_signal, sender=Geodata,
                                 dispatch_uid='geodata_translations')
+
+
+def manifest_key(pk):
+    return 'webapp:{0}:manifest'.format(pk)
+
+
+def manifest_validators_key(guid):
+    return 'webapp:{0}:manifest:validators'.format(guid)
+
+
+def download_etag_key(file_id):
+    return 'file:{0}:download:etag'.format(file_id)
+
+
+def download_etag(file_obj):
+    return file_obj.hash.split(':')[-1]
+
+
+def cache_download_etag(file_obj):
+    """
+    Cache the ETag of a public package so that conditional requests for it
+    can be answered without loading the file or signing it.
+    """
+    if (file_obj.status in (amo.STATUS_PUBLIC, amo.STATUS_BLOCKED) and
+            file_obj.hash):
+        cache.set(download_etag_key(file_obj.pk), download_etag(file_obj),
+                  None)
+
+
+def invalidate_validators(app):
+    """Forget the cached ETags for the app's manifest and packages."""
+    file_ids = (File.objects.filter(version__addon=app.id)
+                .values_list('id', flat=True))
+    cache.delete_many([manifest_validators_key(app.guid)] +
+                      [download_etag_key(pk) for pk in file_ids])
+
+
+@Webapp.on_change
+def watch_validators(old_attr={}, new_attr={}, instance=None, sender=None,
+                     **kw):
+    """Forget the cached ETags when who can get the app changes."""
+    if any(old_attr.get(k) != new_attr.get(k)
+           for k in ('status', 'disabled_by_user', 'is_packaged')):
+        invalidate_validators(instance)
+
+
+@receiver(dbsignals.post_save, sender=File,
+          dispatch_uid='file_validators_changed')
+def file_validators_changed(sender, instance, **kw):
+    if kw.get('raw'):
+        return
+    cache.delete(download_etag_key(instance.pk))
+    # The manifests and their validators depend on the package.
+    apps = (Version.with_deleted.filter(pk=instance.version_id)
+            .values_list('addon', 'addon__guid'))
+    keys = []
+    for pk, guid in apps:
+        keys.extend([manifest_key(pk), manifest_validators_key(guid)])
+    cache.delete_many(keys)
+
+
+APP_GRAPH_KEY = 'webapp:graph:%s'
+APP_GRAPH_GENERATION_KEY = 'webapp:graph:generation:%s'
+
+
+def bump_app_graph_generation(key):
+    """Bump the generation at `key`, returning the new value."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Start at a value that can't have been used before.
+        generation = int(time.time() * 1000)
+        cache.set(key, generation, None)
+        return generation
+
+
+def app_generation_keys(app_id):
+    return [APP_GRAPH_GENERATION_KEY % app_id,
+            APP_GRAPH_GENERATION_KEY % 'all']
+
+
+def get_app_cached(key, app_id):
+    """
+    Returns the value cached at `key` by set_app_cached if `app_id` hasn't
+    changed since, or None, and the current generation to cache a new value
+    with. This is a single cache round trip.
+    """
+    generation_keys = app_generation_keys(app_id)
+    found = cache.get_many([key] + generation_keys)
+    generation = [found.get(k) for k in generation_keys]
+    if key in found and None not in generation:
+        entry_generation, value = found[key]
+        if entry_generation == generation:
+            return value, generation
+    return None, generation
+
+
+def set_app_cached(key, app_id, generation, value, timeout):
+    """
+    Cache `value` for `app_id` at `key`, as of the `generation` returned by
+    get_app_cached before the value was built.
+    """
+    if not timeout:
+        return
+    if None in generation:
+        generation = [g or bump_app_graph_generation(k) for g, k in
+                      zip(generation, app_generation_keys(app_id))]
+    cache.set(key, (generation, value), timeout)
+
+
+def invalidate_app_graph(app_id=None):
+    """
+    Invalidate the cached app from Webapp.get_cached, or all of them if no
+    `app_id` is given.
+    """
+    bump_app_graph_generation(APP_GRAPH_GENERATION_KEY % (app_id or 'all'))
+
+
+def app_graph_changed(sender, instance, **kw):
+    if kw.get('raw'):
+        return
+    if isinstance(instance, Webapp):
+        app_ids = [instance.pk]
+    elif isinstance(instance, AddonUpsell):
+        app_ids = [instance.free_id, instance.premium_id]
+    elif hasattr(instance, 'addon_id'):
+        app_ids = [instance.addon_id]
+    else:
+        # Files, manifests and features belong to a version.
+        app_ids = list(Version.with_deleted.filter(pk=instance.version_id)
+                       .values_list('addon', flat=True))
+    for app_id in filter(None, app_ids):
+        invalidate_app_graph(app_id)
+
+
+def app_graph_prices_changed(sender, instance, **kw):
+    if not kw.get('raw'):
+        invalidate_app_graph()
+
+
+for model in (Webapp, Version, File, Preview, AddonDeviceType, AddonPremium,
+              AddonUpsell, AddonTag, AddonExcludedRegion, ContentRating,
+              RatingDescriptors, RatingInteractives, Geodata, AppFeatures,
+              AppManifest):
+    uid = 'app_graph_%s' % model._meta.db_table
+    dbsignals.post_save.connect(app_graph_changed, sender=model,
+                                dispatch_uid=uid)
+    dbsignals.post_delete.connect(app_graph_changed, sender=model,
+                                  dispatch_uid=uid + '_delete')
+
+for model in (Price, PriceCurrency):
+    uid = 'app_graph_%s' % model._meta.db_table
+    dbsignals.post_save.connect(app_graph_prices_changed, sender=model,
+                                dispatch_uid=uid)
+    dbsignals.post_delete.connect(app_graph_prices_changed, sender=model,
+                                  dispatch_uid=uid + '_delete')
+
+
+# The region exclusion index: for each block of EXCLUSIONS_BLOCK_SIZE app
+# ids, dicts of region id to a bitmap of the apps in the block excluded from
+# that region by an AddonExcludedRegion or their Geodata ('excluded'), and of
+# the premium apps their price tier can't be paid for in ('unpaid').
+EXCLUSIONS_BLOCK_SIZE = 4096
+EXCLUSIONS_KEY = 'webapp:exclusions:%s'
+
+
+def load_exclusions(lookup, value):
+    """
+    Returns dicts of app id to the set of regions the apps are excluded from
+    and to the set of regions they can't be paid for in, for the apps with an
+    id matching the `lookup` (eg: 'exact' or 'range') for `value`.
+    """
+    excluded = collections.defaultdict(set)
+    unpaid = collections.defaultdict(set)
+    aers = AddonExcludedRegion.objects.filter(**{'addon__' + lookup: value})
+    for app_id, region in aers.values_list('addon', 'region'):
+        excluded[app_id].add(region)
+
+    geodata = Geodata.objects.filter(
+        Q(region_br_iarc_exclude=True) | Q(region_de_iarc_exclude=True) |
+        Q(region_de_usk_exclude=True), **{'addon__' + lookup: value})
+    for app_id, br_iarc, de_iarc, de_usk in geodata.values_list(
+            'addon', 'region_br_iarc_exclude', 'region_de_iarc_exclude',
+            'region_de_usk_exclude'):
+        if de_iarc or de_usk:
+            excluded[app_id].add(mkt.regions.DE.id)
+        if br_iarc:
+            excluded[app_id].add(mkt.regions.BR.id)
+
+    # Premium apps are excluded from the regions their tier can't be paid
+    # in, which is all of them if they don't have a tier.
+    premium = list(Webapp.with_deleted.filter(
+        premium_type__in=amo.ADDON_PREMIUMS, **{'id__' + lookup: value})
+        .values_list('id', 'addonpremium__price'))
+    paid = get_price_table().paid_regions(
+        set(tier for app_id, tier in premium if tier))
+    all_regions = set(mkt.regions.ALL_REGION_IDS)
+    for app_id, tier in premium:
+        unpaid[app_id].update(all_regions - paid.get(tier, frozenset()))
+
+    return {'excluded': excluded, 'unpaid': unpaid}
+
+
+def _has_bit(bitmap, offset):
+    return bool(bitmap[offset >> 3] & (1 << (offset & 7)))
+
+
+def _set_bit(bitmap, offset, value):
+    if value:
+        bitmap[offset >> 3] |= 1 << (offset & 7)
+    else:
+        bitmap[offset >> 3] &= ~(1 << (offset & 7)) & 0xff
+
+
+def build_exclusions_block(block):
+    start = block * EXCLUSIONS_BLOCK_SIZE
+    end = start + EXCLUSIONS_BLOCK_SIZE - 1
+    bitmaps = {}
+    for kind, apps in load_exclusions('range', (start, end)).items():
+        bitmaps[kind] = {}
+        for app_id, regions in apps.items():
+            for region in regions:
+                if region not in bitmaps[kind]:
+                    bitmaps[kind][region] = bytearray(
+                        EXCLUSIONS_BLOCK_SIZE // 8)
+                _set_bit(bitmaps[kind][region], app_id - start, True)
+    return bitmaps
+
+
+def get_exclusions_blocks(blocks):
+    """
+    Returns a dict of the bitmaps for each of the blocks of app ids `blocks`,
+    fetched from the cache at once and building the ones that aren't cached.
+    """
+    keys = dict((EXCLUSIONS_KEY % block, block) for block in blocks)
+    cached = cache.get_many(keys)
+    bitmaps = dict((keys[key], value) for key, value in cached.items())
+    for key, block in keys.items():
+        if key not in cached:
+            bitmaps[block] = build_exclusions_block(block)
+            if settings.WEBAPP_EXCLUSIONS_CACHE_TIMEOUT:
+                cache.set(key, bitmaps[block],
+                          settings.WEBAPP_EXCLUSIONS_CACHE_TIMEOUT)
+    return bitmaps
+
+
+def get_exclusions_block(block):
+    """
+    Returns the bitmaps for the block of app ids `block`, building them if
+    they aren't cached.
+    """
+    return get_exclusions_blocks([block])[block]
+
+
+def _is_excluded(bitmaps, offset, region_id, unpaid):
+    kinds = ('excluded', 'unpaid') if unpaid else ('excluded',)
+    return any(region_id in bitmaps[kind] and
+               _has_bit(bitmaps[kind][region_id], offset) for kind in kinds)
+
+
+def is_excluded_in(app_id, region_id, unpaid=False):
+    """
+    Returns True if the app is excluded from the region. If `unpaid` is True,
+    premium apps that can't be paid for in the region count as excluded.
+    """
+    block, offset = divmod(app_id, EXCLUSIONS_BLOCK_SIZE)
+    return _is_excluded(get_exclusions_block(block), offset, region_id,
+                        unpaid)
+
+
+def get_excluded_ids(app_ids, region_id, unpaid=False):
+    """
+    Returns the set of the ids in `app_ids` excluded from the region, like
+    `is_excluded_in` but getting all their blocks from the cache at once.
+    """
+    app_ids = list(app_ids)
+    blocks = get_exclusions_blocks(set(app_id // EXCLUSIONS_BLOCK_SIZE
+                                       for app_id in app_ids))
+    excluded = set()
+    for app_id in app_ids:
+        block, offset = divmod(app_id, EXCLUSIONS_BLOCK_SIZE)
+        if _is_excluded(blocks[block], offset, region_id, unpaid):
+            excluded.add(app_id)
+    return excluded
+
+
+def get_excluded_regions(app_id):
+    """
+    Returns the sorted ids of the regions the app is excluded from, including
+    those it can't be paid for in.
+    """
+    block, offset = divmod(app_id, EXCLUSIONS_BLOCK_SIZE)
+    bitmaps = get_exclusions_block(block)
+    return sorted(set(region for kind in ('excluded', 'unpaid')
+                      for region, bitmap in bitmaps[kind].iteritems()
+                      if _has_bit(bitmap, offset)))
+
+
+def update_exclusions(app_id):
+    """
+    Update the app's bits in its cached block, if there is one. If another
+    process is updating the same block, the block is dropped instead so it
+    gets rebuilt on the next read.
+    """
+    block, offset = divmod(app_id, EXCLUSIONS_BLOCK_SIZE)
+    key = EXCLUSIONS_KEY % block
+    with cache_lock(key, wait=1) as locked:
+        bitmaps = cache.get(key)
+        if bitmaps is None:
+            return
+        if not locked:
+            cache.delete(key)
+            return
+        for kind, apps in load_exclusions('exact', app_id).items():
+            regions = apps.get(app_id, set())
+            for region in regions.union(bitmaps[kind]):
+                if region not in bitmaps[kind]:
+                    bitmaps[kind][region] = bytearray(
+                        EXCLUSIONS_BLOCK_SIZE // 8)
+                _set_bit(bitmaps[kind][region], offset, region in regions)
+        cache.set(key, bitmaps, settings.WEBAPP_EXCLUSIONS_CACHE_TIMEOUT)
+
+
+def invalidate_exclusions():
+    """Drop every cached block, eg: when prices change."""
+    top = Webapp.with_deleted.aggregate(Max('id'))['id__max'] or 0
+    cache.delete_many([EXCLUSIONS_KEY % block for block in
+                       range(top // EXCLUSIONS_BLOCK_SIZE + 1)])
+
+
+_exclusions_locals = threading.local()
+
+
+def _get_changed_exclusions():
+    """Returns the ids of the apps the calling thread changed."""
+    return _exclusions_locals.__dict__.setdefault('changed', set())
+
+
+def exclusions_changed(sender, instance, **kw):
+    if kw.get('raw'):
+        return
+    app_id = instance.pk if isinstance(instance, Webapp) else instance.addon_id
+    if app_id:
+        update_exclusions(app_id)
+        # The transaction isn't committed yet, so a concurrent rebuild of the
+        # block could put the old bits back. Update them again at the end.
+        _get_changed_exclusions().add(app_id)
+
+
+@receiver(request_finished, dispatch_uid='exclusions_request')
+@receiver(task_postrun, dispatch_uid='exclusions_task')
+def update_changed_exclusions(**kw):
+    """
+    Updates the bits of the apps changed during the request or task again,
+    once its transaction is committed.
+    """
+    changed = _get_changed_exclusions()
+    while changed:
+        update_exclusions(changed.pop())
+
+
+def exclusions_prices_changed(sender, instance, **kw):
+    if not kw.get('raw'):
+        invalidate_exclusions()
+
+
+for model in (Webapp, AddonExcludedRegion, AddonPremium, Geodata):
+    uid = 'exclusions_%s' % model._meta.db_table
+    dbsignals.post_save.connect(exclusions_changed, sender=model,
+                                dispatch_uid=uid)
+    dbsignals.post_delete.connect(exclusions_changed, sender=model,
+                                  dispatch_uid=uid + '_delete')
+
+for model in (Price, PriceCurrency):
+    uid = 'exclusions_%s' % model._meta.db_table
+    dbsignals.post_save.connect(exclusions_prices_changed, sender=model,
+                                dispatch_uid=uid)
+    dbsignals.post_delete.connect(exclusions_prices_changed, sender=model,
+                                  dispatch_uid=uid + '_delete')
@@ -3,6 +3,8 @@ from decimal import Decimal
 
 from django.conf import settings
 from django.core.urlresolvers import reverse
+from django.db.models import Q
+from django.db.models.query import prefetch_related_objects, QuerySet
 
 import commonware.log
 from rest_framework import response, serializers
@@ -18,6 +20,7 @@ from mkt.constants.applications import DEVICE_TYPES
 from mkt.constants.categories import CATEGORY_CHOICES
 from mkt.constants.features import FeatureProfile
 from mkt.constants.payments import PROVIDER_BANGO
+from mkt.developers.models import AddonPaymentAccount
 from mkt.prices.models import AddonPremium, Price
 from mkt.search.serializers import BaseESSerializer, es_to_datetime
 from mkt.site.helpers import absolutify
@@ -25,7 +28,8 @@ from mkt.submit.forms import mark_for_rereview
 from mkt.submit.serializers import PreviewSerializer, SimplePreviewSerializer
 from mkt.translations.utils import no_translation
 from mkt.versions.models import Version
-from mkt.webapps.models import (AddonUpsell, AppFeatures, Geodata, Preview,
+from mkt.webapps.models import (AddonUpsell, AddonUser, AppFeatures,
+                                AppManifest, Geodata, Installed, Preview,
                                 Webapp)
 from mkt.webapps.utils import dehydrate_content_rating
 
@@ -136,6 +140,137 @@ class AppSerializer(serializers.ModelSerializer):
             'tags', 'upsell', 'upsold', 'user', 'versions', 'weekly_downloads'
         ]
 
+    @property
+    def data(self):
+        if self._data is None:
+            many = (self.many if self.many is not None else
+                    isinstance(self.object, (list, QuerySet)))
+            if many:
+                self.prefetch(self.object)
+        return super(AppSerializer, self).data
+
+    def field_to_native(self, obj, field_name):
+        if self.many and obj is not None:
+            # Eg: the results of a page of apps.
+            value = getattr(obj, self.source or field_name, None)
+            if isinstance(value, (list, QuerySet)):
+                self.prefetch(value)
+        return super(AppSerializer, self).field_to_native(obj, field_name)
+
+    def prefetch(self, apps):
+        """
+        Load what the serializer's fields need for all of `apps` in a fixed
+        number of queries and attach it to them, so that serializing a list of
+        apps doesn't query once per app and field.
+
+        Relations are attached where the models already look for them, and
+        anything specific to the request user is kept on the serializer.
+        """
+        apps = [app for app in apps if isinstance(app, Webapp) and app.pk]
+        if not apps:
+            return
+        apps_dict = dict((app.pk, app) for app in apps)
+        fields = self.fields
+        self._prefetched = prefetched = {}
+
+        if 'upsell' in fields or 'upsold' in fields:
+            upsells = list(AddonUpsell.objects.filter(
+                Q(free__in=apps_dict) | Q(premium__in=apps_dict)))
+            other_ids = (set(u.free_id for u in upsells) |
+                         set(u.premium_id for u in upsells)) - set(apps_dict)
+            others = list(Webapp.objects.filter(id__in=other_ids))
+            upsell_apps = dict(apps_dict)
+            upsell_apps.update((a.pk, a) for a in others)
+            for app in apps:
+                app.__dict__['upsell'] = app.__dict__['upsold'] = None
+            for upsell in upsells:
+                if upsell.free_id in upsell_apps:
+                    setattr(upsell, AddonUpsell.free.cache_name,
+                            upsell_apps[upsell.free_id])
+                if upsell.premium_id in upsell_apps:
+                    setattr(upsell, AddonUpsell.premium.cache_name,
+                            upsell_apps[upsell.premium_id])
+                if upsell.free_id in apps_dict:
+                    apps_dict[upsell.free_id].__dict__['upsell'] = upsell
+                if upsell.premium_id in apps_dict:
+                    apps_dict[upsell.premium_id].__dict__['upsold'] = upsell
+            # Upsold apps are shown only if they're listed in the region.
+            apps_with_regions = apps + others
+        else:
+            apps_with_regions = apps
+
+        lookups = []
+        if 'tags' in fields:
+            lookups.append('tags')
+        if 'content_ratings' in fields:
+            lookups.append('content_ratings')
+            self.attach_one_to_one(apps, 'rating_descriptors')
+            self.attach_one_to_one(apps, 'rating_interactives')
+        if lookups:
+            prefetch_related_objects(apps, lookups)
+        if set(['regions', 'upsell', 'banner_message', 'banner_regions']
+               ).intersection(fields):
+            prefetch_related_objects(apps_with_regions,
+                                     ['addonexcludedregion'])
+            self.attach_one_to_one(apps_with_regions, '_geodata',
+                                   required=False)
+
+        if 'versions' in fields:
+            prefetched['versions'] = dict((pk, []) for pk in apps_dict)
+            for version in (Version.objects.filter(addon__in=apps_dict)
+                            .no_transforms()):
+                prefetched['versions'][version.addon_id].append(version)
+
+        if 'payment_account' in fields:
+            premium = [app.pk for app in apps if app.is_premium()]
+            prefetched['payment_account'] = dict.fromkeys(premium)
+            if premium:
+                accounts = (AddonPaymentAccount.objects
+                            .filter(addon__in=premium,
+                                    payment_account__provider=PROVIDER_BANGO)
+                            .select_related('payment_account'))
+                for account in accounts:
+                    prefetched['payment_account'][account.addon_id] = account
+
+        if 'is_offline' in fields:
+            hosted = dict((app.current_version.pk, app) for app in apps
+                          if not app.is_packaged and app.current_version and
+                          'is_offline' not in app.__dict__)
+            if hosted:
+                for version_id, is_offline in (
+                        AppManifest.objects.filter(version__in=hosted)
+                        .values_list('version', 'is_offline')):
+                    hosted[version_id].is_offline = is_offline
+
+        request = self.context.get('request')
+        if ('user' in fields and request and
+                request.user.is_authenticated()):
+            user = request.user
+            prefetched['developed'] = set(
+                AddonUser.objects.filter(addon__in=apps_dict, user=user,
+                                         role=amo.AUTHOR_ROLE_OWNER)
+                .values_list('addon', flat=True))
+            prefetched['installed'] = set(
+                Installed.objects.filter(addon__in=apps_dict, user=user)
+                .values_list('addon', flat=True))
+
+    def attach_one_to_one(self, apps, name, required=True):
+        """
+        Attach the reverse one to one relation `name` for all `apps`. Apps
+        without one raise DoesNotExist as usual, or are left to be looked up
+        if the relation isn't `required`.
+        """
+        descriptor = getattr(Webapp, name)
+        related = descriptor.related.model
+        objs = dict((obj.addon_id, obj) for obj in
+                    related.objects.filter(addon__in=[app.pk for app in apps]))
+        for app in apps:
+            obj = objs.get(app.pk)
+            if obj is not None:
+                obj.addon = app
+            if obj is not None or required:
+                setattr(app, descriptor.cache_name, obj)
+
     def _get_region_id(self):
         request = self.context.get('request')
         REGION = getattr(request, 'REGION', None)
@@ -179,14 +314,20 @@ class AppSerializer(serializers.ModelSerializer):
         if not app.is_premium():
             return None
 
-        try:
-            # This is a soon to be deprecated API property that only
-            # returns the Bango account for historic compatibility.
-            app_acct = app.payment_account(PROVIDER_BANGO)
-            return reverse('payment-account-detail',
-                           args=[app_acct.payment_account.pk])
-        except app.PayAccountDoesNotExist:
-            return None
+        prefetched = getattr(self, '_prefetched', {})
+        if app.pk in prefetched.get('payment_account', {}):
+            app_acct = prefetched['payment_account'][app.pk]
+            if not app_acct:
+                return None
+        else:
+            try:
+                # This is a soon to be deprecated API property that only
+                # returns the Bango account for historic compatibility.
+                app_acct = app.payment_account(PROVIDER_BANGO)
+            except app.PayAccountDoesNotExist:
+                return None
+        return reverse('payment-account-detail',
+                       args=[app_acct.payment_account.pk])
 
     def get_payment_required(self, app):
         if app.has_premium():
@@ -244,10 +385,17 @@ class AppSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and request.user.is_authenticated():
             user = request.user
+            prefetched = getattr(self, '_prefetched', {})
+            if 'developed' in prefetched:
+                developed = app.pk in prefetched['developed']
+                installed = app.pk in prefetched['installed']
+            else:
+                developed = app.addonuser_set.filter(
+                    user=user, role=amo.AUTHOR_ROLE_OWNER).exists()
+                installed = app.has_installed(user)
             return {
-                'developed': app.addonuser_set.filter(
-                    user=user, role=amo.AUTHOR_ROLE_OWNER).exists(),
-                'installed': app.has_installed(user),
+                'developed': developed,
+                'installed': installed,
                 'purchased': app.pk in user.purchase_ids(),
             }
 
@@ -256,8 +404,16 @@ class AppSerializer(serializers.ModelSerializer):
         # Unfortunately, cache-machine gets in the way so we can't use .only()
         # (.no_transforms() is ignored, defeating the purpose), and we can't
         # use .values() / .values_list() because those aren't cached :(
+        versions = getattr(self, '_prefetched', {}).get('versions', {})
+        if app.pk in versions:
+            versions = versions[app.pk]
+        elif 'versions' in getattr(app, '_prefetched_objects_cache', {}):
+            # Loaded by Webapp.load_graph.
+            versions = app.versions.all()
+        else:
+            versions = app.versions.all().no_transforms()
         return dict((v.version, reverse('version-detail', kwargs={'pk': v.pk}))
-                    for v in app.versions.all().no_transforms())
+                    for v in versions)
 
     def get_weekly_downloads(self, app):
         if app.public_stats:
@@ -406,6 +562,10 @@ class ESAppSerializer(BaseESSerializer, AppSerializer):
         # Remove fields that we don't have in ES at the moment.
         self.fields.pop('upsold', None)
 
+    def prefetch(self, apps):
+        # Everything comes from ES.
+        pass
+
     def fake_object(self, data):
         """Create a fake instance of Webapp and related models from ES data."""
         is_packaged = data['app_type'] != amo.ADDON_WEBAPP_HOSTED
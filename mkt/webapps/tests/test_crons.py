@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import os
+import tempfile
 import time
 from datetime import date, datetime, timedelta
 
@@ -8,10 +9,11 @@ from django.core.files.storage import default_storage as storage
 from django.core.management import call_command
 
 import mock
-from nose.tools import eq_
+from nose.tools import eq_, ok_
 
 import amo
 import amo.tests
+from lib.crypto import packaged
 import mkt
 from mkt.api.models import Nonce
 from mkt.developers.models import ActivityLog
@@ -245,6 +247,78 @@ class TestSignApps(amo.tests.TestCase):
             (file2.file_path, file2.signed_file_path))
 
 
+@mock.patch('lib.crypto.packaged.sign_app')
+class TestResignApps(amo.tests.TestCase):
+    fixtures = fixture('webapp_337141')
+
+    def setUp(self):
+        self.app = Webapp.objects.get(id=337141)
+        self.app.update(is_packaged=True)
+        self.app2 = amo.tests.app_factory(
+            name=u'Mozillaball ょ', app_slug='test',
+            is_packaged=True, version_kw={'version': '1.0',
+                                          'created': None})
+        self.checkpoint = tempfile.mktemp()
+
+    def tearDown(self):
+        if os.path.exists(self.checkpoint):
+            os.unlink(self.checkpoint)
+
+    def resign(self, **kw):
+        kw.setdefault('workers', 1)
+        call_command('resign_apps', checkpoint=self.checkpoint, **kw)
+
+    def signed(self, sign_mock):
+        return [c[1][1] for c in sign_mock.mock_calls]
+
+    def test_all(self, sign_mock):
+        self.resign()
+        eq_(self.signed(sign_mock),
+            [self.app.current_version.all_files[0].signed_file_path,
+             self.app2.current_version.all_files[0].signed_file_path])
+
+    def test_by_webapp(self, sign_mock):
+        self.resign(webapps=str(self.app2.pk))
+        eq_(self.signed(sign_mock),
+            [self.app2.current_version.all_files[0].signed_file_path])
+
+    def test_checkpoint(self, sign_mock):
+        self.resign(webapps=str(self.app.pk))
+        lines = open(self.checkpoint).read().splitlines()
+        eq_(len(lines), 1)
+        eq_(lines[0].split()[:3],
+            [str(self.app.pk), str(self.app.current_version.pk), 'ok'])
+
+    def test_resume(self, sign_mock):
+        self.resign(webapps=str(self.app.pk))
+        sign_mock.reset_mock()
+        self.resign()
+        eq_(self.signed(sign_mock),
+            [self.app2.current_version.all_files[0].signed_file_path])
+
+    def test_restart(self, sign_mock):
+        self.resign(webapps=str(self.app.pk))
+        sign_mock.reset_mock()
+        self.resign(restart=True)
+        eq_(len(sign_mock.mock_calls), 2)
+
+    def test_failed_retried(self, sign_mock):
+        sign_mock.side_effect = packaged.SigningError
+        self.resign()
+        sign_mock.reset_mock()
+        sign_mock.side_effect = None
+        self.resign()
+        eq_(len(sign_mock.mock_calls), 2)
+
+    def test_no_cache(self, sign_mock):
+        self.resign()
+        eq_([c[2]['use_cache'] for c in sign_mock.mock_calls], [False, False])
+
+    def test_use_cache(self, sign_mock):
+        self.resign(use_cache=True)
+        eq_([c[2]['use_cache'] for c in sign_mock.mock_calls], [True, True])
+
+
 class TestUpdateTrending(amo.tests.TestCase):
 
     def setUp(self):
@@ -331,6 +405,14 @@ class TestGarbage(amo.tests.TestCase):
         mkt_gc()
         assert rm_mock.call_args_list[0][0][0].endswith('lol')
 
+    def test_signed_apps_cache_delete(self, rm_mock, ls_mock, stat_mock):
+        ls_mock.return_value = ['lol.zip']
+        stat_mock.return_value = StatMock(days_ago=1000)
+
+        mkt_gc()
+        ok_(os.path.join(settings.SIGNED_APPS_CACHE_PATH, 'lol.zip') in
+            [args[0][0] for args in rm_mock.call_args_list])
+
     def test_new_no_delete(self, rm_mock, ls_mock, stat_mock):
         ls_mock.return_value = ['lol']
         stat_mock.return_value = StatMock(days_ago=1)
@@ -15,7 +15,9 @@ from django import forms
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core import mail
+from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
+from django.core.signals import request_finished
 from django.core.urlresolvers import reverse
 from django.db.models.signals import post_delete, post_save
 from django.test.utils import override_settings
@@ -30,8 +32,10 @@ import amo
 import amo.tests
 import mkt
 from amo.tests import app_factory, version_factory
+from amo.utils import cache_lock
 from lib.crypto import packaged
 from lib.crypto.tests import mock_sign
+from lib.misc.lru import LRUCache
 from lib.utils import static_url
 from mkt.constants import apps, MANIFEST_CONTENT_TYPE
 from mkt.constants.applications import DEVICE_TYPES
@@ -55,8 +59,12 @@ from mkt.versions.models import update_status, Version
 from mkt.webapps.indexers import WebappIndexer
 from mkt.webapps.models import (AddonDeviceType, AddonExcludedRegion,
                                 AddonUpsell, AppFeatures, AppManifest,
-                                BlacklistedSlug, ContentRating, Geodata,
-                                get_excluded_in, IARCInfo, Installed, Preview,
+                                BlacklistedSlug, ContentRating,
+                                EXCLUSIONS_BLOCK_SIZE, EXCLUSIONS_KEY,
+                                Geodata, get_excluded_ids,
+                                get_excluded_in, IARCInfo,
+                                Installed, is_excluded_in,
+                                manifest_validators_key, Preview,
                                 RatingDescriptors, RatingInteractives,
                                 version_changed, Webapp)
 from mkt.webapps.signals import version_changed as version_changed_signal
@@ -1400,6 +1408,67 @@ class DeletedAppTests(amo.tests.TestCase):
         eq_(webapp.latest_version, None)
 
 
+@override_settings(WEBAPP_GRAPH_CACHE_TIMEOUT=60)
+class TestGetCached(amo.tests.TestCase):
+
+    def setUp(self):
+        self.app = app_factory(rated=True)
+
+    def test_cached(self):
+        app = Webapp.get_cached(self.app.pk)
+        eq_(app, self.app)
+        with self.assertNumQueries(0):
+            app = Webapp.get_cached(self.app.pk)
+            eq_(app.current_version, self.app.current_version)
+            eq_(app.geodata.addon_id, self.app.pk)
+            ok_(app.get_content_ratings_by_body())
+            eq_(list(app.tags.all()), [])
+
+    def test_missing(self):
+        eq_(Webapp.get_cached(self.app.pk + 1), None)
+        self.app.delete()
+        eq_(Webapp.get_cached(self.app.pk), None)
+
+    def test_app_changed(self):
+        Webapp.get_cached(self.app.pk)
+        self.app.update(app_slug='changed')
+        eq_(Webapp.get_cached(self.app.pk).app_slug, 'changed')
+
+    def test_queryset_updated(self):
+        Webapp.get_cached(self.app.pk)
+        Webapp.objects.filter(pk=self.app.pk).update(app_slug='changed')
+        eq_(Webapp.get_cached(self.app.pk).app_slug, 'changed')
+
+    def test_related_changed(self):
+        Webapp.get_cached(self.app.pk)
+        geodata = self.app.geodata
+        geodata.banner_regions = [mkt.regions.BR.id]
+        geodata.save()
+        eq_(Webapp.get_cached(self.app.pk).geodata.banner_regions,
+            [mkt.regions.BR.id])
+
+        self.app.addonexcludedregion.create(region=mkt.regions.BR.id)
+        eq_(Webapp.get_cached(self.app.pk).get_excluded_region_ids(),
+            [mkt.regions.BR.id])
+
+    def test_version_changed(self):
+        Webapp.get_cached(self.app.pk)
+        version = self.app.current_version
+        version.files.all()[0].update(filename='changed.webapp')
+        app = Webapp.get_cached(self.app.pk)
+        eq_(app.current_version.all_files[0].filename, 'changed.webapp')
+
+    def test_prices_changed(self):
+        Webapp.get_cached(self.app.pk)
+        with patch.object(Webapp, 'load_graph') as load_graph:
+            Webapp.get_cached(self.app.pk)
+            ok_(not load_graph.called)
+            Price.objects.create(price='1.00')
+            Webapp.get_cached(self.app.pk)
+            ok_(load_graph.called)
+
+
+@override_settings(WEBAPP_EXCLUSIONS_CACHE_TIMEOUT=60)
 class TestExclusions(amo.tests.TestCase):
     fixtures = fixture('prices')
 
@@ -1437,6 +1506,73 @@ class TestExclusions(amo.tests.TestCase):
         ok_(mkt.regions.DE.id in excluded)
 
 
+@override_settings(WEBAPP_EXCLUSIONS_CACHE_TIMEOUT=60)
+class TestExclusionsIndex(amo.tests.TestCase):
+    fixtures = fixture('prices')
+
+    def setUp(self):
+        self.app = Webapp.objects.create()
+        self.other = Webapp.objects.create()
+        self.app.addonexcludedregion.create(region=mkt.regions.US.id)
+
+    def test_excluded(self):
+        ok_(is_excluded_in(self.app.pk, mkt.regions.US.id))
+        ok_(not is_excluded_in(self.app.pk, mkt.regions.BR.id))
+        ok_(not is_excluded_in(self.other.pk, mkt.regions.US.id))
+        with self.assertNumQueries(0):
+            ok_(is_excluded_in(self.app.pk, mkt.regions.US.id))
+            eq_(self.app.get_excluded_region_ids(), [mkt.regions.US.id])
+
+    def test_updated(self):
+        ok_(not is_excluded_in(self.other.pk, mkt.regions.BR.id))
+        aer = self.other.addonexcludedregion.create(region=mkt.regions.BR.id)
+        ok_(is_excluded_in(self.other.pk, mkt.regions.BR.id))
+        ok_(is_excluded_in(self.app.pk, mkt.regions.US.id))
+        aer.delete()
+        ok_(not is_excluded_in(self.other.pk, mkt.regions.BR.id))
+
+    def test_updated_again_after_request(self):
+        ok_(not is_excluded_in(self.other.pk, mkt.regions.BR.id))
+        key = EXCLUSIONS_KEY % (self.other.pk // EXCLUSIONS_BLOCK_SIZE)
+        stale = cache.get(key)
+        self.other.addonexcludedregion.create(region=mkt.regions.BR.id)
+        # A rebuild from before the transaction was committed is cached.
+        cache.set(key, stale)
+        ok_(not is_excluded_in(self.other.pk, mkt.regions.BR.id))
+        request_finished.send(sender=self.__class__)
+        ok_(is_excluded_in(self.other.pk, mkt.regions.BR.id))
+
+    def test_excluded_ids(self):
+        ids = [self.app.pk, self.other.pk]
+        eq_(get_excluded_ids(ids, mkt.regions.US.id), set([self.app.pk]))
+        eq_(get_excluded_ids(ids, mkt.regions.BR.id), set())
+        with patch('mkt.webapps.models.cache') as cache_mock:
+            cache_mock.get_many.return_value = {}
+            get_excluded_ids(ids, mkt.regions.US.id)
+        # One round-trip for the blocks of all the apps.
+        eq_(cache_mock.get_many.call_count, 1)
+        ok_(not cache_mock.get.called)
+
+    def test_geodata(self):
+        ok_(not is_excluded_in(self.app.pk, mkt.regions.DE.id))
+        self.app._geodata.update(region_de_usk_exclude=True)
+        ok_(is_excluded_in(self.app.pk, mkt.regions.DE.id))
+
+    def test_unpaid(self):
+        ok_(not is_excluded_in(self.app.pk, mkt.regions.PL.id, unpaid=True))
+        self.app.update(premium_type=amo.ADDON_PREMIUM)
+        ok_(not is_excluded_in(self.app.pk, mkt.regions.PL.id))
+        ok_(is_excluded_in(self.app.pk, mkt.regions.PL.id, unpaid=True))
+
+        price = Price.objects.get(pk=1)
+        AddonPremium.objects.create(addon=self.app, price=price)
+        ok_(not is_excluded_in(self.app.pk, mkt.regions.PL.id, unpaid=True))
+        currency = price.pricecurrency_set.get(region=mkt.regions.PL.id)
+        currency.paid = False
+        currency.save()
+        ok_(is_excluded_in(self.app.pk, mkt.regions.PL.id, unpaid=True))
+
+
 class TestPackagedAppManifestUpdates(amo.tests.TestCase):
     # Note: More extensive tests for `.update_names` are above.
 
@@ -1490,6 +1626,71 @@ class TestPackagedAppManifestUpdates(amo.tests.TestCase):
         eq_(self.webapp.name, u'Good App Name')
 
 
+class TestAppManifest(amo.tests.TestCase):
+
+    def setUp(self):
+        self.app = amo.tests.app_factory()
+
+    def create(self, manifest):
+        return AppManifest.objects.create(version=self.app.current_version,
+                                          manifest=json.dumps(manifest))
+
+    def test_attributes(self):
+        am = self.create({'type': 'privileged',
+                          'appcache_path': '/manifest.appcache',
+                          'launch_path': '/index.html',
+                          'permissions': {'alarms': {}}})
+        am = AppManifest.objects.get(pk=am.pk)
+        eq_(am.is_offline, True)
+        eq_(am.app_type, 'privileged')
+        eq_(am.launch_path, '/index.html')
+        eq_(am.permissions, {'alarms': {}})
+
+    def test_attributes_defaults(self):
+        am = self.create({'name': 'Yo'})
+        eq_(am.is_offline, False)
+        eq_(am.app_type, '')
+        eq_(am.launch_path, '')
+        eq_(am.permissions, {})
+
+    def test_attributes_updated(self):
+        am = self.create({})
+        am.update(manifest=json.dumps({'type': 'certified'}))
+        eq_(AppManifest.objects.get(pk=am.pk).app_type, 'certified')
+
+    def test_attributes_invalid_manifest(self):
+        am = AppManifest.objects.create(version=self.app.current_version,
+                                        manifest='garbage')
+        eq_(am.app_type, '')
+        eq_(am.permissions, {})
+
+
+@mock.patch('mkt.webapps.models.parsed_manifests', LRUCache(2))
+@mock.patch('mkt.webapps.models.WebAppParser.get_json_data')
+class TestParsedManifests(amo.tests.TestCase):
+
+    def setUp(self):
+        self.app = amo.tests.app_factory(is_packaged=True)
+
+    def test_parsed_once(self, get_json_data):
+        get_json_data.return_value = {'name': 'Yo'}
+        eq_(self.app.get_manifest_json(), {'name': 'Yo'})
+        eq_(self.app.get_manifest_json(), {'name': 'Yo'})
+        eq_(get_json_data.call_count, 1)
+
+    def test_copies(self, get_json_data):
+        get_json_data.return_value = {'name': 'Yo'}
+        self.app.get_manifest_json()['name'] = 'Changed'
+        eq_(self.app.get_manifest_json(), {'name': 'Yo'})
+
+    def test_new_hash(self, get_json_data):
+        get_json_data.return_value = {'name': 'Yo'}
+        self.app.get_manifest_json()
+        self.app.current_version.all_files[0].update(hash='sha256:new')
+        self.app.get_manifest_json()
+        eq_(get_json_data.call_count, 2)
+
+
 class TestWebappVersion(amo.tests.TestCase):
 
     def test_no_version(self):
@@ -1674,6 +1875,67 @@ class TestPackagedManifest(BasePackagedAppTest):
         with self.assertNumQueries(0):
             webapp.get_cached_manifest()
 
+    def public_addon(self):
+        webapp = self.post_addon()
+        webapp.update(status=amo.STATUS_PUBLIC)
+        webapp.latest_version.all_files[0].update(status=amo.STATUS_PUBLIC)
+        webapp = webapp.reload()
+        assert webapp.current_version
+        return webapp
+
+    @patch.object(Webapp, 'build_mini_manifest')
+    def test_cached_manifest_stale(self, build):
+        build.return_value = 'fresh'
+        webapp = self.public_addon()
+        key = 'webapp:%s:manifest' % webapp.pk
+        # As if the app had a new version since it was cached.
+        cache.set(key, {'version': -1, 'data': 'stale'}, None)
+        # Someone else is building it, the stale one is served.
+        with cache_lock(key):
+            eq_(webapp.get_cached_manifest(), 'stale')
+        ok_(not build.called)
+        # Without caching validators for it.
+        eq_(cache.get(manifest_validators_key(webapp.guid)), None)
+        eq_(webapp.get_cached_manifest(), 'fresh')
+        eq_(webapp.get_cached_manifest(), 'fresh')
+        eq_(build.call_count, 1)
+        eq_(cache.get(manifest_validators_key(webapp.guid)),
+            webapp.get_manifest_validators('fresh'))
+
+    @patch.object(Webapp, 'build_mini_manifest')
+    def test_cached_manifest_validators(self, build):
+        build.return_value = 'fresh'
+        webapp = self.public_addon()
+        webapp.get_cached_manifest()
+        validators = webapp.get_manifest_validators('fresh')
+        with patch.object(Webapp, 'get_manifest_validators') as get_:
+            eq_(webapp.get_cached_manifest_validators('fresh'), validators)
+            ok_(not get_.called)
+            # Other manifests, eg: a stale one, aren't cached.
+            webapp.get_cached_manifest_validators('stale')
+            get_.assert_called_with('stale')
+        eq_(cache.get(manifest_validators_key(webapp.guid)), validators)
+
+    @patch.object(Webapp, 'build_mini_manifest')
+    def test_cached_manifest_file_changed(self, build):
+        build.return_value = 'old'
+        webapp = self.public_addon()
+        webapp.get_cached_manifest()
+        build.return_value = 'new'
+        webapp.latest_version.all_files[0].save()
+        eq_(cache.get(manifest_validators_key(webapp.guid)), None)
+        eq_(webapp.get_cached_manifest(), 'new')
+
+    @patch.object(Webapp, 'build_mini_manifest')
+    def test_cached_manifest_force(self, build):
+        build.return_value = 'old'
+        webapp = self.public_addon()
+        eq_(webapp.get_cached_manifest(), 'old')
+        build.return_value = 'new'
+        eq_(webapp.get_cached_manifest(), 'old')
+        eq_(webapp.get_cached_manifest(force=True), 'new')
+        eq_(webapp.get_cached_manifest(), 'new')
+
     @mock.patch('mkt.webapps.models.cache')
     def test_cached_manifest_no_version_not_cached(self, cache_mock):
         webapp = self.post_addon(
@@ -3,7 +3,8 @@ from decimal import Decimal
 
 from django.contrib.auth.models import AnonymousUser
 from django.core.urlresolvers import reverse
-from django.test.utils import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 
 import mock
 from nose.tools import eq_, ok_
@@ -19,6 +20,7 @@ from mkt.developers.models import (AddonPaymentAccount, PaymentAccount,
 from mkt.prices.models import PriceCurrency
 from mkt.regions.middleware import RegionMiddleware
 from mkt.site.fixtures import fixture
+from mkt.tags.models import Tag
 from mkt.users.models import UserProfile
 from mkt.versions.models import Version
 from mkt.webapps.indexers import WebappIndexer
@@ -249,6 +251,56 @@ class TestAppSerializer(amo.tests.TestCase):
         eq_(res['upsell'], False)
 
 
+class TestAppSerializerPrefetch(amo.tests.TestCase):
+    fixtures = fixture('user_2519')
+
+    def setUp(self):
+        self.profile = UserProfile.objects.get(pk=2519)
+        self.request = RequestFactory().get('/')
+        self.request.REGION = mkt.regions.US
+        self.request.user = self.profile
+
+    def create_apps(self, count):
+        apps = []
+        for x in range(count):
+            app = amo.tests.app_factory(rated=True)
+            Tag(tag_text='tag%s' % x).save_tag(app)
+            app.addonuser_set.create(user=self.profile)
+            Installed.objects.create(addon=app, user=self.profile)
+            apps.append(app.pk)
+        return apps
+
+    def serialize(self, pks):
+        apps = Webapp.objects.no_cache().filter(pk__in=pks).order_by('pk')
+        serializer = AppSerializer(apps, many=True,
+                                   context={'request': self.request})
+        with CaptureQueriesContext(connection) as queries:
+            data = serializer.data
+        return data, len(queries)
+
+    def test_same_data(self):
+        pks = self.create_apps(2)
+        upsell = amo.tests.app_factory(premium_type=amo.ADDON_PREMIUM)
+        Webapp.objects.get(pk=pks[0])._upsell_from.create(premium=upsell)
+        data, queries = self.serialize(pks)
+        eq_(data, [AppSerializer(Webapp.objects.get(pk=pk),
+                                 context={'request': self.request}).data
+                   for pk in pks])
+        eq_(data[0]['tags'], ['tag0'])
+        eq_(data[0]['user']['developed'], True)
+        eq_(data[0]['user']['installed'], True)
+        eq_(data[1]['upsell'], False)
+
+    def test_queries_bounded(self):
+        # Warm up anything cached across apps, eg: price tiers.
+        self.serialize(self.create_apps(1))
+        one = self.serialize(self.create_apps(1))[1]
+        many = self.serialize(self.create_apps(5))[1]
+        assert many <= one, (
+            'Serializing 5 apps took %s queries, 1 app took %s'
+            % (many, one))
+
+
 class TestAppSerializerPrices(amo.tests.TestCase):
     fixtures = fixture('user_2519')
 
@@ -1,6 +1,9 @@
+import hashlib
+
 from django import forms as django_forms
+from django.conf import settings
 from django.core.urlresolvers import reverse
-from django.http import Http404
+from django.utils import translation
 
 import commonware
 from rest_framework import exceptions, response, serializers, status, viewsets
@@ -24,7 +27,9 @@ from mkt.regions import get_region
 from mkt.submit.views import PreviewViewSet
 from mkt.tags.models import Tag
 from mkt.translations.query import order_by_translation
-from mkt.webapps.models import AddonUser, get_excluded_in, Webapp
+from mkt.webapps.models import (AddonUser, get_app_cached,
+                                get_excluded_ids, is_excluded_in,
+                                set_app_cached, Webapp)
 from mkt.webapps.serializers import AppSerializer
 
 
@@ -102,17 +107,14 @@ class AppViewSet(CORSMixin, SlugOrIdMixin, MarketplaceView,
                               RestAnonymousAuthentication]
 
     def get_queryset(self):
-        return Webapp.objects.all().exclude(
-            id__in=get_excluded_in(get_region().id))
-
-    def get_base_queryset(self):
         return Webapp.objects.all()
 
     def get_object(self, queryset=None):
-        try:
-            app = super(AppViewSet, self).get_object()
-        except Http404:
-            app = super(AppViewSet, self).get_object(self.get_base_queryset())
+        app = self.get_cached_object()
+        if app:
+            return app
+        app = super(AppViewSet, self).get_object()
+        if is_excluded_in(app.pk, get_region().id):
             # Owners and reviewers can see apps regardless of region.
             owner_or_reviewer = AnyOf(AllowAppOwner, AllowReviewerReadOnly)
             if owner_or_reviewer.has_object_permission(self.request, self,
@@ -124,9 +126,50 @@ class AppViewSet(CORSMixin, SlugOrIdMixin, MarketplaceView,
                 data[key] = unicode(value) if value else ''
             data['reason'] = 'Not available in your region.'
             raise HttpLegallyUnavailable(data)
-        self.check_object_permissions(self.request, app)
         return app
 
+    def get_cached_object(self):
+        """
+        Returns the app from Webapp.get_cached for reads by id of apps listed
+        in the current region, or None to go the usual way.
+        """
+        pk = self.kwargs.get('pk')
+        if self.request.method != 'GET' or not pk or not pk.isdigit():
+            return None
+        if is_excluded_in(int(pk), get_region().id):
+            return None
+        app = Webapp.get_cached(int(pk))
+        if app:
+            self.check_object_permissions(self.request, app)
+        return app
+
+    def retrieve(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        serializer = self.get_serializer(self.object)
+        key = self.get_detail_cache_key(self.object)
+        data, generation = get_app_cached(key, self.object.pk)
+        if data is None:
+            data = serializer.data
+            cached = data
+            if 'user' in data:
+                # The user's own fields are added on every request.
+                cached = dict(data, user=None)
+            set_app_cached(key, self.object.pk, generation, cached,
+                           settings.WEBAPP_DETAIL_CACHE_TIMEOUT)
+        elif 'user' in data:
+            data = dict(data, user=serializer.get_user_info(self.object))
+        return Response(data)
+
+    def get_detail_cache_key(self, app):
+        request = self.request
+        query = request.META.get('QUERY_STRING', '')
+        parts = [self.get_serializer_class().__name__, get_region().slug,
+                 translation.get_language(),
+                 getattr(request, 'API_VERSION', None),
+                 'auth' if request.user.is_authenticated() else 'anon',
+                 hashlib.md5(query).hexdigest()]
+        return 'webapp:detail:%s:%s' % (app.pk, ':'.join(map(str, parts)))
+
     def create(self, request, *args, **kwargs):
         uuid = request.DATA.get('upload', '')
         if uuid:
@@ -180,8 +223,10 @@ class AppViewSet(CORSMixin, SlugOrIdMixin, MarketplaceView,
             log.info('Anonymous listing not allowed')
             raise exceptions.PermissionDenied('Anonymous listing not allowed.')
 
-        self.object_list = self.filter_queryset(self.get_queryset().filter(
-            authors=request.user))
+        apps = self.get_queryset().filter(authors=request.user)
+        excluded = get_excluded_ids(apps.values_list('id', flat=True),
+                                    get_region().id)
+        self.object_list = self.filter_queryset(apps.exclude(id__in=excluded))
         page = self.paginate_queryset(self.object_list)
         serializer = self.get_pagination_serializer(page)
         return response.Response(serializer.data)
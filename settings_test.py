@@ -36,6 +36,7 @@ ADDONS_PATH = _polite_tmpdir()
 GUARDED_ADDONS_PATH = _polite_tmpdir()
 SIGNED_APPS_PATH = _polite_tmpdir()
 SIGNED_APPS_REVIEWER_PATH = _polite_tmpdir()
+SIGNED_APPS_CACHE_PATH = _polite_tmpdir()
 UPLOADS_PATH = _polite_tmpdir()
 TMP_PATH = _polite_tmpdir()
 COLLECTIONS_ICON_PATH = _polite_tmpdir()
@@ -73,6 +74,19 @@ CACHES = {
 # is just too annoying for tests, so disable it.
 CACHE_COUNT_TIMEOUT = -1
 
+# Tests often change apps with queryset updates, which can't invalidate the
+# cached apps for the detail API, the region exclusion index or translations,
+# so only use them in tests that ask for it.
+WEBAPP_GRAPH_CACHE_TIMEOUT = 0
+WEBAPP_DETAIL_CACHE_TIMEOUT = 0
+WEBAPP_EXCLUSIONS_CACHE_TIMEOUT = 0
+TRANSLATION_SETS_CACHE_TIMEOUT = 0
+TRANSLATION_SETS_LRU_TIMEOUT = 0
+
+# Reserving blocks of translation ids uses a connection of its own, which
+# can't see the sequence in the test transaction.
+TRANSLATION_ID_BLOCK_SIZE = 1
+
 # Overrides whatever storage you might have put in local settings.
 DEFAULT_FILE_STORAGE = 'amo.utils.LocalFileStorage'
 
@@ -120,6 +134,12 @@ PRE_GENERATE_APKS = False
 # This is a precaution in case something isn't mocked right.
 PRE_GENERATE_APK_URL = 'http://you-should-never-load-this.com/'
 
+# Save user attributes straight away.
+USER_ATTRS_FLUSH_INTERVAL = 0
+
+# Don't sleep between signing server retries.
+SIGNING_CLIENT_RETRY_BACKOFF = 0
+
 # A sample key for signing receipts.
 WEBAPPS_RECEIPT_KEY = os.path.join(ROOT, 'mkt/webapps/tests/sample.key')
 